@@ -0,0 +1,108 @@
+"""
+Import-time regression check for the utils entry points, measured with python -X importtime.
+Each entry point is imported in a fresh interpreter with pandas and numpy preloaded, so the reported time is what
+utils itself adds on top of them. A check fails when a module listed in FORBIDDEN_MODULES gets imported, or when
+the best of --repeat runs exceeds the entry point's budget.
+
+Usage (from the repository root):
+    python -m benchmarks.import_time
+    python -m benchmarks.import_time --modules utils.pipeline --repeat 9 --output output/benchmarks/import_time.csv
+Exits with status 1 when a check fails.
+"""
+import argparse
+import os
+import subprocess
+import sys
+import pandas as pd
+
+PRELOADED = ["pandas", "numpy"]
+
+# Modules (and their submodules) an entry point must not load
+FORBIDDEN_MODULES = {
+    "utils.pipeline": ["matplotlib", "scipy", "multiprocessing", "cProfile", "tracemalloc",
+                       "utils.clean_visitor_data", "utils.aggregate_cube"],
+    "utils.data_loader": ["matplotlib", "scipy", "multiprocessing"],
+    "utils.alert": ["matplotlib", "scipy", "multiprocessing"],
+    "utils.timeliness": ["matplotlib", "scipy", "multiprocessing"],
+    "utils.clean_press_data": ["matplotlib", "scipy", "multiprocessing"],
+    "utils.clean_visitor_data": ["matplotlib", "scipy", "multiprocessing"],
+}
+
+# Cumulative import time in ms on top of the preloaded modules; generous, to catch regressions by whole modules
+BUDGET_MS = {
+    "utils.pipeline": 25.0,
+    "utils.data_loader": 15.0,
+    "utils.alert": 10.0,
+    "utils.timeliness": 10.0,
+    "utils.clean_press_data": 10.0,
+    "utils.clean_visitor_data": 10.0,
+}
+
+def parse_importtime(stderr):
+    """
+    -X importtime output as a DataFrame with module, self_us, cumulative_us and depth (0 = top-level import).
+    """
+    rows = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        rows.append({"module": name.strip(), "self_us": int(self_us), "cumulative_us": int(cumulative_us),
+                     "depth": (len(name) - len(name.lstrip()) - 1) // 2})
+    return pd.DataFrame(rows, columns=["module", "self_us", "cumulative_us", "depth"])
+
+def measure_import(module, preload=PRELOADED, python=sys.executable, cwd=None):
+    """
+    Imports module in a fresh interpreter after preload; returns the parsed -X importtime rows of that import only.
+    """
+    code = "".join(f"import {name}\n" for name in preload) + "import sys; sys.stderr.write('--- import start ---\\n')\n" + f"import {module}\n"
+    result = subprocess.run([python, "-X", "importtime", "-c", code], capture_output=True, text=True,
+                            cwd=cwd or os.getcwd())
+    if result.returncode != 0:
+        raise RuntimeError(f"import {module} failed:\n{result.stderr[-2000:]}")
+    return parse_importtime(result.stderr.split("--- import start ---", 1)[1])
+
+def check_import(module, repeat=5, forbidden=None, budget_ms=None, cwd=None):
+    """
+    Best-of-repeat cumulative import time of module and the forbidden modules it loaded.
+    Returns a dict with module, import_ms, budget_ms, forbidden_loaded and ok.
+    """
+    forbidden = FORBIDDEN_MODULES.get(module, []) if forbidden is None else forbidden
+    budget_ms = BUDGET_MS.get(module) if budget_ms is None else budget_ms
+    best_ms, loaded = None, set()
+    for _ in range(repeat):
+        rows = measure_import(module, cwd=cwd)
+        top = rows[(rows["module"] == module) & (rows["depth"] == 0)]
+        import_ms = top["cumulative_us"].sum() / 1000
+        best_ms = import_ms if best_ms is None else min(best_ms, import_ms)
+        loaded |= {prefix for prefix in forbidden
+                   if rows["module"].eq(prefix).any() or rows["module"].str.startswith(prefix + ".").any()}
+    loaded = sorted(loaded)
+    ok = not loaded and (budget_ms is None or best_ms <= budget_ms)
+    return {"module": module, "import_ms": round(best_ms, 2), "budget_ms": budget_ms,
+            "forbidden_loaded": ",".join(loaded), "ok": ok}
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Check the import time of the utils entry points.")
+    parser.add_argument("--modules", default=None, help="comma-separated modules (default: all with a budget)")
+    parser.add_argument("--repeat", type=int, default=5, help="runs per module; the fastest counts")
+    parser.add_argument("--output", default=None, help="CSV file for the report")
+    args = parser.parse_args(argv)
+
+    modules = args.modules.split(",") if args.modules else list(BUDGET_MS)
+    records = []
+    for module in modules:
+        record = check_import(module, args.repeat)
+        records.append(record)
+        print(f"{module:30s} {record['import_ms']:8.2f} ms  (budget {record['budget_ms']} ms)  "
+              + ("ok" if record["ok"] else "FAIL" + (f": loads {record['forbidden_loaded']}" if record["forbidden_loaded"] else "")),
+              flush=True)
+
+    report = pd.DataFrame(records)
+    if args.output:
+        os.makedirs(os.path.dirname(args.output) or ".", exist_ok=True)
+        report.to_csv(args.output, index=False, encoding="utf-8-sig")
+    return 0 if report["ok"].all() else 1
+
+if __name__ == "__main__":
+    sys.exit(main())
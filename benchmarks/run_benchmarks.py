@@ -0,0 +1,110 @@
+"""
+Times every utils stage on synthetic inputs at several volumes and reports throughput and peak RSS.
+Each (stage, scale) case runs in a fresh process so its peak memory is measured on its own.
+
+Usage (from the repository root):
+    python -m benchmarks.run_benchmarks --scales 1,10,100 --output output/benchmarks/report.csv
+"""
+import argparse
+import multiprocessing as mp
+import os
+import tempfile
+import time
+import pandas as pd
+from utils.instrumentation import peak_rss_mb
+
+def _stage_functions(paths):
+    """
+    Returns {stage name: (setup, run)}; setup output is passed to run and is not timed.
+    run returns the number of input rows it processed.
+    """
+    from utils.data_loader import load_raw_data
+    from utils.pipeline import run_daily_news_pipeline
+    from utils.timeliness import get_table_timeliness_by_year
+    from utils.alert import get_combined_travel_alerts
+    from utils.clean_visitor_data import get_processed_visitor_data
+    from utils.clean_press_data import get_cleaned_press_data
+
+    news_paths = {k: paths[k] for k in ("epi_xlsx_path", "tcdc_csv_path", "country_xlsx_path", "transmission_xlsx_path")}
+    news_paths["research_end_date"] = "2025-12-31"
+    n_news = lambda: len(pd.read_csv(paths["tcdc_csv_path"], usecols=["headline"]))
+    pipeline_output = lambda: run_daily_news_pipeline(**news_paths, vectorized=True)
+
+    return {
+        "load_raw_data": (n_news, lambda n: (load_raw_data(**news_paths), n)[1]),
+        "run_daily_news_pipeline": (n_news, lambda n: (run_daily_news_pipeline(**news_paths), n)[1]),
+        "run_daily_news_pipeline[vectorized]": (n_news, lambda n: (run_daily_news_pipeline(**news_paths, vectorized=True), n)[1]),
+        "get_table_timeliness_by_year": (pipeline_output, lambda df: (get_table_timeliness_by_year(df), len(df))[1]),
+        "get_table_timeliness_by_year[vectorized]": (pipeline_output, lambda df: (get_table_timeliness_by_year(df, vectorized=True), len(df))[1]),
+        "get_combined_travel_alerts": (lambda: None, lambda _: len(get_combined_travel_alerts(paths["alert_history_path"], paths["alert_path"]))),
+        "get_processed_visitor_data": (lambda: len(pd.read_excel(paths["visitor_xlsx_path"], header=None, skiprows=4)),
+                                       lambda n: (get_processed_visitor_data(paths["visitor_xlsx_path"], 15), n)[1]),
+        "get_cleaned_press_data": (lambda: len(pd.read_excel(paths["press_xlsx_path"], usecols=["Name"])),
+                                   lambda n: (get_cleaned_press_data(paths["press_xlsx_path"], research_end_date="2025-12-31"), n)[1]),
+        "get_cleaned_press_data[vectorized]": (lambda: len(pd.read_excel(paths["press_xlsx_path"], usecols=["Name"])),
+                                               lambda n: (get_cleaned_press_data(paths["press_xlsx_path"], research_end_date="2025-12-31", vectorized=True), n)[1]),
+    }
+
+def _run_case(stage, paths, queue):
+    try:
+        setup, run = _stage_functions(paths)[stage]
+        prepared = setup()
+        rss_before = peak_rss_mb()
+        start_wall, start_cpu = time.perf_counter(), time.process_time()
+        n_rows = run(prepared)
+        wall, cpu = time.perf_counter() - start_wall, time.process_time() - start_cpu
+        queue.put({"rows": n_rows, "wall_s": wall, "cpu_s": cpu,
+                   "peak_rss_mb": peak_rss_mb(), "peak_rss_before_mb": rss_before, "error": None})
+    except Exception as e:
+        queue.put({"error": f"{type(e).__name__}: {e}"})
+
+def run_benchmarks(scales=(1, 10, 100), stages=None, data_dir=None, seed=4055):
+    """
+    Generates synthetic inputs for each scale and times each stage in its own process.
+    Returns one row per (stage, scale) with wall/CPU seconds, rows per second and peak RSS.
+    """
+    from benchmarks.synthetic_data import generate_synthetic_inputs
+
+    data_dir = data_dir or tempfile.mkdtemp(prefix="cdc_eic_bench_")
+    ctx = mp.get_context("spawn")
+    records = []
+    for scale in scales:
+        paths = generate_synthetic_inputs(os.path.join(data_dir, f"x{scale}"), scale=scale, seed=seed)
+        for stage in stages or list(_stage_functions(paths)):
+            queue = ctx.Queue()
+            process = ctx.Process(target=_run_case, args=(stage, paths, queue))
+            process.start()
+            result = queue.get()
+            process.join()
+
+            record = {"stage": stage, "scale": scale, **result}
+            if not result.get("error"):
+                record["rows_per_s"] = result["rows"] / result["wall_s"] if result["wall_s"] else float("nan")
+            records.append(record)
+            print(f"{stage:45s} x{scale:<4} " + (
+                f"{record['wall_s']:8.2f}s  {record['rows_per_s']:12,.0f} rows/s  peak RSS {record['peak_rss_mb'] or float('nan'):8.1f} MB"
+                if not result.get("error") else result["error"]
+            ), flush=True)
+
+    columns = ["stage", "scale", "rows", "wall_s", "cpu_s", "rows_per_s", "peak_rss_mb", "peak_rss_before_mb", "error"]
+    return pd.DataFrame(records).reindex(columns=columns)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the utils stages on synthetic data.")
+    parser.add_argument("--scales", default="1,10,100", help="comma-separated multiples of the real data volume")
+    parser.add_argument("--stages", default=None, help="comma-separated stage names (default: all)")
+    parser.add_argument("--data-dir", default=None, help="where to write the synthetic inputs (default: a temp dir)")
+    parser.add_argument("--seed", type=int, default=4055)
+    parser.add_argument("--output", default=None, help="CSV file for the report")
+    args = parser.parse_args(argv)
+
+    scales = [float(s) if "." in s else int(s) for s in args.scales.split(",")]
+    stages = args.stages.split(",") if args.stages else None
+    report = run_benchmarks(scales, stages, args.data_dir, args.seed)
+    if args.output:
+        os.makedirs(os.path.dirname(args.output) or ".", exist_ok=True)
+        report.to_csv(args.output, index=False, encoding="utf-8-sig")
+    return report
+
+if __name__ == "__main__":
+    main()
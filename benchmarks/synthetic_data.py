@@ -0,0 +1,258 @@
+"""
+Seeded synthetic inputs shaped like the real data files, so the utils stages can be
+benchmarked offline. Volumes are expressed as a multiple (scale) of the real data volume.
+"""
+import os
+import numpy as np
+import pandas as pd
+from utils.disease_name_mapping import dict_disease_name_mapping
+
+# Approximate real volumes (scale=1)
+BASE_VOLUME = {
+    "news_rows": 25000,      # TCDCIntlEpidAll.csv rows (~73k country-disease rows after explode)
+    "press_rows": 9000,      # press release rows before merging Name
+    "alert_rows": 2000,      # travel alert rows (history + current)
+    "visitor_years": 17      # rows of the visitor table
+}
+
+# An xlsx sheet holds 1,048,576 rows including the header
+EXCEL_MAX_ROWS = 1_048_575
+
+# iso3, iso2, zh name, en name, WHO region, aliases (| separated)
+COUNTRIES = [
+    ("USA", "US", "美國", "United States", "美洲", "美|美國本土"),
+    ("CHN", "CN", "中國大陸", "China", "西太平洋", "中國|大陸"),
+    ("HKG", "HK", "香港", "Hong Kong", "西太平洋", "港"),
+    ("JPN", "JP", "日本", "Japan", "西太平洋", "日"),
+    ("KOR", "KR", "韓國", "South Korea", "西太平洋", "南韓"),
+    ("GBR", "GB", "英國", "United Kingdom", "歐洲", "英"),
+    ("VNM", "VN", "越南", "Viet Nam", "西太平洋", ""),
+    ("THA", "TH", "泰國", "Thailand", "東南亞", ""),
+    ("PHL", "PH", "菲律賓", "Philippines", "西太平洋", ""),
+    ("IDN", "ID", "印尼", "Indonesia", "東南亞", "印度尼西亞"),
+    ("MYS", "MY", "馬來西亞", "Malaysia", "西太平洋", "大馬"),
+    ("SGP", "SG", "新加坡", "Singapore", "西太平洋", "星國"),
+    ("IND", "IN", "印度", "India", "東南亞", ""),
+    ("AUS", "AU", "澳洲", "Australia", "西太平洋", "澳大利亞"),
+    ("CAN", "CA", "加拿大", "Canada", "美洲", ""),
+    ("BRA", "BR", "巴西", "Brazil", "美洲", ""),
+    ("FRA", "FR", "法國", "France", "歐洲", ""),
+    ("DEU", "DE", "德國", "Germany", "歐洲", ""),
+    ("ITA", "IT", "義大利", "Italy", "歐洲", "意大利"),
+    ("SAU", "SA", "沙烏地阿拉伯", "Saudi Arabia", "東地中海", "沙國"),
+    ("EGY", "EG", "埃及", "Egypt", "東地中海", ""),
+    ("COD", "CD", "剛果民主共和國", "DR Congo", "非洲", "剛果(金)"),
+    ("NGA", "NG", "奈及利亞", "Nigeria", "非洲", ""),
+    ("UGA", "UG", "烏干達", "Uganda", "非洲", ""),
+    ("PAK", "PK", "巴基斯坦", "Pakistan", "東地中海", ""),
+    ("AFG", "AF", "阿富汗", "Afghanistan", "東地中海", ""),
+    ("MEX", "MX", "墨西哥", "Mexico", "美洲", ""),
+    ("PER", "PE", "秘魯", "Peru", "美洲", ""),
+]
+
+ROUTES = ["蟲媒傳染", "飛沫傳染", "接觸傳染", "食物或飲水傳染", "空氣傳染"]
+SOURCES = ["WHO EIS", "CDC", "美國CDC", "outbreaknewstoday", "WHO/AFRO", "ECDC", "香港衛生防護中心", "uscdc", "媒體"]
+ALERT_LEVELS = ["第一級：注意(Watch)", "第二級：警示(Alert)", "第三級：警告(Warning)", "解除"]
+ALERT_DISEASES = ["登革熱", "麻疹", "嚴重特殊傳染性肺炎", "M痘", "小兒麻痺症", "霍亂", "茲卡病毒感染症", "黃熱病"]
+
+def _volume(key, scale):
+    return max(1, int(BASE_VOLUME[key] * scale))
+
+def _pick(rng, values, n):
+    return np.asarray(values, dtype=object)[rng.integers(0, len(values), n)]
+
+def _dates(rng, n, start="2009-01-01", end="2025-12-31"):
+    start, end = pd.Timestamp(start), pd.Timestamp(end)
+    days = rng.integers(0, (end - start).days + 1, n)
+    return start + pd.to_timedelta(np.sort(days), unit="D")
+
+def make_country_tables():
+    """
+    Country workbook sheets: the monitoring list (first sheet) and the WHO region sheet.
+    """
+    df_country = pd.DataFrame({
+        "監測國家/區域": [c[2] for c in COUNTRIES],
+        "監測國家/區域(英文)": [c[3] for c in COUNTRIES],
+        "ISO3166-1二位代碼": [c[1] for c in COUNTRIES],
+        "ISO3166-1三位代碼": [c[0] for c in COUNTRIES],
+        "ISO3166-1(中文)": [c[2] for c in COUNTRIES],
+        "外網國家別": [c[2] for c in COUNTRIES],
+        "中文別稱": [c[5] or np.nan for c in COUNTRIES],
+    })
+    df_region = pd.DataFrame({
+        "監測用國家/區域清單": [c[2] for c in COUNTRIES],
+        "ISO3166-1三位代碼": [c[0] for c in COUNTRIES],
+        "WHO分區": [c[4] for c in COUNTRIES],
+    })
+    return df_country, df_region
+
+def make_news_tables(rng, n_rows):
+    """
+    TCDC CSV rows and the matching epidemics workbook (Subject/Source/SourceTime*/PublishTime).
+    """
+    dates = _dates(rng, n_rows)
+    names = [c[2] for c in COUNTRIES]
+    aliases = [a for c in COUNTRIES for a in c[5].split("|") if a] + names
+    diseases = list(dict_disease_name_mapping)[:120] + ["登革熱", "麻疹", "霍亂", "M痘/麻疹"]
+
+    country_1 = _pick(rng, names, n_rows)
+    country_2 = _pick(rng, names, n_rows)
+    two_countries = rng.random(n_rows) < 0.1
+    headline_country = np.where(two_countries, country_1 + "/" + country_2, country_1)
+    separator = _pick(rng, ["-", "－", "─"], n_rows)
+    headline = pd.Series(headline_country + separator + _pick(rng, diseases, n_rows))
+
+    month, day = dates.month.astype(str), dates.day.astype(str)
+    closing = _pick(rng, ["公布", "疫情上升", "亦有病例", ""], n_rows)
+    closing = np.where(closing == "", "截至" + month + "月" + day + "日無新增", closing)
+    description = pd.Series(
+        _pick(rng, aliases, n_rows) + "截至今年" + month + "/" + day + "累計"
+        + rng.integers(1, 5000, n_rows).astype(str) + "例病例，" + _pick(rng, aliases, n_rows)
+        + closing
+    )
+
+    iso2 = np.asarray([c[1] for c in COUNTRIES], dtype=object)
+    iso3166 = pd.Series(iso2[rng.integers(0, len(iso2), n_rows)]).where(rng.random(n_rows) < 0.7)
+
+    df_tcdc = pd.DataFrame({
+        "sent": dates.strftime("%Y-%m-%dT%H:%M:%S+08:00"),
+        "effective": dates.strftime("%Y-%m-%dT%H:%M:%S+08:00"),
+        "source": "TCDC",
+        "expires": (dates + pd.Timedelta(days=30)).strftime("%Y-%m-%dT%H:%M:%S+08:00"),
+        "senderName": "衛生福利部疾病管制署",
+        "headline": headline,
+        "description": description,
+        "instruction": "",
+        "alert_title": "國際間旅遊疫情",
+        "severity_level": "",
+        "circle": "",
+        "ISO3166": iso3166,
+    })
+
+    has_source = rng.random(n_rows) < 0.8
+    source = pd.Series(_pick(rng, SOURCES, n_rows) + "、" + _pick(rng, SOURCES, n_rows)
+                       + " " + rng.integers(1, 13, n_rows).astype(str) + "/" + rng.integers(1, 29, n_rows).astype(str))
+    lag_1 = pd.to_timedelta(rng.integers(0, 10, n_rows), unit="D")
+    lag_2 = pd.to_timedelta(rng.integers(0, 5, n_rows), unit="D")
+    df_epi = pd.DataFrame({
+        "Subject": headline,
+        "Source": source,
+        "SourceTime": pd.Series(dates - lag_1).where(rng.random(n_rows) < 0.6),
+        "SourceTime2": pd.Series(dates - lag_2).where(rng.random(n_rows) < 0.4),
+        "PublishTime": dates,
+    })[has_source].reset_index(drop=True)
+
+    return df_tcdc, df_epi
+
+def make_transmission_table():
+    diseases = sorted(set(dict_disease_name_mapping.values()) | {"登革熱", "麻疹", "霍亂"})
+    return pd.DataFrame({
+        "主要傳染途徑": [ROUTES[i % len(ROUTES)] for i in range(len(diseases))],
+        "監測疾病名稱": diseases,
+    })
+
+def make_press_table(rng, n_rows):
+    """
+    Press releases: several rows (one per Name) share PublishTime/Subject/Content.
+    """
+    n_releases = max(1, n_rows // 2)
+    dates = _dates(rng, n_releases)
+    names = [c[2] for c in COUNTRIES]
+    subject = pd.Series("疾管署提醒" + _pick(rng, ALERT_DISEASES, n_releases) + "疫情第" + np.arange(n_releases).astype(str) + "報")
+    content = pd.Series(
+        "<p>" + _pick(rng, names, n_releases) + _pick(rng, ["累計報告", "疫情上升，國際旅遊疫情建議等級第二級", "國內新增"], n_releases)
+        + rng.integers(1, 500, n_releases).astype(str) + "例病例。</p><br/><span>" + "國內境外移入個案" * 5 + "</span>"
+    )
+    repeat = rng.integers(1, 4, n_releases)
+    release = np.repeat(np.arange(n_releases), repeat)[:n_rows]
+    return pd.DataFrame({
+        "PublishTime": dates[release],
+        "Subject": subject.to_numpy()[release],
+        "Content": content.to_numpy()[release],
+        "Name": _pick(rng, ["疫情中心", "急性組", "新聞組", "企劃組"], len(release)),
+    })
+
+def make_alert_tables(rng, n_rows):
+    """
+    Travel alert history (yyyy/m/d dates) and current file (ISO-8601 dates with timezone).
+    """
+    n_hist = int(n_rows * 0.9)
+    n_curr = n_rows - n_hist
+    names = [c[2] for c in COUNTRIES]
+
+    def frame(n, date_format):
+        effective = _dates(rng, n, "2011-01-01", "2025-12-31")
+        expires = effective + pd.to_timedelta(rng.integers(30, 400, n), unit="D")
+        if date_format == "slash":
+            fmt = lambda d: d.year.astype(str) + "/" + d.month.astype(str) + "/" + d.day.astype(str)
+        else:
+            fmt = lambda d: d.strftime("%Y-%m-%dT%H:%M:%S+08:00")
+        return pd.DataFrame({
+            "sent": fmt(effective),
+            "effective": fmt(effective),
+            "expires": fmt(expires),
+            "areaDesc": _pick(rng, names, n),
+            "severity_level": _pick(rng, ALERT_LEVELS, n),
+            "alert_disease": _pick(rng, ALERT_DISEASES, n),
+            "headline": "國際旅遊疫情建議",
+        })
+
+    return frame(n_hist, "slash"), frame(n_curr, "iso")
+
+def write_visitor_workbook(rng, path, n_years):
+    """
+    Visitor workbook with the two-row header (group / country) below two title rows.
+    """
+    countries = [
+        ("亞洲地區", "香港.澳門 HongKong. Macao"), ("亞洲地區", "日本 Japan"), ("亞洲地區", "韓國 Korea"),
+        ("東南亞地區", "馬來西亞 Malaysia"), ("東南亞地區", "新加坡 Singapore"), ("東南亞地區", "泰國 Thailand"),
+        ("東南亞地區", "越南 Vietnam"), ("東南亞地區", "東南亞其他地區 Others"), ("東南亞地區", "小計 Sub-Total"),
+        ("美洲地區", "美國 U.S.A."), ("美洲地區", "加拿大 Canada"), ("歐洲地區", "英國 U.K."), ("歐洲地區", "德國 Germany"),
+        ("大洋洲地區", "澳大利亞 Australia"), ("未列明 Unstated", ""), ("合計 Total", ""),
+    ]
+    header_1 = ["年別 Year"] + [c[0] for c in countries]
+    header_2 = [""] + [c[1] for c in countries]
+    years = [f"{2009 + i % 17}年 {2009 + i % 17}" for i in range(n_years)]
+    values = rng.integers(0, 3_000_000, (n_years, len(countries))).astype(str)
+    values[rng.random(values.shape) < 0.02] = "-"
+
+    rows = [["歷年來臺旅客按居住地分"], ["單位：人次"], header_1, header_2]
+    rows += [[year] + [f"{int(v):,}" if v != "-" else v for v in row] for year, row in zip(years, values)]
+    pd.DataFrame(rows).to_excel(path, header=False, index=False)
+
+def generate_synthetic_inputs(out_dir, scale=1, seed=4055):
+    """
+    Writes every input file at `scale` times the real volume into out_dir and returns their paths.
+    """
+    os.makedirs(out_dir, exist_ok=True)
+    rng = np.random.default_rng(seed)
+    paths = {
+        "epi_xlsx_path": os.path.join(out_dir, "WWWTable_Epidemics.xlsx"),
+        "tcdc_csv_path": os.path.join(out_dir, "TCDCIntlEpidAll.csv"),
+        "country_xlsx_path": os.path.join(out_dir, "03輔助用表_監測國家清單.xlsx"),
+        "transmission_xlsx_path": os.path.join(out_dir, "01總整_01國際疫情資料庫(2017-)_監測疾病清單.xlsx"),
+        "visitor_xlsx_path": os.path.join(out_dir, "表1-2-歷年來臺旅客按居住地分.xlsx"),
+        "press_xlsx_path": os.path.join(out_dir, "新聞稿.xlsx"),
+        "alert_history_path": os.path.join(out_dir, "TCDCTravelAlert_history.csv"),
+        "alert_path": os.path.join(out_dir, "TCDCTravelAlert.csv"),
+    }
+
+    df_country, df_region = make_country_tables()
+    with pd.ExcelWriter(paths["country_xlsx_path"]) as writer:
+        df_country.to_excel(writer, sheet_name="監測-WHO-ISO-外網國家清單對照表", index=False)
+        df_region.to_excel(writer, sheet_name="監測國家&區域清單", index=False)
+    make_transmission_table().to_excel(paths["transmission_xlsx_path"], index=False)
+
+    df_tcdc, df_epi = make_news_tables(rng, _volume("news_rows", scale))
+    df_tcdc.to_csv(paths["tcdc_csv_path"], index=False)
+    # At 100x the epidemics workbook no longer fits one sheet; news rows past the limit get no source
+    df_epi.head(EXCEL_MAX_ROWS).to_excel(paths["epi_xlsx_path"], index=False)
+
+    make_press_table(rng, _volume("press_rows", scale)).to_excel(paths["press_xlsx_path"], index=False)
+
+    df_hist, df_curr = make_alert_tables(rng, _volume("alert_rows", scale))
+    df_hist.to_csv(paths["alert_history_path"], index=False, encoding="cp950")
+    df_curr.to_csv(paths["alert_path"], index=False, encoding="utf-8-sig")
+
+    write_visitor_workbook(rng, paths["visitor_xlsx_path"], _volume("visitor_years", scale))
+    return paths
@@ -1 +1,22 @@
 # utils package
+# - submodules are loaded on first attribute access (import utils; utils.alert.get_combined_travel_alerts), so
+#   importing the package costs nothing and a job only pays for the modules it uses
+# - heavy optional dependencies (matplotlib, scipy, multiprocessing, profilers) are imported inside the
+#   functions that need them; benchmarks/import_time.py checks that the entry points stay free of them
+
+import importlib
+
+SUBMODULES = [
+    'aggregate_cube', 'alert', 'alert_index', 'cache', 'clean_press_data', 'clean_visitor_data', 'compact',
+    'country_name_mapping', 'data_loader', 'disease_name_mapping', 'figures', 'incremental', 'instrumentation',
+    'pheic', 'pheic_model', 'pipeline', 'press_classifier', 'press_index', 'press_prescreen', 'runner', 'tables',
+    'timeliness',
+]
+
+def __getattr__(name):
+    if name in SUBMODULES:
+        return importlib.import_module(f'{__name__}.{name}')
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+def __dir__():
+    return sorted(set(globals()) | set(SUBMODULES))
@@ -0,0 +1,137 @@
+import pandas as pd
+import numpy as np
+import os
+from utils.cache import write_entry, read_entry
+
+# Materialized count cube of the pipeline output (one row per country x disease report).
+# - cells are year x ISO year/week x disease x country x WHO region with the report count; name columns
+#   (English names, Chinese country names) depend on the codes and do not add cells
+# - year is the calendar year of date, as the notebook tables use; iso_year/iso_week follow the ISO calendar,
+#   so weekly tables can use (year, iso_week) as Table 1 does or (iso_year, iso_week) for true ISO weeks
+# - dimensions are categoricals; rollups group with observed=True, so only occurring combinations are visited
+# - rollups drop missing keys like groupby does by default; rows with a missing country or region still count
+#   in rollups that do not group by that dimension
+# - persisted as Parquet, pickle as fallback (utils.cache)
+
+DEFAULT_CUBE_PATH = 'output/cube/news_count_cube.parquet'
+
+TIME_DIMENSIONS = ['year', 'iso_year', 'iso_week']
+KEY_DIMENSIONS = ['disease_name', 'disease_name_en', 'country_iso3', 'country_name_zh', 'country_name_en',
+                  'WHO_region', 'WHO_region_en']
+CUBE_DIMENSIONS = TIME_DIMENSIONS + KEY_DIMENSIONS
+
+def build_count_cube(df):
+    """
+    Counts the rows of the pipeline output per cell of CUBE_DIMENSIONS (dimensions missing from df are skipped).
+    """
+    dates = pd.to_datetime(df['date'], errors='coerce')
+    iso = dates.dt.isocalendar()
+    frame = pd.DataFrame({
+        'year': dates.dt.year.astype('Int16'),
+        'iso_year': iso['year'].astype('Int16'),
+        'iso_week': iso['week'].astype('Int8'),
+    }, index=df.index)
+    for dim in KEY_DIMENSIONS:
+        if dim in df.columns:
+            frame[dim] = df[dim].astype('category')
+
+    dims = list(frame.columns)
+    cube = frame.groupby(dims, dropna=False, observed=True, sort=True).size().reset_index(name='count')
+    cube['count'] = cube['count'].astype('int64')
+    return cube
+
+def cube_dimensions(cube):
+    return [c for c in cube.columns if c != 'count']
+
+def slice_cube(cube, where=None):
+    """
+    Cells matching where, a dict of dimension -> value or list of values (e.g. {'year': range(2020, 2026)}).
+    """
+    if not where:
+        return cube
+    mask = np.ones(len(cube), dtype=bool)
+    for dim, values in where.items():
+        if np.ndim(values) == 0 and not isinstance(values, range):
+            mask &= (cube[dim] == values).to_numpy(dtype=bool, na_value=False)
+        else:
+            mask &= cube[dim].isin(list(values)).to_numpy()
+    return cube[mask]
+
+def rollup(cube, by, where=None, dropna=True):
+    """
+    Report counts grouped by the dimensions by (a name or list), after slice_cube(where).
+    Returns by + count, as df.groupby(by).size().reset_index(name='count') on the full data.
+    """
+    by = [by] if isinstance(by, str) else list(by)
+    cells = slice_cube(cube, where)
+    if not by:
+        return pd.DataFrame({'count': [int(cells['count'].sum())]})
+    out = cells.groupby(by, dropna=dropna, observed=True, sort=True)['count'].sum().reset_index()
+    for dim in by:
+        # categoricals back to plain values, as grouping the row-level frame gives
+        if isinstance(out[dim].dtype, pd.CategoricalDtype):
+            out[dim] = out[dim].astype(out[dim].cat.categories.dtype)
+    return out
+
+def rollup_pivot(cube, index, columns, where=None):
+    """
+    rollup as a wide table (index x columns, missing cells 0), e.g. year x disease for stacked area charts.
+    """
+    index = [index] if isinstance(index, str) else list(index)
+    columns = [columns] if isinstance(columns, str) else list(columns)
+    counts = rollup(cube, index + columns, where)
+    return counts.pivot_table(index=index, columns=columns, values='count', aggfunc='sum', fill_value=0)
+
+def weekly_mean_by_year(cube, week_columns=('year', 'iso_week'), where=None):
+    """
+    Mean weekly report count per year over the weeks with reports (Table 1 of the notebook groups by
+    calendar year and ISO week; pass ('iso_year', 'iso_week') for ISO years).
+    """
+    year_column, week_column = week_columns
+    weekly = rollup(cube, [year_column, week_column], where)
+    return weekly.groupby(year_column)['count'].mean().reset_index(name='mean_weekly_count')
+
+def shannon_entropy_by_year(cube, dim='disease_name', year_column='year', where=None):
+    """
+    Shannon entropy (natural log) of the dim distribution per year, as shannon_entropy of the notebook.
+    """
+    counts = rollup(cube, [year_column, dim], where)
+    p = counts['count'] / counts.groupby(year_column)['count'].transform('sum')
+    counts['term'] = -p * np.log(p)
+    return counts.groupby(year_column)['term'].sum().reset_index(name='shannon_entropy')
+
+def top_n_by_year(cube, n, dim='disease_name', year_column='year', where=None):
+    """
+    The n dim values with most reports per year (ties keep dim order), as the top-N disease heatmap.
+    """
+    counts = rollup(cube, [year_column, dim], where)
+    return (counts.sort_values([year_column, 'count'], ascending=[True, False])
+            .groupby(year_column).head(n).reset_index(drop=True))
+
+def iso_week_start(iso_year, iso_week):
+    """
+    Monday of each ISO week (NaT where missing), e.g. for weekly line charts from the cube.
+    """
+    iso_year = pd.Series(iso_year).astype('Int64').astype(str)
+    iso_week = pd.Series(iso_week).astype('Int64').astype(str).str.zfill(2)
+    return pd.to_datetime(iso_year + '-W' + iso_week + '-1', format='%G-W%V-%u', errors='coerce')
+
+def save_count_cube(cube, path=DEFAULT_CUBE_PATH):
+    """
+    Writes the cube as Parquet (pickle if that fails). Returns the written file path.
+    """
+    base = os.path.splitext(path)[0]
+    os.makedirs(os.path.dirname(base) or '.', exist_ok=True)
+    return os.path.join(os.path.dirname(base), write_entry(cube, base))
+
+def load_count_cube(path=DEFAULT_CUBE_PATH):
+    """
+    Reads a cube written by save_count_cube (the .pkl fallback is found from the .parquet path).
+    """
+    if not os.path.exists(path):
+        base = os.path.splitext(path)[0]
+        for ext in ('.parquet', '.pkl'):
+            if os.path.exists(base + ext):
+                path = base + ext
+                break
+    return read_entry(path)
@@ -1,25 +1,99 @@
 import pandas as pd
+import numpy as np
+import codecs
 import os
 
+# Travel alert loading.
+# - encodings are detected from a byte prefix (BOM, then strict decoding per candidate), so each file is read once
+# - dates are parsed per distinct value: values are grouped by detected format (yyyy/m/d, ISO-8601 with or
+#   without timezone) and every group is parsed with an explicit format; anything else falls back to
+#   format='mixed'. The result is datetime64 at midnight
+# - timezone-aware values are converted to UTC before the time is dropped, as before
+# - matplotlib is imported only by build_travel_disease_color_map, so loading alerts does not initialize it
+
+ENCODING_CANDIDATES = ['utf-8-sig', 'cp950']
+ENCODING_SNIFF_BYTES = 64 * 1024
+
+# Explicit formats per detected kind; other values (and values an explicit format rejects) use format='mixed'
+DATE_FORMATS = {
+    'slash': '%Y/%m/%d',   # yyyy/m/d
+    'iso': 'ISO8601',      # yyyy-mm-dd[Thh:mm:ss][+08:00]
+}
+
+def detect_date_format(values):
+    """
+    Format kind per string value: 'slash' for yyyy/m/d, 'iso' for ISO-8601, None otherwise.
+    Detection looks at the separator after the year only, so it is a few vectorized string ops.
+    """
+    sep = values.str.slice(4, 5)
+    kinds = pd.Series(None, index=values.index, dtype=object)
+    kinds[(sep == '/') & ~values.str.contains(' ', regex=False)] = 'slash'
+    kinds[sep == '-'] = 'iso'
+    return kinds
+
 def normalize_date_series(s, colname=""):
     """
     Robust date normalization:
     - handles yyyy/m/d
     - handles ISO-8601 with timezone
     - strips time & timezone
+    Returns datetime64[ns] (NaT where unparseable).
     """
-    parsed = pd.to_datetime(
-        s,
-        errors="coerce",
-        # infer_datetime_format has been deprecated in newer pandas versions 
-        # but matches user's request for robustness across different versions
-        infer_datetime_format=True,
-        utc=True    # 關鍵：先統一轉成 UTC
-    )
+    if pd.api.types.is_datetime64_any_dtype(s):
+        parsed = pd.to_datetime(s, utc=True)
+        return parsed.dt.tz_localize(None).dt.normalize()
+
+    # Alert dates repeat a lot: parse each distinct value once
+    codes, uniques = pd.factorize(s)
+    values = pd.Series(uniques, dtype=object).astype(str).str.strip()
+    parsed = pd.Series(pd.NaT, index=values.index, dtype='datetime64[ns, UTC]')
+    kinds = detect_date_format(values)
+    for kind, fmt in DATE_FORMATS.items():
+        hit = (kinds == kind).to_numpy()
+        if hit.any():
+            parsed[hit] = pd.to_datetime(values[hit], format=fmt, errors='coerce', utc=True)
+    remaining = parsed.isna() & (values != '')
+    if remaining.any():
+        parsed[remaining] = pd.to_datetime(values[remaining], format='mixed', errors='coerce', utc=True)
 
     # 去掉時區、只保留日期
-    return parsed.dt.tz_localize(None).dt.date
+    dates = parsed.dt.tz_localize(None).dt.normalize().to_numpy(dtype='datetime64[ns]')
+    result = np.full(len(codes), np.datetime64('NaT'), dtype='datetime64[ns]')
+    present = codes >= 0
+    result[present] = dates[codes[present]]
+    return pd.Series(result, index=s.index, name=s.name)
 
+def detect_encoding(file_path, candidates=ENCODING_CANDIDATES, n_bytes=ENCODING_SNIFF_BYTES):
+    """
+    Returns the first candidate encoding that strictly decodes the first n_bytes of the file
+    (a UTF-8 BOM picks utf-8-sig directly), or None if none does.
+    """
+    with open(file_path, 'rb') as f:
+        prefix = f.read(n_bytes)
+    if prefix.startswith(codecs.BOM_UTF8):
+        return 'utf-8-sig'
+    for enc in candidates:
+        try:
+            # incremental decoding, so a character cut at the end of the prefix is not an error
+            codecs.getincrementaldecoder(enc)().decode(prefix, final=False)
+            return enc
+        except UnicodeDecodeError:
+            continue
+    return None
+
+def read_csv_with_fallback(file_path, candidates=ENCODING_CANDIDATES):
+    """
+    Reads a csv once with the sniffed encoding; the other candidates are only tried if that read fails
+    on bytes past the sniffed prefix.
+    """
+    detected = detect_encoding(file_path, candidates)
+    encodings = ([detected] if detected else []) + [enc for enc in candidates if enc != detected]
+    for enc in encodings:
+        try:
+            return pd.read_csv(file_path, encoding=enc)
+        except UnicodeDecodeError:
+            continue
+    raise UnicodeError(f"Unable to read {file_path} with {' or '.join(candidates)}.")
 
 def get_combined_travel_alerts(
     alert_history_path="data/TCDCTravelAlert_history.csv",
@@ -28,16 +102,6 @@ def get_combined_travel_alerts(
     """
     Modularized function to read, clean, and combine travel alert data.
     """
-    # === 1. Read separately ===
-    # Use encoding='utf-8-sig' to handle potential Chinese characters/BOM in files
-    def read_csv_with_fallback(file_path):
-        for enc in ['utf-8-sig', 'cp950']:
-            try:
-                return pd.read_csv(file_path, encoding=enc)
-            except UnicodeDecodeError:
-                continue
-        # If both fail, try one last resort 'latin1' or raise error
-        raise UnicodeDecodeError(f"Unable to read {file_path} with utf-8 or cp950.")
     # === 1. Read separately === 
     df_hist = read_csv_with_fallback(alert_history_path)
     df_curr = read_csv_with_fallback(alert_path)
@@ -116,10 +180,6 @@ def standardize_alert_disease(s: pd.Series) -> pd.Series:
 
 
 ### new color map for alert diseases
-from matplotlib import cm
-import pandas as pd
-import numpy as np
-
 def build_travel_disease_color_map(
     base_color_map,
     alert_diseases,
@@ -142,7 +202,8 @@ def build_travel_disease_color_map(
         return color_map
 
     # 用一個連續色盤，永遠夠
-    cmap = cm.get_cmap("viridis")
+    import matplotlib
+    cmap = matplotlib.colormaps["viridis"]
     colors = cmap(np.linspace(0.15, 0.85, len(missing)))
 
     for d, c in zip(missing, colors):
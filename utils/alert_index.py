@@ -0,0 +1,161 @@
+import pandas as pd
+import numpy as np
+from utils.country_name_mapping import build_country_mappings, extract_country_iso3_series
+
+# Point-in-time index of travel alert levels (get_combined_travel_alerts output).
+# - areaDesc is normalized to ISO3 with the country variations of build_country_mappings; an area naming several
+#   countries applies to each of them, areas without a country (e.g. 全球) keep areaDesc as their key
+# - one segment per alert: [effective, end) with end = expires or the next alert for the same area and disease,
+#   whichever comes first; 解除 only ends the running segment
+# - per area the segments are merged into a step function of the highest level over all diseases; the change
+#   points of all areas sit in one array sorted by (area, day), so any lookup is one vectorized searchsorted
+# - dates are whole days (alert dates carry no time)
+
+ALERT_LEVEL_PATTERNS = {'第一級': 1, '第二級': 2, '第三級': 3, '解除': 0}
+
+def alert_level_codes(severity_level):
+    """
+    Numeric level per severity_level label (第一級 1, 第二級 2, 第三級 3, 解除 0; NaN when unknown).
+    """
+    s = severity_level.astype(str)
+    levels = pd.Series(np.nan, index=severity_level.index)
+    for prefix, level in ALERT_LEVEL_PATTERNS.items():
+        levels[s.str.contains(prefix, regex=False).to_numpy()] = level
+    return levels
+
+def _to_days(values):
+    dates = pd.to_datetime(pd.Series(values), errors='coerce').to_numpy(dtype='datetime64[D]')
+    return dates
+
+def build_alert_segments(df_alert_all, country_mapping_df=None, disease_column='alert_disease'):
+    """
+    Alert segments with columns area_key, areaDesc, disease, level, start, end (NaT end = open).
+    Without country_mapping_df areaDesc itself is the key.
+    """
+    df = df_alert_all[['areaDesc', disease_column, 'severity_level', 'effective', 'expires']].copy()
+    df = df.rename(columns={disease_column: 'disease'})
+    df['level'] = alert_level_codes(df['severity_level'])
+    df['start'] = pd.to_datetime(df['effective'], errors='coerce')
+    df['expires'] = pd.to_datetime(df['expires'], errors='coerce')
+    df = df[df['start'].notna() & df['level'].notna()]
+
+    if country_mapping_df is not None:
+        sorted_mapping, _, _ = build_country_mappings(country_mapping_df)
+        areas = pd.Series(df['areaDesc'].unique())
+        iso3 = extract_country_iso3_series(areas, sorted_mapping)
+        keys = {area: codes if codes else [area] for area, codes in zip(areas, iso3)}
+        df['area_key'] = df['areaDesc'].map(keys)
+        df = df.explode('area_key')
+    else:
+        df['area_key'] = df['areaDesc']
+
+    # Stable sort keeps file order for alerts of the same day
+    df = df.sort_values(['area_key', 'disease', 'start'], kind='stable').reset_index(drop=True)
+    next_start = df.groupby(['area_key', 'disease'], sort=False)['start'].shift(-1)
+    df['end'] = df['expires'].where(df['expires'].notna() & ((df['expires'] < next_start) | next_start.isna()), next_start)
+    segments = df[(df['level'] > 0) & (df['end'].isna() | (df['end'] > df['start']))]
+    segments = segments[['area_key', 'areaDesc', 'disease', 'level', 'start', 'end']].reset_index(drop=True)
+    segments['level'] = segments['level'].astype(int)
+    return segments
+
+class AlertLevelIndex:
+    """
+    Highest alert level per area and day. Use as
+        index = AlertLevelIndex.from_alerts(df_alert_all, country_mapping_df)
+        index.level_at('THA', '2024-07-01')
+        index.areas_at_level('2024-07-01', min_level=2)
+        index.levels_at(df['country_iso3'], df['date'])
+    """
+    def __init__(self, segments):
+        self.segments = segments
+        codes, self.keys = pd.factorize(segments['area_key'])
+        self.keys = pd.Index(self.keys)
+        starts = _to_days(segments['start'])
+        ends = _to_days(segments['end'])
+        levels = segments['level'].to_numpy(dtype=int)
+
+        # +1 / -1 events per level; open segments never close
+        closed = ~np.isnat(ends)
+        event_code = np.concatenate([codes, codes[closed]])
+        event_day = np.concatenate([starts, ends[closed]]).astype('int64')
+        event_level = np.concatenate([levels, levels[closed]])
+        event_delta = np.concatenate([np.ones(len(starts), dtype=int), -np.ones(int(closed.sum()), dtype=int)])
+
+        order = np.lexsort((event_day, event_code))
+        event_code, event_day = event_code[order], event_day[order]
+        active = np.zeros((len(order), 4), dtype=int)
+        active[np.arange(len(order)), event_level[order]] = event_delta[order]
+        active = pd.DataFrame(active).groupby(event_code).cumsum().to_numpy()
+        # highest level with an active segment after each event
+        step_level = np.where(active[:, 3] > 0, 3, np.where(active[:, 2] > 0, 2, np.where(active[:, 1] > 0, 1, 0)))
+
+        # keep the state after the last event of each (area, day), then drop repeats of the same level
+        last = np.ones(len(order), dtype=bool)
+        last[:-1] = (event_code[1:] != event_code[:-1]) | (event_day[1:] != event_day[:-1])
+        code, day, level = event_code[last], event_day[last], step_level[last]
+        change = np.ones(len(code), dtype=bool)
+        change[1:] = (code[1:] != code[:-1]) | (level[1:] != level[:-1])
+        self._code, self._day, self._level = code[change], day[change], level[change]
+
+        self._day0 = int(self._day.min()) if len(self._day) else 0
+        self._stride = (int(self._day.max()) - self._day0 + 2) if len(self._day) else 1
+        self._composite = self._code.astype('int64') * self._stride + (self._day - self._day0)
+
+    @classmethod
+    def from_alerts(cls, df_alert_all, country_mapping_df=None, disease_column='alert_disease'):
+        return cls(build_alert_segments(df_alert_all, country_mapping_df, disease_column))
+
+    def levels_at(self, keys, dates):
+        """
+        Highest level per (key, date) pair of two aligned arrays (or one scalar broadcast against an array);
+        0 for no alert, unknown keys or missing dates.
+        """
+        keys, dates = np.broadcast_arrays(np.asarray(keys, dtype=object), _to_days(np.atleast_1d(dates)))
+        keys, dates = keys.ravel(), dates.ravel()
+        codes = self.keys.get_indexer(keys) if len(self.keys) else np.full(len(keys), -1)
+        days = dates.astype('int64') - self._day0
+        valid = (codes >= 0) & ~np.isnat(dates)
+        # a day before the first change point of the key lands in the previous key: checked below
+        days = np.clip(days, -1, self._stride - 1)
+        pos = np.searchsorted(self._composite, codes.astype('int64') * self._stride + days, side='right') - 1
+        found = valid & (pos >= 0)
+        found[found] &= self._code[pos[found]] == codes[found]
+        levels = np.zeros(len(codes), dtype=int)
+        levels[found] = self._level[pos[found]]
+        return levels
+
+    def level_at(self, key, date):
+        """
+        Highest alert level of one area on one date.
+        """
+        return int(self.levels_at([key], [date])[0])
+
+    def areas_at_level(self, date, min_level=2):
+        """
+        Area keys with an alert level >= min_level on date.
+        """
+        levels = self.levels_at(self.keys.to_numpy(dtype=object), date)
+        return self.keys[levels >= min_level].tolist()
+
+    def level_grid(self, keys, dates):
+        """
+        keys x dates table of alert levels.
+        """
+        keys = list(keys)
+        dates = pd.to_datetime(pd.Series(list(dates)))
+        levels = self.levels_at(np.repeat(np.asarray(keys, dtype=object), len(dates)), np.tile(dates.to_numpy(), len(keys)))
+        return pd.DataFrame(levels.reshape(len(keys), len(dates)), index=keys, columns=dates)
+
+    def active_segments(self, key, date):
+        """
+        Alert segments of one area running on date (all diseases).
+        """
+        date = pd.Timestamp(date)
+        seg = self.segments[self.segments['area_key'] == key]
+        return seg[(seg['start'] <= date) & (seg['end'].isna() | (seg['end'] > date))]
+
+def attach_alert_levels(df, index, key_column='country_iso3', date_column='date'):
+    """
+    Alert level of each row's country on the row's date (e.g. the pipeline output), aligned to df.
+    """
+    return pd.Series(index.levels_at(df[key_column].to_numpy(dtype=object), df[date_column]), index=df.index, name='alert_level')
@@ -0,0 +1,151 @@
+import pandas as pd
+import hashlib
+import importlib.util
+import json
+import os
+import time
+
+# Content-addressed cache for raw input files.
+# - key = hash of the file content + reader + sheet name (+ reader options)
+# - entries are stored as Parquet; columns pyarrow cannot hold (e.g. mixed int/str object columns)
+#   or a missing pyarrow fall back to pickle, which round-trips any DataFrame exactly
+# - a manifest keeps track of entries for invalidation and least-recently-used eviction
+
+DEFAULT_CACHE_DIR = 'cache/raw_data'
+DEFAULT_MAX_BYTES = 512 * 1024 ** 2
+MANIFEST_NAME = 'manifest.json'
+
+def file_content_hash(file_path, chunk_size=1024 ** 2):
+    """
+    Returns the SHA-256 hex digest of a file's content.
+    """
+    digest = hashlib.sha256()
+    with open(file_path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def module_source_hash(module_name):
+    """
+    Hash of a module's source file, found without importing it ('missing' if there is none).
+    """
+    spec = importlib.util.find_spec(module_name)
+    if spec is None or not spec.origin or not os.path.exists(spec.origin):
+        return 'missing'
+    return file_content_hash(spec.origin)
+
+def _load_manifest(cache_dir):
+    manifest_path = os.path.join(cache_dir, MANIFEST_NAME)
+    if not os.path.exists(manifest_path):
+        return {}
+    try:
+        with open(manifest_path, encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        # A corrupt manifest only loses bookkeeping; entries are rebuilt on demand
+        return {}
+
+def _save_manifest(cache_dir, manifest):
+    manifest_path = os.path.join(cache_dir, MANIFEST_NAME)
+    tmp_path = manifest_path + '.tmp'
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, ensure_ascii=False, indent=1)
+    os.replace(tmp_path, manifest_path)
+
+def _remove_entry(cache_dir, manifest, entry_name):
+    entry_path = os.path.join(cache_dir, entry_name)
+    if os.path.exists(entry_path):
+        os.remove(entry_path)
+    manifest.pop(entry_name, None)
+
+def write_entry(df, entry_base):
+    """
+    Writes df as Parquet, falling back to pickle. Returns the file name written.
+    """
+    try:
+        df.to_parquet(entry_base + '.parquet')
+        return os.path.basename(entry_base) + '.parquet'
+    except Exception:
+        # ImportError (no pyarrow) or Arrow conversion errors on mixed-type columns
+        if os.path.exists(entry_base + '.parquet'):
+            os.remove(entry_base + '.parquet')
+    df.to_pickle(entry_base + '.pkl')
+    return os.path.basename(entry_base) + '.pkl'
+
+def read_entry(entry_path):
+    """
+    Reads a file written by write_entry.
+    """
+    if entry_path.endswith('.parquet'):
+        return pd.read_parquet(entry_path)
+    return pd.read_pickle(entry_path)
+
+def enforce_cache_size(cache_dir=DEFAULT_CACHE_DIR, max_bytes=DEFAULT_MAX_BYTES):
+    """
+    Evicts least recently used entries until the cache holds at most max_bytes.
+    """
+    manifest = _load_manifest(cache_dir)
+    total = sum(entry['bytes'] for entry in manifest.values())
+    for entry_name, entry in sorted(manifest.items(), key=lambda x: x[1]['last_used']):
+        if total <= max_bytes:
+            break
+        total -= entry['bytes']
+        _remove_entry(cache_dir, manifest, entry_name)
+    _save_manifest(cache_dir, manifest)
+
+def invalidate_cache(file_path=None, cache_dir=DEFAULT_CACHE_DIR):
+    """
+    Removes cached entries of one input file (any content version), or all entries when file_path is None.
+    """
+    if not os.path.isdir(cache_dir):
+        return
+    manifest = _load_manifest(cache_dir)
+    target = os.path.abspath(file_path) if file_path is not None else None
+    for entry_name in list(manifest):
+        if target is None or manifest[entry_name]['path'] == target:
+            _remove_entry(cache_dir, manifest, entry_name)
+    _save_manifest(cache_dir, manifest)
+
+def cached_read(reader, file_path, cache_dir=DEFAULT_CACHE_DIR, max_bytes=DEFAULT_MAX_BYTES, **kwargs):
+    """
+    Reads file_path with pd.read_excel (reader='excel') or pd.read_csv (reader='csv'),
+    serving the result from the cache when the file content and options are unchanged.
+    """
+    read_functions = {'excel': pd.read_excel, 'csv': pd.read_csv}
+    if reader not in read_functions:
+        raise ValueError(f"Unsupported reader: {reader}")
+
+    content_hash = file_content_hash(file_path)
+    options = json.dumps(kwargs, sort_keys=True, ensure_ascii=False, default=str)
+    key = hashlib.sha256(f"{content_hash}|{reader}|{options}".encode('utf-8')).hexdigest()[:32]
+
+    os.makedirs(cache_dir, exist_ok=True)
+    manifest = _load_manifest(cache_dir)
+
+    entry_name = next((name for name in manifest if name.startswith(key)), None)
+    if entry_name is not None:
+        entry_path = os.path.join(cache_dir, entry_name)
+        try:
+            df = read_entry(entry_path)
+            manifest[entry_name]['last_used'] = time.time()
+            _save_manifest(cache_dir, manifest)
+            return df
+        except Exception:
+            # Unreadable entry: drop it and parse the source again
+            _remove_entry(cache_dir, manifest, entry_name)
+
+    df = read_functions[reader](file_path, **kwargs)
+
+    entry_name = write_entry(df, os.path.join(cache_dir, key))
+    manifest[entry_name] = {
+        'path': os.path.abspath(file_path),
+        'content_hash': content_hash,
+        'reader': reader,
+        'options': options,
+        'bytes': os.path.getsize(os.path.join(cache_dir, entry_name)),
+        'last_used': time.time()
+    }
+    _save_manifest(cache_dir, manifest)
+    enforce_cache_size(cache_dir, max_bytes)
+
+    return df
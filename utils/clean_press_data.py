@@ -2,7 +2,15 @@ import pandas as pd
 import os
 import numpy as np
 
-def get_cleaned_press_data(file_path='data/新聞稿_20251229_fill_until_20251231.xlsx', research_end_date='2025-12-31'):
+# Press release cleaning.
+# - releases listed once per publishing unit (Name) are merged into one row per (PublishTime date, Subject, Content)
+# - vectorized=True is a faster path with identical output: HTML is stripped once per distinct Content, rows are
+#   grouped on a 64-bit hash of the three keys instead of the long text, names are joined only for groups with
+#   several units, and PublishTime stays datetime64 (normalized to the day) throughout
+
+PATTERN_HTML_TAG = r'<[^>]+>'
+
+def get_cleaned_press_data(file_path='data/新聞稿_20251229_fill_until_20251231.xlsx', research_end_date='2025-12-31', vectorized=False):
     """
     Returns a DataFrame with columns: 'Index', 'PublishTime', 'Subject', 'Content', 'Name_merged', and 'Sampled'.
     """
@@ -11,8 +19,11 @@ def get_cleaned_press_data(file_path='data/新聞稿_20251229_fill_until_2025123
 
     # 1. Load and Clean (Standard steps)
     df_press = pd.read_excel(file_path)
+    if vectorized:
+        return _finalize_press_table(_merge_press_names_vectorized(df_press, research_end_date))
+
     df_press['PublishTime'] = pd.to_datetime(df_press['PublishTime']).dt.date
-    df_press['Content'] = df_press['Content'].str.replace(r'<[^>]+>', '', regex=True).str.strip()
+    df_press['Content'] = df_press['Content'].str.replace(PATTERN_HTML_TAG, '', regex=True).str.strip()
 
     # 2. Filter by date
     end_date = pd.to_datetime(research_end_date).date()
@@ -24,6 +35,61 @@ def get_cleaned_press_data(file_path='data/新聞稿_20251229_fill_until_2025123
         .apply(lambda x: '、'.join(x.unique()))
     ).rename(columns={'Name': 'Name_merged'})
 
+    return _finalize_press_table(df_press_cleaned)
+
+def _strip_html_series(content):
+    """
+    content.str.replace(PATTERN_HTML_TAG, '').str.strip(), evaluated once per distinct value.
+    """
+    codes, uniques = pd.factorize(content)
+    cleaned = pd.Series(uniques, dtype=object).str.replace(PATTERN_HTML_TAG, '', regex=True).str.strip().to_numpy(dtype=object)
+    result = np.full(len(codes), np.nan, dtype=object)
+    present = codes >= 0
+    result[present] = cleaned[codes[present]]
+    return pd.Series(result, index=content.index, dtype=object)
+
+def _merge_press_names_vectorized(df_press, research_end_date):
+    """
+    Steps 1-3 of get_cleaned_press_data: one row per (PublishTime, Subject, Content) with Name_merged,
+    in the same order as the sorted groupby.
+    """
+    publish = pd.to_datetime(df_press['PublishTime']).dt.normalize()
+
+    # 2. Filter by date (rows with a missing key are dropped by the groupby as well)
+    content = _strip_html_series(df_press['Content'])
+    keep = ((publish <= pd.to_datetime(research_end_date).normalize())
+            & df_press['Subject'].notna() & content.notna()).to_numpy()
+    keys = pd.DataFrame({
+        'PublishTime': publish[keep],
+        'Subject': df_press.loc[keep, 'Subject'],
+        'Content': content[keep],
+    }).reset_index(drop=True)
+    names = df_press.loc[keep, 'Name'].reset_index(drop=True)
+
+    # 3. Group on a hash of the keys; groups numbered in order of first appearance
+    group, _ = pd.factorize(pd.util.hash_pandas_object(keys, index=False))
+    first_row = pd.Series(np.arange(len(group))).groupby(group, sort=False).first().to_numpy()
+    df_groups = keys.iloc[first_row].reset_index(drop=True)
+
+    # unique names per group in order of appearance; only groups with several names need a join
+    df_names = pd.DataFrame({'group': group, 'Name': names}).drop_duplicates().sort_values('group', kind='stable')
+    name_values = df_names['Name'].to_numpy(dtype=object)
+    bounds = np.searchsorted(df_names['group'].to_numpy(), np.arange(len(first_row) + 1))
+    merged = name_values[bounds[:-1]].copy()
+    for g in np.flatnonzero(np.diff(bounds) > 1):
+        merged[g] = '、'.join(name_values[bounds[g]:bounds[g + 1]])
+    df_groups['Name_merged'] = merged
+
+    # groupby order: PublishTime, then Subject, then Content (string order of the distinct values)
+    subject_rank = pd.factorize(df_groups['Subject'], sort=True)[0]
+    content_rank = pd.factorize(df_groups['Content'], sort=True)[0]
+    order = np.lexsort((content_rank, subject_rank, df_groups['PublishTime'].to_numpy()))
+    return df_groups.iloc[order].reset_index(drop=True)
+
+def _finalize_press_table(df_press_cleaned):
+    """
+    Steps 4-6 of get_cleaned_press_data on the merged table.
+    """
     # 4. Add Sequential Index (1, 2, 3...)
     # reset_index makes sure the numbers are continuous after the previous filtering/grouping
     df_press_cleaned = df_press_cleaned.reset_index(drop=True)
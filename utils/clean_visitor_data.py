@@ -1,165 +1,212 @@
 import pandas as pd
+import numpy as np
+import functools
 import os
 
-def get_processed_visitor_data(file_path='data/表1-2-歷年來臺旅客按居住地分.xlsx', n_top_countries_selected=15):
+# Visitor arrivals by residence (two-row-header workbook of the Tourism Administration).
+# - the sheet is parsed once per file version (path, mtime, size) into one long table shared by
+#   get_processed_visitor_data, clean_visitor_data and the top-N helpers
+# - the long table keeps the raw year label next to an integer year, and country / iso3 as categoricals
+# - top-N per year works on the dense year x country matrix with argpartition; ties keep the country
+#   order of the previous sort-then-head implementation
+
+DEFAULT_VISITOR_PATH = 'data/表1-2-歷年來臺旅客按居住地分.xlsx'
+EXCLUDE_KEYWORDS = '合計|小計|總計'
+
+VISITOR_COUNTRY_TO_ISO3 = {
+    '香港.澳門 HongKong. Macao': 'HKG',
+    '大陸 Mainland China': 'CHN',
+    '日本 Japan': 'JPN',
+    '韓國 Korea': 'KOR',
+    '印度 India': 'IND',
+    '中東 Middle East': None,
+    '東南亞地區_馬來西亞 Malaysia': 'MYS',
+    '東南亞地區_新加坡 Singapore': 'SGP',
+    '東南亞地區_印尼 Indonesia': 'IDN',
+    '東南亞地區_菲律賓 Philippines': 'PHL',
+    '東南亞地區_泰國 Thailand': 'THA',
+    '東南亞地區_越南 Vietnam': 'VNM',
+    '東南亞地區_東南亞其他地區 Others': None,
+    '亞洲其他地區 Others': None,
+    '加拿大 Canada': 'CAN',
+    '美國 U.S.A.': 'USA',
+    '墨西哥 Mexico': 'MEX',
+    '巴西 Brazil': 'BRA',
+    '阿根廷 Argentina': 'ARG',
+    '美洲其他地區 Others': None,
+    '比利時 Belgium': 'BEL',
+    '法國 France': 'FRA',
+    '德國 Germany': 'DEU',
+    '義大利 Italy': 'ITA',
+    '荷蘭 Netherlands': 'NLD',
+    '瑞士 Switzerland': 'CHE',
+    '西班牙 Spain': 'ESP',
+    '英國 U.K.': 'GBR',
+    '奧地利 Austria': 'AUT',
+    '希臘 Greece': 'GRC',
+    '瑞典 Sweden': 'SWE',
+    '俄羅斯 Russian': 'RUS',
+    '歐洲其他地區 Others': None,
+    '澳大利亞 Australia': 'AUS',
+    '紐西蘭 New Zealand': 'NZL',
+    '大洋洲其他地區 Others': None,
+    '南非 S. Africa': 'ZAF',
+    '非洲其他地區 Others': None,
+    '未列明 Unstated': None
+}
+
+def _combine_headers(header_row1, header_row2):
+    combined_headers = []
+    for h1, h2 in zip(header_row1.ffill(), header_row2.fillna("")):
+        h1_str, h2_str = str(h1).strip(), str(h2).strip()
+        combined_headers.append(h1_str if h1_str == h2_str or h2_str == "" else f"{h1_str}_{h2_str}")
+    return combined_headers
+
+@functools.lru_cache(maxsize=4)
+def _parse_visitor_workbook(file_path, mtime_ns, size):
     """
-    Fully modularized function to process visitor data.
-    Returns:
-        df_visit_by_year_flat: Grouped by year, contains lists of top countries and ISO3s.
-        df_visit_flat_all_years: Aggregate over all years, top countries and ISO3s.
+    Reads and melts the workbook; cached per file version.
+    """
+    df_raw = pd.read_excel(file_path, header=None, skiprows=2)
+    df = df_raw.iloc[2:].copy()
+    df.columns = _combine_headers(df_raw.iloc[0], df_raw.iloc[1])
+    year_col = df.columns[0]
+    df_long = df.melt(id_vars=[year_col], var_name='country', value_name='passengers')
+    df_long = df_long.rename(columns={year_col: 'year_label'})
+
+    df_long['passengers'] = pd.to_numeric(
+        df_long['passengers'].astype(str).str.replace(',', ''), errors='coerce'
+    ).fillna(0).astype(int)
+    # Year: last 4 digits of the label, e.g. "2019年 2019"
+    df_long['year'] = pd.to_numeric(
+        df_long['year_label'].where(df_long['year_label'].notna()).astype(str).str[-4:], errors='coerce'
+    ).astype('Int16')
+    df_long['is_total'] = df_long['country'].str.contains(EXCLUDE_KEYWORDS, na=False)
+    df_long['iso3'] = df_long['country'].map(VISITOR_COUNTRY_TO_ISO3).astype('category')
+    df_long['country'] = df_long['country'].astype('category')
+    return df_long
+
+def load_visitor_table(file_path=DEFAULT_VISITOR_PATH):
+    """
+    Long visitor table: year_label (raw), year (Int16), country and iso3 (categorical), passengers, is_total
+    (subtotal / total columns). Parsed once per file version; a copy is returned.
     """
     if not os.path.exists(file_path):
         raise FileNotFoundError(f"File not found: {file_path}")
+    stat = os.stat(file_path)
+    return _parse_visitor_workbook(os.path.abspath(file_path), stat.st_mtime_ns, stat.st_size).copy()
 
-    # 1. Read and initial cleaning
-    df_visit_raw = pd.read_excel(file_path, header=None, skiprows=2)
-    
-    header_row1 = df_visit_raw.iloc[0].ffill()
-    header_row2 = df_visit_raw.iloc[1].fillna("")
-    
-    combined_headers = []
-    for h1, h2 in zip(header_row1, header_row2):
-        h1_str = str(h1).strip()
-        h2_str = str(h2).strip()
-        if h1_str == h2_str or h2_str == "":
-            combined_headers.append(h1_str)
-        else:
-            combined_headers.append(f"{h1_str}_{h2_str}")
-            
-    df_visit = df_visit_raw.iloc[2:].copy()
-    df_visit.columns = combined_headers
-    
-    year_col = df_visit.columns[0]
-    
-    # 2. Reshape to long table
-    df_visit_long = df_visit.melt(id_vars=[year_col], var_name='country', value_name='passengers')
-    df_visit_long = df_visit_long.rename(columns={year_col: 'year'})
-    
-    # 3. Data Cleanup
-    df_visit_long['passengers'] = pd.to_numeric(
-        df_visit_long['passengers'].astype(str).str.replace(',', '').replace('-', '0'), 
-        errors='coerce'
-    ).fillna(0).astype(int)
-    
-    # Extract year (last 4 digits)
-    df_visit_long = df_visit_long.dropna(subset=['year'])
-    df_visit_long['year'] = df_visit_long['year'].astype(str).str[-4:].astype(int)
-
-    # Exclude keywords
-    exclude_keywords = '合計|小計|總計'
-    df_visit_long_clean = df_visit_long[
-        ~df_visit_long['country'].str.contains(exclude_keywords, na=False)
-    ].copy()
-
-    # 4. ISO3 Mapping
-    country_to_iso3 = {
-        '香港.澳門 HongKong. Macao': 'HKG',
-        '大陸 Mainland China': 'CHN',
-        '日本 Japan': 'JPN',
-        '韓國 Korea': 'KOR',
-        '印度 India': 'IND',
-        '中東 Middle East': None,
-        '東南亞地區_馬來西亞 Malaysia': 'MYS',
-        '東南亞地區_新加坡 Singapore': 'SGP',
-        '東南亞地區_印尼 Indonesia': 'IDN',
-        '東南亞地區_菲律賓 Philippines': 'PHL',
-        '東南亞地區_泰國 Thailand': 'THA',
-        '東南亞地區_越南 Vietnam': 'VNM',
-        '東南亞地區_東南亞其他地區 Others': None,
-        '亞洲其他地區 Others': None,
-        '加拿大 Canada': 'CAN',
-        '美國 U.S.A.': 'USA',
-        '墨西哥 Mexico': 'MEX',
-        '巴西 Brazil': 'BRA',
-        '阿根廷 Argentina': 'ARG',
-        '美洲其他地區 Others': None,
-        '比利時 Belgium': 'BEL',
-        '法國 France': 'FRA',
-        '德國 Germany': 'DEU',
-        '義大利 Italy': 'ITA',
-        '荷蘭 Netherlands': 'NLD',
-        '瑞士 Switzerland': 'CHE',
-        '西班牙 Spain': 'ESP',
-        '英國 U.K.': 'GBR',
-        '奧地利 Austria': 'AUT',
-        '希臘 Greece': 'GRC',
-        '瑞典 Sweden': 'SWE',
-        '俄羅斯 Russian': 'RUS',
-        '歐洲其他地區 Others': None,
-        '澳大利亞 Australia': 'AUS',
-        '紐西蘭 New Zealand': 'NZL',
-        '大洋洲其他地區 Others': None,
-        '南非 S. Africa': 'ZAF',
-        '非洲其他地區 Others': None,
-        '未列明 Unstated': None
-    }
-
-    # 5. Process Yearly Data
-    df_visit_year_country = (
-        df_visit_long_clean
-        .groupby(['year', 'country'], as_index=False)['passengers']
-        .sum()
-    )
+def visitor_year_matrix(df_visit_long):
+    """
+    Dense year x country passenger sums without subtotal rows (countries in sorted order).
+    """
+    clean = df_visit_long[~df_visit_long['is_total'] & df_visit_long['year'].notna()]
+    matrix = clean.pivot_table(index='year', columns='country', values='passengers', aggfunc='sum',
+                               fill_value=0, observed=True)
+    matrix.index = matrix.index.astype(int)
+    matrix.columns = matrix.columns.astype(str)
+    return matrix.sort_index(axis=1)
 
-    df_by_year_visiting_country = (
-        df_visit_year_country
-        .sort_values(['year', 'passengers'], ascending=[True, False])
-        .groupby('year')
-        .head(n_top_countries_selected)
-        .reset_index(drop=True)
-    )
+def _top_n_positions(values, n):
+    """
+    Column positions of the n largest values per row, largest first; ties go to the lower position.
+    """
+    n = min(n, values.shape[1])
+    if n <= 0:
+        return np.empty((values.shape[0], 0), dtype=int)
+    # unique keys: passengers first, then earlier column wins
+    keys = values.astype('int64') * values.shape[1] + (values.shape[1] - 1 - np.arange(values.shape[1]))
+    part = np.argpartition(-keys, n - 1, axis=1)[:, :n]
+    order = np.argsort(-np.take_along_axis(keys, part, axis=1), axis=1)
+    return np.take_along_axis(part, order, axis=1)
 
-    df_iso = df_by_year_visiting_country.copy()
-    df_iso['iso3'] = df_iso['country'].map(country_to_iso3)
+def top_n_visitor_countries(df_visit_long, n=15, matrix=None):
+    """
+    Top n countries by passengers per year as a long table: year, rank, country, iso3, passengers.
+    Pass matrix (visitor_year_matrix) to reuse it across several n.
+    """
+    matrix = visitor_year_matrix(df_visit_long) if matrix is None else matrix
+    values = matrix.to_numpy()
+    pos = _top_n_positions(values, n)
+    countries = matrix.columns.to_numpy()[pos]
+    top = pd.DataFrame({
+        'year': np.repeat(matrix.index.to_numpy(), pos.shape[1]),
+        'rank': np.tile(np.arange(1, pos.shape[1] + 1), len(matrix)),
+        'country': countries.ravel(),
+        'passengers': np.take_along_axis(values, pos, axis=1).ravel(),
+    })
+    top['iso3'] = top['country'].map(VISITOR_COUNTRY_TO_ISO3)
+    return top
 
+def get_processed_visitor_data(file_path=DEFAULT_VISITOR_PATH, n_top_countries_selected=15):
+    """
+    Fully modularized function to process visitor data.
+    Returns:
+        df_visit_by_year_flat: Grouped by year, contains lists of top countries and ISO3s.
+        df_visit_flat_all_years: Aggregate over all years, top countries and ISO3s.
+    """
+    df_visit_long = load_visitor_table(file_path)
+    matrix = visitor_year_matrix(df_visit_long)
+
+    # Yearly top N
+    top = top_n_visitor_countries(df_visit_long, n_top_countries_selected, matrix)
     df_visit_by_year_flat = (
-        df_iso
-        .sort_values(['year', 'passengers'], ascending=[True, False])
-        .groupby('year')
-        .agg(
-            country=('country', list),
-            iso3=('iso3', list)
-        )
+        top.groupby('year')
+        .agg(country=('country', list), iso3=('iso3', list))
         .reset_index()
     )
 
-    # 6. Process All-Time Data
-    df_visit_all_years_country = (
-        df_visit_long_clean
-        .groupby('country', as_index=False)['passengers']
-        .sum()
-    )
-
-    df_visit_top_all_years = (
-        df_visit_all_years_country
-        .sort_values('passengers', ascending=False)
-        .head(n_top_countries_selected)
-        .reset_index(drop=True)
-    )
-
-    df_visit_top_all_years['iso3'] = df_visit_top_all_years['country'].map(country_to_iso3)
-
+    # All-time top N
+    totals = matrix.sum(axis=0).to_numpy()[None, :]
+    pos = _top_n_positions(totals, n_top_countries_selected)[0]
+    top_countries = matrix.columns[pos].tolist()
     df_visit_flat_all_years = pd.DataFrame({
-        'country': [df_visit_top_all_years['country'].tolist()],
-        'iso3': [df_visit_top_all_years['iso3'].tolist()]
+        'country': [top_countries],
+        'iso3': [pd.Series(top_countries).map(VISITOR_COUNTRY_TO_ISO3).tolist()]
     })
 
     return df_visit_by_year_flat, df_visit_flat_all_years
 
-def clean_visitor_data(file_path='data/表1-2-歷年來臺旅客按居住地分.xlsx'):
+def join_ien_country_counts(top_visitors, ien_counts, count_column='count'):
+    """
+    Adds n_reports (IEN reports of the same country and year, 0 if none) to top_n_visitor_countries output.
+    ien_counts has year, country_iso3 and count_column, e.g. aggregate_cube.rollup(cube, ['year', 'country_iso3']).
+    """
+    counts = ien_counts.rename(columns={'country_iso3': 'iso3', count_column: 'n_reports'})
+    counts = counts.astype({'year': 'int64', 'iso3': object})[['year', 'iso3', 'n_reports']]
+    df = top_visitors.astype({'year': 'int64'}).merge(counts, on=['year', 'iso3'], how='left')
+    df['n_reports'] = df['n_reports'].fillna(0).astype(int)
+    return df
+
+def visitor_coverage(df_visit_long, ien_counts, n_values=range(5, 51), count_column='count'):
+    """
+    Per n and year: how many of the top n origin countries (with an ISO3) had IEN reports that year.
+    One top-max(n) selection and join serves every n (the top n are a prefix of the ranking).
+    """
+    n_values = list(n_values)
+    top = join_ien_country_counts(top_n_visitor_countries(df_visit_long, max(n_values, default=0)),
+                                  ien_counts, count_column)
+    top['has_iso3'] = top['iso3'].notna().astype(int)
+    top['reported'] = (top['has_iso3'].astype(bool) & (top['n_reports'] > 0)).astype(int)
+    cumulative = top.groupby('year')[['has_iso3', 'reported']].cumsum()
+    countries = top.assign(v=cumulative['has_iso3']).pivot(index='year', columns='rank', values='v').to_numpy()
+    reported = top.assign(v=cumulative['reported']).pivot(index='year', columns='rank', values='v').to_numpy()
+
+    years = np.sort(top['year'].unique())
+    cols = np.clip(np.asarray(n_values, dtype=int), 1, countries.shape[1] if countries.size else 1) - 1
+    coverage = pd.DataFrame({
+        'n': np.repeat(n_values, len(years)),
+        'year': np.tile(years, len(n_values)),
+        'n_countries': countries[:, cols].T.ravel() if countries.size else 0,
+        'n_reported': reported[:, cols].T.ravel() if reported.size else 0,
+    })
+    coverage['coverage'] = coverage['n_reported'] / coverage['n_countries'].replace(0, np.nan)
+    return coverage
+
+def clean_visitor_data(file_path=DEFAULT_VISITOR_PATH):
     """Legacy wrapper for simple cleaning if needed."""
     # This just returns the full long table for backward compatibility
-    df_raw = pd.read_excel(file_path, header=None, skiprows=2)
-    header_row1 = df_raw.iloc[0].ffill()
-    header_row2 = df_raw.iloc[1].fillna("")
-    combined_headers = []
-    for h1, h2 in zip(header_row1, header_row2):
-        h1_str, h2_str = str(h1).strip(), str(h2).strip()
-        combined_headers.append(h1_str if h1_str == h2_str or h2_str == "" else f"{h1_str}_{h2_str}")
-    df = df_raw.iloc[2:].copy()
-    df.columns = combined_headers
-    year_col = df.columns[0]
-    df_long = df.melt(id_vars=[year_col], var_name='country', value_name='passengers')
-    df_long = df_long.rename(columns={year_col: 'year'})
-    df_long['passengers'] = pd.to_numeric(df_long['passengers'].astype(str).str.replace(',', ''), errors='coerce').fillna(0).astype(int)
+    df_long = load_visitor_table(file_path)
+    df_long = df_long[['year_label', 'country', 'passengers']].rename(columns={'year_label': 'year'})
+    df_long['country'] = df_long['country'].astype(object)
     return df_long
@@ -0,0 +1,74 @@
+import pandas as pd
+import numpy as np
+
+# Compact representation of the exploded country-disease frame from run_daily_news_pipeline.
+# - event-level columns (description, source, dates) are stored once per source event in df_events
+# - the row table keeps an int32 event_id plus categorical codes for country / disease / route / region
+#   (each categorical holds its dictionary once; groupby works on it directly with observed=True)
+
+EVENT_KEY_COLUMNS = ["date", "description", "Source", "SourceTime", "SourceTime2"]
+EVENT_COLUMNS = ["date", "description", "Source", "Source_list", "SourceTime", "SourceTime2"]
+CATEGORY_COLUMNS = [
+    "country_iso3", "country_name_zh", "country_name_en",
+    "disease_name", "disease_name_en", "transmission_route",
+    "country_disease", "country_disease_en",
+    "WHO_region", "WHO_region_en"
+]
+
+def compact_news_frame(df):
+    """
+    Splits the pipeline output into a compact row table and an event table.
+    Returns (df_compact, df_events); df_events is indexed by event_id.
+    """
+    key_columns = [c for c in EVENT_KEY_COLUMNS if c in df.columns]
+    event_key = pd.util.hash_pandas_object(df[key_columns], index=False)
+    event_id, _ = pd.factorize(event_key)
+
+    # factorize numbers events in order of appearance, so the first occurrences are already sorted by id
+    _, first_pos = np.unique(event_id, return_index=True)
+    event_columns = [c for c in EVENT_COLUMNS if c in df.columns]
+    df_events = df.iloc[first_pos][event_columns].reset_index(drop=True)
+    df_events.index.name = "event_id"
+
+    df_compact = pd.DataFrame({"event_id": event_id.astype(np.int32)}, index=df.index)
+    for col in df.columns:
+        if col in event_columns:
+            continue
+        if col in CATEGORY_COLUMNS:
+            df_compact[col] = df[col].astype("category")
+        else:
+            df_compact[col] = df[col]
+
+    df_compact.attrs["columns"] = list(df.columns)
+    return df_compact, df_events
+
+def expand_compact_frame(df_compact, df_events):
+    """
+    Rebuilds the full frame (event columns joined back, categoricals decoded) from compact_news_frame output.
+    Missing event dates come back as stored for the event's first row (NaN and NaT are not told apart).
+    """
+    df = df_events.reindex(df_compact["event_id"].to_numpy())
+    df.index = df_compact.index
+
+    for col in df_compact.columns:
+        if col == "event_id":
+            continue
+        values = df_compact[col]
+        if isinstance(values.dtype, pd.CategoricalDtype):
+            values = values.astype(values.cat.categories.dtype)
+        df[col] = values
+
+    columns = df_compact.attrs.get("columns", list(df.columns))
+    return df[[c for c in columns if c in df.columns]]
+
+def memory_report(df, df_compact, df_events):
+    """
+    Deep memory usage (MB) of the full frame versus the compact tables.
+    """
+    full_mb = df.memory_usage(deep=True).sum() / 1024 ** 2
+    compact_mb = (df_compact.memory_usage(deep=True).sum() + df_events.memory_usage(deep=True).sum()) / 1024 ** 2
+    return pd.Series({
+        "full_mb": round(full_mb, 2),
+        "compact_mb": round(compact_mb, 2),
+        "ratio": round(compact_mb / full_mb, 3) if full_mb else np.nan
+    })
@@ -1,5 +1,106 @@
 import pandas as pd
+import numpy as np
 import re
+import os
+import heapq
+from collections import deque
+
+# Regex pattern to detect "CountryA 公布 CountryB", where the exclusion condition applies (Country A ≠ Country B)
+PATTERN_PUBLISH = re.compile(r'(\S+?)公布(\S+)')
+
+class CountryVariationMatcher(list):
+    """
+    Aho-Corasick automaton over the sorted (variation, iso3) pairs.
+    Behaves like the sorted list it was built from, but finds every variation
+    present in a text in a single pass instead of one substring test per variation.
+    """
+    def __init__(self, sorted_mapping):
+        super().__init__(sorted_mapping)
+        self._goto = [{}]
+        self._fail = [0]
+        self._out = [[]]
+        self._max_len = max((len(var) for var, _ in self), default=0)
+
+        # Build trie; the output of each node is the rank (position in the sorted list) of the variation ending there
+        for rank, (var, _) in enumerate(self):
+            state = 0
+            for ch in var:
+                nxt = self._goto[state].get(ch)
+                if nxt is None:
+                    nxt = len(self._goto)
+                    self._goto[state][ch] = nxt
+                    self._goto.append({})
+                    self._fail.append(0)
+                    self._out.append([])
+                state = nxt
+            self._out[state].append(rank)
+
+        # Failure links (BFS), merging outputs of the suffix states
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for ch, nxt in self._goto[state].items():
+                queue.append(nxt)
+                f = self._fail[state]
+                while f and ch not in self._goto[f]:
+                    f = self._fail[f]
+                self._fail[nxt] = self._goto[f].get(ch, 0)
+                self._out[nxt] = self._out[nxt] + self._out[self._fail[nxt]]
+
+    def find_ranks(self, text):
+        """
+        Returns the set of ranks of all variations occurring in text.
+        """
+        goto, fail, out = self._goto, self._fail, self._out
+        found = set(out[0])  # empty variations match any text
+        state = 0
+        for ch in text:
+            while state and ch not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(ch, 0)
+            if out[state]:
+                found.update(out[state])
+        return found
+
+    def extract(self, text, excluded_country=None, included_country=None):
+        """
+        Longest-match-first extraction, equivalent to looping over the sorted list:
+        each matched variation is removed from the text before shorter ones are tested.
+        Returns the ISO3 codes in the order they were first matched.
+        """
+        found_iso3 = {}  # insertion-ordered set
+        text_remaining = text
+
+        candidates = list(self.find_ranks(text_remaining))
+        heapq.heapify(candidates)
+        seen = set(candidates)
+
+        while candidates:
+            rank = heapq.heappop(candidates)
+            var, iso3 = self[rank]
+            if var not in text_remaining:
+                continue
+            if excluded_country and included_country and var == excluded_country and var != included_country:
+                continue
+
+            found_iso3[iso3] = None
+            if not var:
+                continue
+            # Same as text_remaining.replace(var, ''), keeping track of where fragments are joined
+            parts = text_remaining.split(var)
+            text_remaining = ''.join(parts)
+
+            # Removal can join two fragments into a new variation; only windows around the joins need rescanning
+            pos = 0
+            for part in parts[:-1]:
+                pos += len(part)
+                window = text_remaining[max(0, pos - self._max_len + 1):pos + self._max_len - 1]
+                for new_rank in self.find_ranks(window):
+                    if new_rank > rank and new_rank not in seen:
+                        seen.add(new_rank)
+                        heapq.heappush(candidates, new_rank)
+
+        return found_iso3
 
 def build_country_mappings(country_mapping_df):
     """
@@ -47,21 +148,21 @@ def build_country_mappings(country_mapping_df):
         reverse=True
     )
 
-    return sorted_variation_mapping, headline_cn_to_iso3, iso2_to_iso3
+    return CountryVariationMatcher(sorted_variation_mapping), headline_cn_to_iso3, iso2_to_iso3
 
-def extract_country_iso3_from_description(text, sorted_mapping):
+def extract_country_iso3_ordered(text, sorted_mapping):
     """
-    Extracts ISO3 codes from description text using sorted variation mapping.
+    ISO3 codes found in description text, in the order they were first matched (None if none).
+    A CountryVariationMatcher (as returned by build_country_mappings) is scanned in one pass;
+    a plain sorted list falls back to testing each variation in turn.
     """
-    found_iso3 = set()
     if not isinstance(text, str):
         return None
 
     text_remaining = text
 
-    # Regex pattern to detect "CountryA 公布 CountryB", where the exclusion condition applies (Country A ≠ Country B)
-    pattern_pub = re.compile(r'(\S+?)公布(\S+)')
-    match = pattern_pub.search(text_remaining)
+    # The lazy pattern backtracks quadratically on long texts without whitespace, so only search when it can match
+    match = PATTERN_PUBLISH.search(text_remaining) if '公布' in text_remaining else None
 
     excluded_country = None
     included_country = None
@@ -69,17 +170,40 @@ def extract_country_iso3_from_description(text, sorted_mapping):
         excluded_country = match.group(1).strip() 
         included_country = match.group(2).strip() 
 
+    if isinstance(sorted_mapping, CountryVariationMatcher):
+        found_iso3 = sorted_mapping.extract(text_remaining, excluded_country, included_country)
+        return list(found_iso3) if found_iso3 else None
+
+    found_iso3 = {}
     for var, iso3 in sorted_mapping:
         if var in text_remaining:
             if excluded_country and included_country and var == excluded_country and var != included_country:
                 continue 
 
-            found_iso3.add(iso3)
+            found_iso3[iso3] = None
             # Remove the matched variation from text_remaining to prevent further substring matches
             text_remaining = text_remaining.replace(var, '')
 
     return list(found_iso3) if found_iso3 else None
 
+def iso3_codes_to_list(ordered_codes):
+    """
+    Builds the returned list from a set filled in match order, as the original extraction did.
+    Doing this in the calling process keeps list order independent of worker processes' string hashing.
+    """
+    if not ordered_codes:
+        return None
+    found_iso3 = set()
+    for iso3 in ordered_codes:
+        found_iso3.add(iso3)
+    return list(found_iso3)
+
+def extract_country_iso3_from_description(text, sorted_mapping):
+    """
+    Extracts ISO3 codes from description text using sorted variation mapping.
+    """
+    return iso3_codes_to_list(extract_country_iso3_ordered(text, sorted_mapping))
+
 def convert_iso2_to_iso3(iso2_str, mapping_dict):
     """
     Converts a comma-separated string of ISO2 codes to a list of ISO3 codes.
@@ -120,3 +244,102 @@ def combine_iso_codes(iso2_3code, description, headline):
         combined_set.update(headline)
     
     return list(combined_set) if combined_set else None
+
+def _to_object_array(values):
+    """
+    Wraps a sequence of lists into a 1-D object array (np.array would build a 2-D array from equal-length lists).
+    """
+    return pd.Series(values, dtype=object).to_numpy()
+
+def group_tokens_to_lists(tokens):
+    """
+    Collects an exploded Series (index = row position, in order) back into lists.
+    Returns the row positions and one list per position; faster than groupby(level=0).agg(list).
+    """
+    positions = tokens.index.to_numpy()
+    values = tokens.to_numpy(dtype=object)
+    rows, starts = np.unique(positions, return_index=True)
+    lists = [chunk.tolist() for chunk in np.split(values, starts[1:])] if len(values) else []
+    return rows, lists
+
+def _split_map_series(series, sep, mapping_dict, strip_first=False):
+    """
+    Vectorized split -> strip -> dict lookup; returns one list per row, or None where nothing mapped.
+    """
+    s = series.reset_index(drop=True)
+    result = np.full(len(s), None, dtype=object)
+
+    valid = s[s.notna()].astype(str)
+    if strip_first:
+        valid = valid.str.strip()
+    tokens = valid.str.split(sep, regex=False).explode().str.strip()
+    codes = tokens.map(mapping_dict)
+    codes = codes[codes.notna() & (codes != '')]
+    if len(codes):
+        rows, lists = group_tokens_to_lists(codes)
+        result[rows] = _to_object_array(lists)
+
+    return pd.Series(result, index=series.index, dtype=object)
+
+# Set once per worker process by the pool initializer, so the mapping is not re-sent with every shard
+_WORKER_SORTED_MAPPING = None
+
+def _init_description_worker(sorted_mapping):
+    global _WORKER_SORTED_MAPPING
+    _WORKER_SORTED_MAPPING = sorted_mapping
+
+def _extract_description_shard(texts):
+    return [extract_country_iso3_ordered(text, _WORKER_SORTED_MAPPING) for text in texts]
+
+def extract_country_iso3_series(descriptions, sorted_mapping, n_workers=None, shard_size=2000):
+    """
+    Vectorized extract_country_iso3_from_description: each distinct description is matched only once.
+    With n_workers > 1 (or -1 for all cores) the distinct descriptions are sharded over a process pool;
+    results are stitched back in the original order. None/1 runs serially.
+    """
+    codes, uniques = pd.factorize(descriptions)
+    texts = list(uniques)
+
+    if n_workers == -1:
+        n_workers = os.cpu_count() or 1
+    if n_workers is None or n_workers <= 1 or len(texts) <= shard_size:
+        values = [extract_country_iso3_from_description(text, sorted_mapping) for text in texts]
+    else:
+        # concurrent.futures.process pulls in multiprocessing; only the parallel path needs it
+        from concurrent.futures import ProcessPoolExecutor
+        shards = [texts[i:i + shard_size] for i in range(0, len(texts), shard_size)]
+        with ProcessPoolExecutor(max_workers=n_workers, initializer=_init_description_worker, initargs=(sorted_mapping,)) as executor:
+            # map yields shard results in submission order
+            values = [
+                iso3_codes_to_list(ordered_codes)
+                for shard_values in executor.map(_extract_description_shard, shards)
+                for ordered_codes in shard_values
+            ]
+
+    result = np.full(len(codes), None, dtype=object)
+    present = codes >= 0
+    if present.any():
+        result[present] = _to_object_array(values)[codes[present]]
+    return pd.Series(result, index=descriptions.index, dtype=object)
+
+def convert_iso2_to_iso3_series(iso2_series, mapping_dict):
+    """
+    Vectorized convert_iso2_to_iso3.
+    """
+    return _split_map_series(iso2_series, ',', mapping_dict, strip_first=True)
+
+def map_headline_country_to_iso3_series(headline_country_series, mapping_dict):
+    """
+    Vectorized map_headline_country_to_iso3.
+    """
+    return _split_map_series(headline_country_series, '/', mapping_dict)
+
+def combine_iso_codes_series(iso2_3code, description, headline):
+    """
+    Column-wise combine_iso_codes; keeps its set-based de-duplication so list order is unchanged.
+    """
+    combined = [
+        combine_iso_codes(a, b, c)
+        for a, b, c in zip(iso2_3code.to_numpy(), description.to_numpy(), headline.to_numpy())
+    ]
+    return pd.Series(_to_object_array(combined), index=iso2_3code.index, dtype=object)
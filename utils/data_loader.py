@@ -1,38 +1,85 @@
 import pandas as pd
+import numpy as np
 import re
+from utils.country_name_mapping import group_tokens_to_lists
+from utils.cache import cached_read
 
-def load_raw_data(epi_xlsx_path, tcdc_csv_path, country_xlsx_path, transmission_xlsx_path, research_end_date='2025-11-27'):
+def get_readers(cache_dir=None):
+    """
+    Returns (read_excel, read_csv), going through the raw input cache when cache_dir is given.
+    """
+    if cache_dir is None:
+        return pd.read_excel, pd.read_csv
+    read_excel = lambda path, **kwargs: cached_read('excel', path, cache_dir, **kwargs)
+    read_csv = lambda path, **kwargs: cached_read('csv', path, cache_dir, **kwargs)
+    return read_excel, read_csv
+
+def load_reference_tables(epi_xlsx_path, country_xlsx_path, transmission_xlsx_path, cache_dir=None):
+    """
+    Loads the workbooks the news rows are joined/mapped against.
+    The source table is returned prepared and indexed by (PublishTime, Subject).
+    """
+    read_excel, _ = get_readers(cache_dir)
+    df_source = index_source_table(prepare_source_table(read_excel(epi_xlsx_path)))
+    country_mapping_df = read_excel(country_xlsx_path)
+    dat_transmission_route_raw = read_excel(transmission_xlsx_path)
+    region_mapping_df = read_excel(country_xlsx_path, sheet_name="監測國家&區域清單")
+    return df_source, country_mapping_df, dat_transmission_route_raw, region_mapping_df
+
+def load_raw_data(epi_xlsx_path, tcdc_csv_path, country_xlsx_path, transmission_xlsx_path, research_end_date='2025-11-27', cache_dir=None):
     """
     Loads and performs initial cleaning of the raw data files.
+    If cache_dir is given, parsed files are cached there by content hash (see utils.cache).
     """
     # 1. READ DATA
-    df_source = pd.read_excel(epi_xlsx_path) 
-    df_raw = pd.read_csv(tcdc_csv_path)
-    country_mapping_df = pd.read_excel(country_xlsx_path)
-    dat_transmission_route_raw = pd.read_excel(transmission_xlsx_path)
-    region_mapping_df = pd.read_excel(country_xlsx_path, sheet_name="監測國家&區域清單")
+    read_excel, read_csv = get_readers(cache_dir)
+    df_source, country_mapping_df, dat_transmission_route_raw, region_mapping_df = load_reference_tables(
+        epi_xlsx_path, country_xlsx_path, transmission_xlsx_path, cache_dir
+    )
+    df_raw = read_csv(tcdc_csv_path)
 
     # 2. DATA CLEANING
+    df_raw = clean_news_frame(df_raw, df_source, research_end_date)
+
+    return df_raw, country_mapping_df, dat_transmission_route_raw, region_mapping_df
+
+def prepare_source_table(df_source):
+    """
+    Keeps the source columns of the epidemics workbook and converts its times to dates.
+    """
+    df_source = df_source[["Subject","Source","SourceTime","SourceTime2","PublishTime"]].copy()
+    df_source['SourceTime'] = pd.to_datetime(df_source['SourceTime'], errors='coerce').dt.date
+    df_source['SourceTime2'] = pd.to_datetime(df_source['SourceTime2'], errors='coerce').dt.date
+    df_source['PublishTime'] = pd.to_datetime(df_source['PublishTime'], errors='coerce').dt.date
+    return df_source
+
+def index_source_table(df_source):
+    """
+    Indexes the prepared source table by (PublishTime, Subject), the join key of the news rows.
+    """
+    return df_source.set_index(["PublishTime","Subject"])
+
+def clean_news_frame(df_raw, df_source_indexed, research_end_date='2025-11-27'):
+    """
+    Cleans a frame (or chunk) of TCDC news rows and joins the indexed source table onto it.
+    """
     df_raw["date"] = pd.to_datetime(df_raw['effective'], errors='coerce').dt.date
 
     end_date = pd.to_datetime(research_end_date).date()
     # Handle cases where filter date might be different
-    df_raw = df_raw[df_raw['date'] <= end_date]
+    df_raw = df_raw[df_raw['date'] <= end_date].copy()
 
     # Split headline into country and disease
     # regex matches half-width - or full-width － or Box-drawing dash ─
-    df_raw[['headline_country', 'headline_disease']] = df_raw['headline'].str.split(r'[-－─]', n=1, expand=True)
+    # (reindex keeps both columns when no row of a chunk contains a dash)
+    df_raw[['headline_country', 'headline_disease']] = (
+        df_raw['headline'].str.split(r'[-－─]', n=1, expand=True, regex=True).reindex(columns=[0, 1])
+    )
     df_raw['headline_country'] = df_raw['headline_country'].str.strip()
     df_raw['headline_disease'] = df_raw['headline_disease'].str.strip()
 
-    # Pre-process df_source
-    df_source = df_source[["Subject","Source","SourceTime","SourceTime2","PublishTime"]]
-    df_source['SourceTime'] = pd.to_datetime(df_source['SourceTime'], errors='coerce').dt.date
-    df_source['SourceTime2'] = pd.to_datetime(df_source['SourceTime2'], errors='coerce').dt.date
-    df_source['PublishTime'] = pd.to_datetime(df_source['PublishTime'], errors='coerce').dt.date
-
     # Merge df_source into df_raw
-    df_raw = df_raw.merge(df_source, how="left", left_on=["date","headline"], right_on=["PublishTime","Subject"])
+    df_raw = df_raw.merge(df_source_indexed, how="left", left_on=["date","headline"], right_index=True).reset_index(drop=True)
 
     # drop redundant/useless columns
     drop_cols = ["sent", "effective", "source", "expires", "senderName", "instruction", 
@@ -41,7 +88,7 @@ def load_raw_data(epi_xlsx_path, tcdc_csv_path, country_xlsx_path, transmission_
     existing_drop_cols = [c for c in drop_cols if c in df_raw.columns]
     df_raw = df_raw.drop(existing_drop_cols, axis=1)
 
-    return df_raw, country_mapping_df, dat_transmission_route_raw, region_mapping_df
+    return df_raw
 
 def get_transmission_route_mapping(dat_transmission_route_raw):
     """
@@ -130,3 +177,22 @@ def process_source_list(source_str, mapping_dict):
     cleaned_sources = [mapping_dict.get(s, s) for s in sources]
     
     return cleaned_sources
+
+def process_source_series(source_series, mapping_dict):
+    """
+    Vectorized process_source_list: split, strip, lowercase and map every source at once.
+    """
+    s = source_series.reset_index(drop=True)
+    result = np.full(len(s), None, dtype=object)
+
+    tokens = s[s.notna()].astype(str).str.split('、', regex=False).explode().str.strip().str.lower()
+    if len(tokens):
+        cleaned = tokens.map(mapping_dict).fillna(tokens)
+        rows, lists = group_tokens_to_lists(cleaned)
+        result[rows] = pd.Series(lists, dtype=object).to_numpy()
+
+    # Missing sources become an empty list, one object per row
+    for pos in np.flatnonzero(s.isna().to_numpy()):
+        result[pos] = []
+
+    return pd.Series(result, index=source_series.index, dtype=object)
@@ -1,5 +1,7 @@
 import re
+import unicodedata
 import pandas as pd
+from functools import lru_cache
 
 # This dictionary is copied literally from main.ipynb to ensure 100% accuracy.
 dict_disease_name_mapping = { #multiple diseases are splitted by /
@@ -376,3 +378,78 @@ def map_disease_names(disease_str, mapping_dict):
     
     # Re-join with /
     return "/".join(mapped_parts)
+
+# Rule-compiled resolver for headline disease names.
+# - exact keys of dict_disease_name_mapping win (override layer), so every listed variant keeps its mapping
+# - otherwise the name is normalized once (NFKC, whitespace removed) and looked up again
+# - update-frequency suffixes such as (每週更新)/(本週更新)/(每月更新) and a trailing 病例 are stripped
+# - novel influenza subtypes (H5N1流感, H3N2v豬流感, 新型A型流感(H9N2) ...) resolve to 新型A型流感
+# - names no layer resolves are returned unchanged; results are memoized in a bounded LRU cache
+
+RESOLVER_CACHE_SIZE = 4096
+
+PATTERN_UPDATE_SUFFIX = re.compile(r'\((?:每週|本週|每月|每日)更新\)$')
+PATTERN_CASE_SUFFIX = re.compile(r'病例$')
+# H5, H5N1, H3N2v, optionally several joined by 、 or /
+_SUBTYPE = r'H\d+(?:N\d+)?v?'
+_SUBTYPES = _SUBTYPE + r'(?:[、/]' + _SUBTYPE + r')*'
+DISEASE_NAME_RULES = [
+    (re.compile(r'^(?:人類)?' + _SUBTYPES + r'(?:新型|豬|禽|高病原性禽)?流感(?:\(.*\))?$', re.IGNORECASE), '新型A型流感'),
+    (re.compile(r'^新型A型?流感\(' + _SUBTYPES + r'\)$', re.IGNORECASE), '新型A型流感'),
+]
+
+def normalize_disease_name(name):
+    """
+    NFKC normalization with all whitespace removed (full-width letters/brackets become half-width).
+    """
+    return re.sub(r'\s+', '', unicodedata.normalize('NFKC', name))
+
+dict_disease_name_mapping_norm = {}
+for _key, _value in dict_disease_name_mapping.items():
+    dict_disease_name_mapping_norm.setdefault(normalize_disease_name(_key), _value)
+
+# English names keyed by NFKC-normalized, stripped Chinese names (the lookup the pipeline needs per token)
+dict_disease_name_mapping_en_norm = {
+    unicodedata.normalize('NFKC', k).strip(): v for k, v in dict_disease_name_mapping_en.items()
+}
+
+def _resolve_normalized(name):
+    if name in dict_disease_name_mapping_norm:
+        return dict_disease_name_mapping_norm[name]
+    for pattern, canonical in DISEASE_NAME_RULES:
+        if pattern.match(name):
+            return canonical
+    return None
+
+@lru_cache(maxsize=RESOLVER_CACHE_SIZE)
+def _resolve_cached(name):
+    normalized = normalize_disease_name(name)
+    resolved = _resolve_normalized(normalized)
+    if resolved is not None:
+        return resolved
+
+    stripped = PATTERN_CASE_SUFFIX.sub('', PATTERN_UPDATE_SUFFIX.sub('', normalized))
+    if stripped and stripped != normalized:
+        resolved = _resolve_normalized(stripped)
+        # A stripped name that maps nowhere is still the cleaner spelling
+        return resolved if resolved is not None else stripped
+    return name
+
+def resolve_disease_name(name):
+    """
+    Resolves a headline disease name to its canonical name (see the rules above).
+    Missing values are returned as is.
+    """
+    if not isinstance(name, str):
+        return name
+    if name in dict_disease_name_mapping:
+        return dict_disease_name_mapping[name]
+    return _resolve_cached(name)
+
+def resolve_disease_series(disease_series):
+    """
+    resolve_disease_name over a Series, resolving each distinct name once.
+    """
+    valid = disease_series.dropna()
+    resolved = {name: resolve_disease_name(name) for name in valid.unique()}
+    return disease_series.map(resolved).where(disease_series.notna(), disease_series)
@@ -0,0 +1,683 @@
+import pandas as pd
+import numpy as np
+import hashlib
+import inspect
+import json
+import os
+import textwrap
+import time
+
+# Headless figures of main.ipynb: disease trend (zh/en), top-3 heatmap, Sankey (zh/en), PHEIC timeline, global map
+# and travel alert levels.
+# - every figure is an (aggregate, render) pair: aggregate(context) builds the small table the figure draws, once per
+#   run in the calling process; context holds the stage outputs plus shared intermediates computed once (the count
+#   cube of utils.aggregate_cube, the top disease list and its colors), so no figure copies or regroups df
+# - renders run in a process pool (n_workers, -1 for all cores); each worker selects the Agg backend and the fonts
+#   once, in the pool initializer, so renders use pyplot as configured. Results come back in submission order.
+#   The serial path (n_workers None or 1) renders in the calling process under rc_context(FIGURE_RC) and keeps its
+#   backend, so a notebook's matplotlib settings are left as they were
+# - a figure is skipped when its fingerprint (aggregate, style parameters and the code of its functions) matches
+#   the manifest of its last render and the file still exists
+# - plotnine (PHEIC timeline) and plotly (Sankey, global map; written as HTML, as the notebook does) are imported
+#   by their renderers only; a figure whose library is missing is reported as unavailable, the others still render.
+#   Only render errors are reported as failed
+# - fonts: the notebook uses Microsoft JhengHei; the fallback list covers other CJK fonts where it is missing
+
+FONT_FALLBACK = ['Microsoft JhengHei', 'Noto Sans CJK TC', 'Noto Sans CJK JP', 'SimHei', 'Arial Unicode MS', 'sans-serif']
+N_COMMON_DISEASES = 15
+N_COMMON_DISEASES_EN = 19
+OTHER_DISEASE = '其他疾病'
+OTHER_COLOR = '#BDBDBD'
+TRAVEL_ALERT_LEVELS = ['第一級:注意(Watch)', '第二級:警示(Alert)', '第三級:警告(Warning)']
+DEFAULT_FIGURE_CACHE_DIR = 'cache/figures'
+MANIFEST_NAME = 'manifest.json'
+FIGURE_RC = {'font.family': 'sans-serif', 'font.sans-serif': FONT_FALLBACK, 'axes.unicode_minus': False}
+
+def setup_matplotlib():
+    """
+    Selects the Agg backend and the CJK font fallback (FIGURE_RC) for the whole process; returns pyplot.
+    """
+    import matplotlib
+    matplotlib.use('Agg')
+    import matplotlib.pyplot as plt
+    plt.rcParams.update(FIGURE_RC)
+    return plt
+
+def common_diseases(df, n=N_COMMON_DISEASES, column='disease_name'):
+    return df[column].value_counts().head(n).index.tolist()
+
+def disease_color_map(list_common_diseases):
+    """
+    DISEASE_COLOR_MAP of the notebook: tab20 colors picked alternately, 其他疾病 in grey.
+    """
+    import matplotlib
+    order_zh = list_common_diseases + [OTHER_DISEASE]
+    base_colors = list(matplotlib.colormaps['tab20'].colors)
+    picked_colors = (base_colors[::2] + base_colors[1::2])[:len(order_zh)]
+    color_map = dict(zip(order_zh, picked_colors))
+    color_map[OTHER_DISEASE] = OTHER_COLOR
+    return color_map
+
+def build_figure_context(df, table_PHEIC_summary=None, df_alert_all=None, df_visit_flat_all_years=None, cube=None):
+    """
+    Inputs of the figure aggregates. Inputs left as None only disable the figures that need them.
+    """
+    from utils.aggregate_cube import build_count_cube
+    list_common_diseases = common_diseases(df)
+    return {
+        'df': df,
+        'cube': build_count_cube(df) if cube is None else cube,
+        'list_common_diseases': list_common_diseases,
+        'list_common_diseases_en': common_diseases(df, N_COMMON_DISEASES_EN, 'disease_name_en'),
+        'disease_colors': disease_color_map(list_common_diseases),
+        'table_PHEIC_summary': table_PHEIC_summary,
+        'df_alert_all': df_alert_all,
+        'df_visit_flat_all_years': df_visit_flat_all_years,
+    }
+
+### aggregates: context -> small tables
+def _yearly_grouped_counts(cube, column, keep, other):
+    """
+    Reports per calendar year (as Jan 1 timestamps) x disease, diseases outside keep pooled into other.
+    """
+    from utils.aggregate_cube import rollup
+    counts = rollup(cube, ['year', column])
+    counts[column] = counts[column].where(counts[column].isin(keep), other)
+    pivot = counts.pivot_table(index='year', columns=column, values='count', aggfunc='sum', fill_value=0).astype(float)
+    pivot.index = pd.to_datetime(pivot.index.astype(int).astype(str) + '-01-01')
+    pivot.index.name = 'date'
+    pivot.columns.name = None
+    return pivot
+
+def aggregate_disease_trend_zh(context):
+    from utils.aggregate_cube import shannon_entropy_by_year
+    entropy = shannon_entropy_by_year(context['cube']).round(2)
+    entropy['year'] = entropy['year'].astype(int)
+    entropy['plot_date'] = pd.to_datetime(entropy['year'].astype(str) + '-01-01')
+    order_zh = context['list_common_diseases'] + [OTHER_DISEASE]
+    return {
+        'counts': _yearly_grouped_counts(context['cube'], 'disease_name', context['list_common_diseases'], OTHER_DISEASE),
+        'entropy': entropy,
+        'order': order_zh,
+        'colors': [context['disease_colors'][d] for d in order_zh],
+    }
+
+def aggregate_disease_trend_en(context):
+    counts = _yearly_grouped_counts(context['cube'], 'disease_name_en', context['list_common_diseases_en'], 'Others')
+    total_counts = counts.sum(axis=0).sort_values(ascending=False)
+    if 'Others' in total_counts.index:
+        total_counts = pd.concat([total_counts.drop('Others'), pd.Series({'Others': 0})])
+    return {'counts': counts, 'order': total_counts.index.tolist()}
+
+def aggregate_top_disease_heatmap(context, n_top_diseases=3):
+    from utils.aggregate_cube import rollup
+    counts = rollup(context['cube'], ['year', 'disease_name'], where={'disease_name': context['list_common_diseases']})
+    counts['year'] = counts['year'].astype(int)
+    ranked = (counts.sort_values(['year', 'count'], ascending=[True, False])
+              .groupby('year').head(n_top_diseases)
+              .groupby('year')['disease_name'].apply(list))
+    years = sorted(ranked.index.tolist())
+    return {
+        'years': years,
+        'table': [[ranked[y][row] if row < len(ranked[y]) else None for y in years] for row in range(n_top_diseases)],
+        'colors': context['disease_colors'],
+    }
+
+def aggregate_sankey(context, country_column='country_name_zh', disease_column='disease_name', other_country='其他國家',
+                     other_disease=OTHER_DISEASE, min_year=2021, n_top=10, min_count=100):
+    """
+    Country -> disease report counts since min_year (top n_top of each, the rest pooled), links of at least min_count.
+    """
+    from utils.aggregate_cube import rollup
+    counts = rollup(context['cube'], [country_column, disease_column],
+                    where={'year': range(min_year, 10000)}, dropna=False)
+    top_countries = counts.groupby(country_column)['count'].sum().sort_values(ascending=False, kind='stable').head(n_top).index
+    top_diseases = counts.groupby(disease_column)['count'].sum().sort_values(ascending=False, kind='stable').head(n_top).index
+    grouped = pd.DataFrame({
+        'source': counts[country_column].where(counts[country_column].isin(top_countries), other_country),
+        'target': counts[disease_column].where(counts[disease_column].isin(top_diseases), other_disease),
+        'count': counts['count'],
+    }).groupby(['source', 'target'], as_index=False)['count'].sum()
+    return {'links': grouped[grouped['count'] >= min_count].reset_index(drop=True), 'min_year': min_year}
+
+def aggregate_sankey_en(context):
+    return aggregate_sankey(context, 'country_name_en', 'disease_name_en', 'Other countries', 'Other diseases')
+
+def aggregate_global_map(context):
+    from utils.aggregate_cube import rollup
+    df_country_counts = (rollup(context['cube'], 'country_iso3').rename(columns={'count': 'n_reports'})
+                         .sort_values('n_reports', ascending=False, kind='stable').reset_index(drop=True))
+    top_travelling_iso3 = []
+    if context['df_visit_flat_all_years'] is not None:
+        top_travelling_iso3 = context['df_visit_flat_all_years']['iso3'].dropna().explode().unique().tolist()
+    df_country_counts['is_top_travelling'] = df_country_counts['country_iso3'].isin(top_travelling_iso3)
+    return {'country_counts': df_country_counts}
+
+def aggregate_pheic_timeline(context):
+    from utils.pheic import get_pheic_subset, BOUNDARY_COLUMNS
+    df_PHEIC = get_pheic_subset(context['df'])
+    week = df_PHEIC['date'].dt.to_period('W').dt.start_time
+    weekly = df_PHEIC.groupby([df_PHEIC['disease_name'], week.rename('date')]).size().reset_index(name='count')
+    summary = context['table_PHEIC_summary']
+    columns = ['disease_name'] + [c for c in BOUNDARY_COLUMNS if c in summary.columns] + \
+              [c for c in summary.columns if c.startswith('avg_obs_')]
+    return {'weekly': weekly, 'summary': summary[columns].reset_index(drop=True)}
+
+def aggregate_travel_alert(context):
+    from utils.alert import build_travel_disease_color_map
+    df_alert_all = context['df_alert_all']
+    keep = (df_alert_all['severity_level'] != '解除').to_numpy()
+    year = pd.to_datetime(df_alert_all['date']).dt.year[keep]
+    disease = df_alert_all['alert_disease_std'][keep]
+    # the notice feeds write the level with a full-width or an ASCII colon
+    level = df_alert_all['severity_level'][keep].str.replace('：', ':', regex=False)
+    disease_rank = disease.value_counts().drop(OTHER_DISEASE, errors='ignore').index.tolist()
+    all_years = sorted(year.unique())
+    levels = {}
+    for severity in TRAVEL_ALERT_LEVELS:
+        sub = (level == severity).to_numpy()
+        levels[severity] = (pd.DataFrame({'year': year[sub], 'disease': disease[sub]})
+                            .groupby(['year', 'disease']).size().unstack(fill_value=0)
+                            .reindex(index=all_years, fill_value=0))
+    colors = build_travel_disease_color_map(context['disease_colors'], df_alert_all['alert_disease_std'])
+    return {'levels': levels, 'disease_rank': disease_rank, 'colors': {d: colors[d] for d in disease_rank}}
+
+### renders: (aggregate, style, path) -> path
+def render_disease_trend_zh(data, style, path):
+    import matplotlib.pyplot as plt
+    import matplotlib.ticker as mticker
+    from matplotlib.patches import Patch
+
+    df_pivot = data['counts']
+    df_percent = df_pivot.div(df_pivot.sum(axis=1), axis=0) * 100
+    table_entropy_disease = data['entropy']
+    annual_totals = df_pivot.sum(axis=1)
+    order_zh = data['order']
+    color_map = dict(zip(order_zh, data['colors']))
+
+    fig = plt.figure(figsize=style['figsize'])
+    ax = fig.add_axes([0.07, 0.22, 0.72, 0.68])
+    ax_bar = fig.add_axes([0.07, 0.12, 0.72, 0.08])
+
+    stack_order = order_zh[::-1]
+    x = df_percent.index.to_pydatetime()
+    ax.stackplot(x, [df_percent[d].values if d in df_percent else np.zeros(len(x)) for d in stack_order],
+                 colors=[color_map[d] for d in stack_order], alpha=0.85, linewidth=0.4)
+
+    years = pd.date_range(x[0], x[-1], freq='YS')
+    ax.set_xticks(years)
+    ax.set_xticklabels([])
+    ax.set_ylabel('國家疾病公布則數百分比（%）', fontsize=13)
+    ax.set_title(style['title'], fontsize=16)
+    ax.margins(x=0)
+    ax.set_xlim(df_percent.index.min(), df_percent.index.max())
+    ax.set_ylim(0, 100)
+
+    ax2 = ax.twinx()
+    ax2.plot(table_entropy_disease['plot_date'], table_entropy_disease['shannon_entropy'], color='black',
+             linewidth=1.7, marker='o', markersize=6, markerfacecolor='white', markeredgewidth=1.5,
+             label='疾病熵值(多樣性)')
+    ax2.set_ylabel('疾病熵值(多樣性)', fontsize=13)
+    ax2.set_ylim(0, table_entropy_disease['shannon_entropy'].max() * 1.15)
+
+    bar_x = annual_totals.index.to_pydatetime()
+    bar_y = annual_totals.values
+    ax_bar.bar(bar_x, bar_y, width=pd.Timedelta(days=100), color='grey', alpha=0.75, linewidth=0)
+    for xi, yi in zip(bar_x, bar_y):
+        ax_bar.text(xi, yi + annual_totals.max() * 0.03, f'{int(yi):,}', ha='center', va='bottom',
+                    fontsize=9, color='#333333')
+    ax_bar.set_xlim(df_percent.index.min(), df_percent.index.max())
+    ax_bar.set_xticks(years)
+    ax_bar.set_xticklabels([y.year for y in years], rotation=45, fontsize=10)
+    ax_bar.set_ylabel('年度總則數', fontsize=12)
+    ax_bar.set_ylim(0, annual_totals.max() * 1.25)
+    ax_bar.yaxis.set_major_locator(mticker.MaxNLocator(nbins=3, integer=True))
+    ax_bar.yaxis.set_major_formatter(mticker.FuncFormatter(lambda x, _: f'{int(x):,}'))
+    ax_bar.spines[['top', 'right']].set_visible(False)
+    ax_bar.margins(x=0)
+    ax_bar.set_xlabel('年份', fontsize=13)
+
+    area_handles = [Patch(facecolor=color_map[d], label=f"{i+1}. {d}") for i, d in enumerate(order_zh)]
+    line_handle = plt.Line2D([0], [0], color='black', marker='o', markerfacecolor='white', linewidth=3,
+                             label='疾病熵值(多樣性)')
+    ax.legend(handles=area_handles + [line_handle], title='疾病排名(依公布則數)', title_fontsize=14, fontsize=14.4,
+              loc='upper left', bbox_to_anchor=(1.08, 1), frameon=False)
+    return _save(fig, path, dpi=style['dpi'], bbox_inches='tight')
+
+def render_disease_trend_en(data, style, path):
+    import matplotlib.pyplot as plt
+    import matplotlib
+
+    df_pivot, order = data['counts'], data['order']
+    df_percent = df_pivot.div(df_pivot.sum(axis=1), axis=0) * 100
+    fig, ax = plt.subplots(figsize=style['figsize'])
+    cmap = matplotlib.colormaps['tab20']
+    df_percent[order[::-1]].plot(kind='area', stacked=True, ax=ax, color=[cmap(i) for i in range(len(order))])
+    ax.set_ylabel('Percentage of Disease Notifications (%)')
+    ax.set_title(style['title'])
+    ax.set_xlabel('Year')
+    handles, labels = ax.get_legend_handles_labels()
+    ax.legend(handles[::-1], labels[::-1], loc='upper left', bbox_to_anchor=(1, 1))
+    fig.tight_layout()
+    return _save(fig, path, dpi=style['dpi'])
+
+def render_top_disease_heatmap(data, style, path):
+    import matplotlib.pyplot as plt
+
+    years, table, color_map = data['years'], data['table'], data['colors']
+    n_top_diseases, wrap_width = len(table), style['wrap_width']
+    fig, ax = plt.subplots(figsize=(max(8, len(years) * 1.1), max(4, n_top_diseases * 1.25 + 1)))
+    ax.set_xlim(0, len(years))
+    ax.set_ylim(-0.5, n_top_diseases)
+    for col in range(len(years)):
+        for row in range(n_top_diseases):
+            disease = table[row][col]
+            y = (n_top_diseases - 1) - row
+            ax.add_patch(plt.Rectangle((col, y), 1, 1, facecolor=color_map.get(disease, '#E0E0E0'), edgecolor='black'))
+            label = "\n".join(textwrap.wrap(disease, wrap_width)) if disease else ''
+            ax.text(col + 0.5, y + 0.5, label, ha='center', va='center', fontsize=14.5, color='white')
+
+    ax.set_xticks([i + 0.5 for i in range(len(years))])
+    ax.set_xticklabels(years, fontsize=11)
+    ax.xaxis.tick_top()
+    ax.set_yticks([i + 0.5 for i in range(n_top_diseases)])
+    ax.set_yticklabels([f"Top {i+1}" for i in range(n_top_diseases)][::-1])
+    for spine in ax.spines.values():
+        spine.set_visible(False)
+    ax.tick_params(length=0)
+    ax.set_title(style['title'], fontsize=16, y=1.08)
+    fig.tight_layout()
+    return _save(fig, path, dpi=style['dpi'])
+
+def render_sankey(data, style, path):
+    import plotly.graph_objects as go
+    import plotly.colors as pc
+
+    links = data['links']
+    all_nodes = pd.Series(links['source'].tolist() + links['target'].tolist()).unique()
+    node_indices = {name: i for i, name in enumerate(all_nodes)}
+    color_palette = pc.qualitative.Bold
+    node_colors = [color_palette[i % len(color_palette)] for i in range(len(all_nodes))]
+    fig = go.Figure(data=[go.Sankey(
+        arrangement='snap',
+        node=dict(pad=15, thickness=20, line=dict(color="black", width=0.5), label=all_nodes, color=node_colors),
+        link=dict(source=links['source'].map(node_indices), target=links['target'].map(node_indices),
+                  value=links['count'], color=[node_colors[node_indices[t]] for t in links['target']])
+    )])
+    fig.update_layout(width=800, height=900, title_text=style['title'], font_size=12)
+    return _save_plotly(fig, path)
+
+def render_global_map(data, style, path):
+    import plotly.express as px
+
+    df_country_counts = data['country_counts'].copy()
+    labels = style['labels']
+    df_country_counts['level'] = pd.cut(df_country_counts['n_reports'], bins=style['bins'], labels=labels).astype(str)
+    fig = px.choropleth(df_country_counts, locations="country_iso3", color="level", projection="equirectangular",
+                        category_orders={"level": labels}, color_discrete_sequence=style['colors'], title=style['title'])
+
+    overlay_df = df_country_counts[df_country_counts["is_top_travelling"]]
+    # centroids of small or split territories are placed by hand
+    special_points = {"HKG": (22.3193, 114.1694), "SGP": (1.3521, 103.8198), "MYS": (4.2105, 101.9758)}
+    overlay_special = overlay_df[overlay_df["country_iso3"].isin(special_points.keys())]
+    overlay_normal = overlay_df[~overlay_df["country_iso3"].isin(special_points.keys())]
+    marker = dict(symbol="star", size=8.5, color="yellow", line=dict(color="black", width=0.9), opacity=0.85)
+    fig.add_scattergeo(locations=overlay_normal["country_iso3"], locationmode="ISO-3", mode="markers", marker=marker,
+                       name="主要來臺旅客居住地", showlegend=True)
+    if not overlay_special.empty:
+        fig.add_scattergeo(lat=overlay_special["country_iso3"].map(lambda c: special_points[c][0]),
+                           lon=overlay_special["country_iso3"].map(lambda c: special_points[c][1]),
+                           mode="markers", marker=marker, showlegend=False)
+
+    fig.update_layout(width=700, height=350, margin=dict(l=0, r=0, t=30, b=0), paper_bgcolor="white",
+                      plot_bgcolor="white",
+                      legend=dict(x=0.06, y=0.02, xanchor="left", yanchor="bottom", bgcolor="rgba(255,255,255,0.5)",
+                                  bordercolor="rgba(0,0,0,0.1)", borderwidth=0.4, title="資訊則數", font=dict(size=10)))
+    fig.update_geos(projection_type="equirectangular", showframe=False, showcoastlines=False, showcountries=True,
+                    countrycolor="rgba(0,0,0,0.15)", showland=True, landcolor="white", showocean=False,
+                    showlakes=False, bgcolor="rgba(0,0,0,0)", lataxis_range=[-60, 85])
+    return _save_plotly(fig, path)
+
+# (disease, x, y, period label, summary column) of the PHEIC timeline annotations
+PHEIC_ANNOTATIONS = [
+    ('M痘', '2017-11-01', 50, 'PHEIC公布前每週平均則數', 'avg_obs_alert_to_start_1'),
+    ('M痘', '2022-10-01', 25, 'PHEIC期間每週平均則數', 'avg_obs_start_to_end_1'),
+    ('M痘', '2023-12-01', 50, 'PHEIC終止後每週平均則數', 'avg_obs_end1_to_start2'),
+    ('M痘', '2025-04-01', 25, 'PHEIC期間每週平均則數', 'avg_obs_start2_to_end2'),
+    ('M痘', '2025-08-01', 50, 'PHEIC終止後每週平均則數', 'avg_obs_end2_to_study'),
+    ('COVID-19', '2020-03-01', 20, 'PHEIC公布前每週平均則數', 'avg_obs_alert_to_start_1'),
+    ('COVID-19', '2021-06-01', 20, 'PHEIC期間每週平均則數', 'avg_obs_start_to_end_1'),
+    ('COVID-19', '2024-06-01', 20, 'PHEIC終止後每週平均則數', 'avg_obs_end1_to_study'),
+    ('小兒麻痺症', '2012-04-01', 30, 'PHEIC公布前每週平均則數', 'avg_obs_alert_to_start_1'),
+    ('小兒麻痺症', '2017-06-01', 30, 'PHEIC期間每週平均則數', 'avg_obs_start_to_end_1'),
+    ('新型A型流感/禽類禽流感', '2009-05-01', 500, 'PHEIC公布前每週平均則數', 'avg_obs_alert_to_start_1'),
+    ('新型A型流感/禽類禽流感', '2010-01-01', 200, 'PHEIC期間每週平均則數', 'avg_obs_start_to_end_1'),
+    ('新型A型流感/禽類禽流感', '2018-06-01', 200, 'PHEIC終止後每週平均則數', 'avg_obs_end1_to_study'),
+    ('茲卡病毒感染症', '2016-01-15', 60, 'PHEIC公布前每週平均則數', 'avg_obs_alert_to_start_1'),
+    ('茲卡病毒感染症', '2016-09-01', 40, 'PHEIC期間每週平均則數', 'avg_obs_start_to_end_1'),
+    ('茲卡病毒感染症', '2021-06-01', 40, 'PHEIC終止後每週平均則數', 'avg_obs_end1_to_study'),
+    ('伊波拉病毒感染', '2012-01-01', 20, 'PHEIC公布前每週平均則數', 'avg_obs_alert_to_start_1'),
+    ('伊波拉病毒感染', '2015-07-01', 35, 'PHEIC期間每週平均則數', 'avg_obs_start_to_end_1'),
+    ('伊波拉病毒感染', '2018-02-01', 20, 'PHEIC終止後每週平均則數', 'avg_obs_end1_to_start2'),
+    ('伊波拉病毒感染', '2020-02-01', 35, 'PHEIC期間每週平均則數', 'avg_obs_start2_to_end2'),
+    ('伊波拉病毒感染', '2023-01-01', 20, 'PHEIC終止後每週平均則數', 'avg_obs_end2_to_study'),
+]
+PHEIC_EVENT_NAMES = {'伊波拉病毒感染': ('PHEIC(西非)', 'PHEIC(DRC)'), 'M痘': ('PHEIC(II型)', 'PHEIC(Ib型)')}
+PHEIC_PANEL_ORDER = ['新型A型流感/禽類禽流感', '小兒麻痺症', '伊波拉病毒感染', '茲卡病毒感染症', 'COVID-19', 'M痘']
+
+def _pheic_strip_label(row, event_names):
+    name = row['disease_name']
+    label1, label2 = event_names.get(name, ('PHEIC', 'PHEIC'))
+    lines = []
+    for label, start, end in [(label1, 'date_PHEIC_start_1', 'date_PHEIC_end_1'), (label2, 'date_PHEIC_start_2', 'date_PHEIC_end_2')]:
+        if pd.notnull(row.get(start)):
+            e = pd.to_datetime(row[end]).strftime('%Y-%m-%d') if pd.notnull(row.get(end)) else '持續中'
+            lines.append(f"{label}: {pd.to_datetime(row[start]).strftime('%Y-%m-%d')}~{e}")
+    return name + ('\n' + '\n'.join(lines) if lines else '')
+
+def _pheic_bands(row):
+    disease, study_end = row['disease_name'], row['date_study_end']
+    bands = []
+    if pd.notnull(row.get('date_PHEIC_start_1')):
+        end1 = row['date_PHEIC_end_1'] if pd.notnull(row.get('date_PHEIC_end_1')) else (
+            study_end if disease == "小兒麻痺症" else None)
+        if end1 is not None:
+            bands.append({'disease_name': disease, 'start': row['date_PHEIC_start_1'], 'end': end1})
+    if disease in ["M痘", "伊波拉病毒感染"] and pd.notnull(row.get('date_PHEIC_start_2')):
+        end2 = row['date_PHEIC_end_2'] if pd.notnull(row.get('date_PHEIC_end_2')) else study_end
+        bands.append({'disease_name': disease, 'start': row['date_PHEIC_start_2'], 'end': end2})
+    return bands
+
+def render_pheic_timeline(data, style, path):
+    from plotnine import (ggplot, aes, facet_wrap, geom_rect, geom_line, geom_vline, geom_text, scale_x_datetime,
+                          labs, scale_fill_manual, scale_color_manual, scale_linetype_manual, guide_legend,
+                          theme_bw, theme, element_text)
+    from mizani.formatters import date_format
+    from pandas.api.types import CategoricalDtype
+
+    summary, df_plot_grouped = data['summary'], data['weekly'].copy()
+    rows = summary.to_dict('records')
+
+    annotations = []
+    for disease, x_str, y, period_type, col in style['annotations']:
+        value = summary.loc[summary['disease_name'] == disease, col].values if col in summary else []
+        if len(value) > 0 and not pd.isnull(value[0]):
+            annotations.append({'disease_name': disease, 'x': pd.to_datetime(x_str), 'y': y,
+                                'label': f"{round(value[0], 2)}", 'period_type': period_type})
+    df_annotations = pd.DataFrame(annotations, columns=['disease_name', 'x', 'y', 'label', 'period_type'])
+    df_lines = summary[['disease_name', 'date_CDC_initial_alert']].rename(columns={'date_CDC_initial_alert': 'date'})
+    df_lines['line_type'] = '國際重要疫情初始警示'
+    background_bands = pd.DataFrame([band for row in rows for band in _pheic_bands(row)],
+                                    columns=['disease_name', 'start', 'end'])
+    background_bands['label_bg'] = 'PHEIC公布期間'
+
+    label_map = {row['disease_name']: _pheic_strip_label(row, style['event_names']) for row in rows}
+    disease_type = CategoricalDtype(categories=[label_map.get(d, d) for d in style['panel_order']], ordered=True)
+    for df_ in [df_plot_grouped, df_annotations, df_lines, background_bands]:
+        df_['disease_label'] = df_['disease_name'].map(label_map).astype(disease_type)
+
+    color_breaks = ['國際重要疫情初始警示', 'PHEIC公布前每週平均則數', 'PHEIC期間每週平均則數', 'PHEIC終止後每週平均則數']
+    p = (
+        ggplot(df_plot_grouped, aes(x='date', y='count')) +
+        facet_wrap('~disease_label', scales='free', nrow=2, ncol=3) +
+        geom_rect(data=background_bands, mapping=aes(xmin='start', xmax='end', ymin=0, ymax=float('inf'), fill='label_bg'),
+                  alpha=0.5, inherit_aes=False) +
+        geom_line(aes(x='date', y='count'), color="#42A8CAAF", size=0.8) +
+        geom_vline(data=df_lines, mapping=aes(xintercept='date', color='line_type', linetype='line_type'),
+                   size=0.8, inherit_aes=False) +
+        geom_text(data=df_annotations, mapping=aes(x='x', y='y', label='label', color='period_type'),
+                  size=17.5, fontweight='bold', inherit_aes=False, show_legend=True) +
+        scale_x_datetime(breaks=pd.date_range(df_plot_grouped['date'].min().normalize(),
+                                              df_plot_grouped['date'].max().normalize(), freq='YS'),
+                         labels=date_format("%Y"), expand=(0.01, 0.01)) +
+        labs(title=style['title'], subtitle=style['subtitle'], x='年度', y='每週國家疾病報導數',
+             fill='', linetype='', color='') +
+        scale_fill_manual(values={'PHEIC公布期間': '#cce5ff'}, guide=guide_legend(title='', order=1)) +
+        scale_color_manual(
+            breaks=color_breaks,
+            values=dict(zip(color_breaks, ['#FE9900', '#000000', '#1025AE', '#008000'])),
+            guide=guide_legend(title='', order=2, override_aes={
+                'linetype': ['dashed'] * 4, 'shape': ['', '*', '*', '*'], 'label': [''] * 4, 'size': [1.5, 6, 6, 6]})) +
+        scale_linetype_manual(values=dict(zip(color_breaks, ['dashed', 'blank', 'blank', 'blank'])), guide=None) +
+        theme_bw() +
+        theme(figure_size=style['figsize'], legend_position='bottom',
+              axis_text_y=element_text(size=14), axis_text_x=element_text(rotation=50, hjust=1, size=14),
+              subplots_adjust={'wspace': 0.25, 'hspace': 0.45}, text=element_text(family=FONT_FALLBACK),
+              strip_text=element_text(size=20), legend_text=element_text(size=22),
+              plot_title=element_text(size=26, weight='bold'), plot_subtitle=element_text(size=18),
+              axis_title_y=element_text(size=24), axis_title_x=element_text(size=20))
+    )
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    p.save(path, width=style['figsize'][0], height=style['figsize'][1], dpi=style['dpi'], units='in', verbose=False)
+    return path
+
+def render_travel_alert(data, style, path):
+    import matplotlib.pyplot as plt
+    from matplotlib.patches import Patch
+
+    disease_rank, color_map = data['disease_rank'], data['colors']
+    fig, axes = plt.subplots(nrows=3, ncols=1, figsize=style['figsize'], sharex=True)
+    for ax, level in zip(axes, TRAVEL_ALERT_LEVELS):
+        df_pivot = data['levels'][level]
+        bottom = pd.Series(0, index=df_pivot.index)
+        for disease in disease_rank:
+            if disease not in df_pivot.columns:
+                continue
+            values = df_pivot[disease]
+            ax.bar(df_pivot.index, values, bottom=bottom, color=color_map.get(disease, OTHER_COLOR), width=0.5,
+                   edgecolor='white', linewidth=0.4)
+            bottom += values
+        ax.set_title(level, loc='left', fontsize=23, weight='bold')
+        ax.set_ylabel('公布數', fontsize=15)
+        ax.grid(axis='y', alpha=0.3)
+        ax.set_ylim(0, bottom.max() * 1.15 if bottom.max() > 0 else 1)
+
+    if style['year_range'] is None:
+        all_years = list(data['levels'][TRAVEL_ALERT_LEVELS[0]].index)
+    else:
+        all_years = list(range(style['year_range'][0], style['year_range'][1] + 1))
+    for ax in axes:
+        ax.tick_params(axis='x', labelbottom=True)
+        ax.set_xticks(all_years)
+        ax.set_xticklabels(all_years, fontsize=15)
+    axes[-1].set_xlabel('年份', fontsize=16)
+    axes[-1].tick_params(axis='x', labelsize=17)
+
+    legend_elements = [Patch(facecolor=color_map[d], label=f"{i+1}. {d}") for i, d in enumerate(disease_rank)]
+    fig.legend(handles=legend_elements, title='疾病別(依公布數排序)', loc='center left', bbox_to_anchor=(0.84, 0.5),
+               fontsize=20, title_fontsize=22, frameon=False)
+    fig.suptitle(style['title'], fontsize=22, y=0.98)
+    fig.tight_layout(rect=[0, 0, 0.85, 0.95])
+    return _save(fig, path, dpi=style['dpi'], bbox_inches='tight')
+
+def _save(fig, path, **kwargs):
+    import matplotlib.pyplot as plt
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    fig.savefig(path, **kwargs)
+    plt.close(fig)
+    return path
+
+def _save_plotly(fig, path):
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    if path.endswith('.html'):
+        fig.write_html(path)
+    else:
+        # static formats need kaleido
+        fig.write_image(path)
+    return path
+
+### registry
+# name -> path under output_dir, aggregate, render (and helpers whose code it depends on), the context inputs it
+# needs, default style
+FIGURES = {
+    'disease_trend_zh': {
+        'path': 'plot_publication/disease_proportion_annual_trend.png',
+        'aggregate': aggregate_disease_trend_zh, 'render': render_disease_trend_zh, 'needs': [],
+        'style': {'figsize': (14, 8.5), 'dpi': 300, 'title': '國際重要疫情資訊疾病公布趨勢與疾病熵值（2009–2025 年）'},
+    },
+    'disease_trend_en': {
+        'path': 'plot/disease_proportion_annual_trend_en.png',
+        'aggregate': aggregate_disease_trend_en, 'render': render_disease_trend_en, 'needs': [],
+        'style': {'figsize': (14, 7), 'dpi': 300, 'title': 'Trends in Reported Disease Proportions, 2009–2025'},
+    },
+    'heatmap_disease_top3_zh': {
+        'path': 'plot_publication/heatmap_disease_top3_zh.png',
+        'aggregate': aggregate_top_disease_heatmap, 'render': render_top_disease_heatmap, 'needs': [],
+        'style': {'dpi': 400, 'wrap_width': 5, 'title': '國際重要疫情各年度公布疾病前三名（2009–2025 年）'},
+    },
+    'sankey_country_disease_zh': {
+        'path': 'plot/Sankey_country_disease_zh_2021_2025.html',
+        'aggregate': aggregate_sankey, 'render': render_sankey, 'needs': [],
+        'style': {'title': 'Sankey Diagram: Countries to Diseases, 2021-2025'},
+    },
+    'sankey_country_disease_en': {
+        'path': 'plot/Sankey_country_disease_en_2021_2025.html',
+        'aggregate': aggregate_sankey_en, 'render': render_sankey, 'needs': [],
+        'style': {'title': 'Sankey Diagram: Countries to Diseases, 2021-2025'},
+    },
+    'global_map': {
+        'path': 'plot_publication/global_map.html',
+        'aggregate': aggregate_global_map, 'render': render_global_map, 'needs': [],
+        'style': {'bins': [0, 100, 300, 1017, float('inf')],
+                  'labels': ["1–100", "101-300", "301–1017", "1018+ （即前15名）"],
+                  'colors': ["#f7fbff", "#c6dbef", "#fdae6b", "#e6550d"],
+                  'title': '國際重要疫情資訊疫情發生國家/地區（2009-2025年）'},
+    },
+    'pheic_timeline': {
+        'path': 'plot_publication/pheic_timeline_plot.png',
+        'aggregate': aggregate_pheic_timeline, 'render': render_pheic_timeline, 'needs': ['table_PHEIC_summary'],
+        'helpers': [_pheic_strip_label, _pheic_bands],
+        'style': {'figsize': (22, 14), 'dpi': 300, 'annotations': PHEIC_ANNOTATIONS, 'event_names': PHEIC_EVENT_NAMES,
+                  'panel_order': PHEIC_PANEL_ORDER,
+                  'title': '國際關注公共衛生緊急事件(PHEIC)之國際重要疫情公布趨勢(2009-2025年)',
+                  'subtitle': '數字標註為PHEIC公布前、PHEIC期間、PHEIC終止後的平均每週國家疾病報導則數'},
+    },
+    'travel_alert_severity_disease': {
+        'path': 'plot_publication/travel_alert_severity_disease_stacked.png',
+        'aggregate': aggregate_travel_alert, 'render': render_travel_alert, 'needs': ['df_alert_all'],
+        'style': {'figsize': (18, 12), 'dpi': 300, 'year_range': None, 'title': '國際旅遊疫情建議等級公布數'},
+    },
+}
+
+### fingerprints and the render manifest
+def _hash_value(value, digest):
+    if isinstance(value, (pd.DataFrame, pd.Series)):
+        frame = value.to_frame() if isinstance(value, pd.Series) else value
+        digest.update(repr((type(value).__name__, frame.shape, [str(c) for c in frame.columns],
+                            [str(t) for t in frame.dtypes], [str(n) for n in frame.index.names])).encode('utf-8'))
+        digest.update(pd.util.hash_pandas_object(frame, index=True).to_numpy().tobytes())
+    elif isinstance(value, dict):
+        for key in sorted(value, key=str):
+            digest.update(repr(key).encode('utf-8'))
+            _hash_value(value[key], digest)
+    elif isinstance(value, (list, tuple)):
+        digest.update(f'{type(value).__name__}[{len(value)}]'.encode('utf-8'))
+        for item in value:
+            _hash_value(item, digest)
+    else:
+        digest.update(repr(value).encode('utf-8'))
+
+def figure_fingerprint(name, data, style):
+    """
+    Hash of a figure's aggregate, style parameters and the source of its aggregate, render and helper functions.
+    """
+    figure = FIGURES[name]
+    digest = hashlib.sha256()
+    digest.update(name.encode('utf-8'))
+    for func in [figure['aggregate'], figure['render']] + figure.get('helpers', []):
+        digest.update(inspect.getsource(func).encode('utf-8'))
+    _hash_value(style, digest)
+    _hash_value(data, digest)
+    return digest.hexdigest()
+
+def _load_manifest(cache_dir):
+    path = os.path.join(cache_dir, MANIFEST_NAME)
+    if not os.path.exists(path):
+        return {}
+    try:
+        with open(path, encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        # A corrupt manifest only means every figure is drawn again
+        return {}
+
+def _save_manifest(cache_dir, manifest):
+    os.makedirs(cache_dir, exist_ok=True)
+    path = os.path.join(cache_dir, MANIFEST_NAME)
+    with open(path + '.tmp', 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, ensure_ascii=False, indent=1)
+    os.replace(path + '.tmp', path)
+
+### rendering
+def _init_figure_worker():
+    # pool workers only; the calling process keeps its own backend and rcParams
+    setup_matplotlib()
+
+def _render_task(task):
+    name, data, style, path = task
+    start = time.perf_counter()
+    try:
+        FIGURES[name]['render'](data, style, path)
+        return {'status': 'rendered', 'error': None, 'render_s': round(time.perf_counter() - start, 3)}
+    except ImportError as e:
+        # an optional plotting library (plotnine, plotly) is not installed
+        return {'status': 'unavailable', 'error': f"{type(e).__name__}: {e}", 'render_s': round(time.perf_counter() - start, 3)}
+    except Exception as e:
+        return {'status': 'failed', 'error': f"{type(e).__name__}: {e}", 'render_s': round(time.perf_counter() - start, 3)}
+
+def render_figures(context, output_dir='output', figures=None, styles=None, n_workers=None,
+                   cache_dir=DEFAULT_FIGURE_CACHE_DIR, force=False):
+    """
+    Builds the aggregates of the selected figures (default: all) from context (build_figure_context) and renders
+    those whose fingerprint changed, in a process pool when n_workers > 1 (-1 for all cores).
+    styles overrides style parameters per figure, e.g. {'disease_trend_zh': {'dpi': 150}}.
+    Returns one row per figure with path, status (rendered, skipped, unavailable or failed) and timings.
+    """
+    names = list(FIGURES) if figures is None else list(figures)
+    unknown = [name for name in names if name not in FIGURES]
+    if unknown:
+        raise ValueError(f"Unknown figure(s): {', '.join(unknown)}")
+
+    manifest = _load_manifest(cache_dir)
+    rows, tasks = [], []
+    for name in names:
+        figure = FIGURES[name]
+        path = os.path.join(output_dir, figure['path'])
+        row = {'figure': name, 'path': path, 'status': None, 'error': None, 'aggregate_s': 0.0, 'render_s': 0.0}
+        rows.append(row)
+        missing = [key for key in figure['needs'] if context.get(key) is None]
+        if missing:
+            row['status'], row['error'] = 'unavailable', f"missing input: {', '.join(missing)}"
+            continue
+        start = time.perf_counter()
+        data = figure['aggregate'](context)
+        style = {**figure['style'], **(styles or {}).get(name, {})}
+        row['aggregate_s'] = round(time.perf_counter() - start, 3)
+        row['fingerprint'] = figure_fingerprint(name, data, style)
+        if not force and manifest.get(name, {}).get('fingerprint') == row['fingerprint'] and os.path.exists(path):
+            row['status'] = 'skipped'
+            continue
+        tasks.append((row, (name, data, style, path)))
+
+    if n_workers == -1:
+        n_workers = os.cpu_count() or 1
+    if not tasks:
+        results = []
+    elif n_workers is None or n_workers <= 1 or len(tasks) <= 1:
+        import matplotlib
+        with matplotlib.rc_context(FIGURE_RC):
+            results = [_render_task(task) for _, task in tasks]
+    else:
+        from concurrent.futures import ProcessPoolExecutor
+        with ProcessPoolExecutor(max_workers=min(n_workers, len(tasks)), initializer=_init_figure_worker) as executor:
+            # map yields results in submission order
+            results = list(executor.map(_render_task, [task for _, task in tasks]))
+
+    for (row, _), result in zip(tasks, results):
+        row.update(result)
+        if result['status'] == 'rendered':
+            manifest[row['figure']] = {'fingerprint': row['fingerprint'], 'path': row['path'],
+                                       'rendered': pd.Timestamp.now().isoformat(timespec='seconds')}
+    _save_manifest(cache_dir, manifest)
+    report = pd.DataFrame(rows).reindex(columns=['figure', 'path', 'status', 'aggregate_s', 'render_s', 'error'])
+    return report
@@ -0,0 +1,153 @@
+import pandas as pd
+import hashlib
+import json
+import os
+from datetime import date
+from utils.data_loader import load_raw_data
+from utils.pipeline import process_news_data
+from utils.cache import module_source_hash
+
+# Incremental daily ingest of the news pipeline.
+# - every row of df_raw gets a key: content hash of the row + occurrence number (identical rows stay distinct)
+# - the processed store keeps the exploded output of each row together with its key
+# - the watermark records the last processed date, a fingerprint over all processed keys,
+#   and a hash of the mapping tables and of the source of the mapping code (MAPPING_MODULES); a changed mapping
+#   table or mapping rule forces a full rebuild
+# - rows up to the watermark date are only re-checked key by key when their fingerprint changed,
+#   so edits and deletions of already processed rows are reprocessed / dropped
+
+ROW_KEY = '_row_key'
+STORE_NAME = 'news_processed.pkl'
+WATERMARK_NAME = 'watermark.json'
+# Modules whose code decides the mapped columns of a processed row (disease_name, country_*, WHO_region,
+# Source_list, transmission_route)
+MAPPING_MODULES = ['utils.pipeline', 'utils.data_loader', 'utils.disease_name_mapping', 'utils.country_name_mapping']
+
+def compute_row_keys(df_raw):
+    """
+    Returns one key per row: hash of all column values plus the occurrence number of that hash.
+    """
+    row_hash = pd.util.hash_pandas_object(df_raw, index=False)
+    occurrence = row_hash.groupby(row_hash).cumcount()
+    return row_hash.astype(str) + ':' + occurrence.astype(str)
+
+def fingerprint_keys(keys):
+    """
+    Order-independent fingerprint of a set of row keys.
+    """
+    digest = hashlib.sha256()
+    for key in sorted(keys):
+        digest.update(key.encode('ascii'))
+        digest.update(b'\n')
+    return digest.hexdigest()
+
+def hash_mapping_tables(*tables, modules=MAPPING_MODULES):
+    """
+    Hash of the mapping tables and of the source of the mapping modules; processed rows are only reusable
+    while these are unchanged.
+    """
+    digest = hashlib.sha256()
+    for module in modules:
+        digest.update(f'{module}:{module_source_hash(module)}'.encode('utf-8'))
+    for table in tables:
+        digest.update(','.join(map(str, table.columns)).encode('utf-8'))
+        digest.update(pd.util.hash_pandas_object(table, index=True).to_numpy().tobytes())
+    return digest.hexdigest()
+
+def load_incremental_state(store_dir):
+    """
+    Returns (processed store, watermark); both None when nothing has been stored yet.
+    """
+    store_path = os.path.join(store_dir, STORE_NAME)
+    watermark_path = os.path.join(store_dir, WATERMARK_NAME)
+    if not (os.path.exists(store_path) and os.path.exists(watermark_path)):
+        return None, None
+
+    with open(watermark_path, encoding='utf-8') as f:
+        watermark = json.load(f)
+    return pd.read_pickle(store_path), watermark
+
+def save_incremental_state(store_dir, df_store, watermark):
+    os.makedirs(store_dir, exist_ok=True)
+    store_path = os.path.join(store_dir, STORE_NAME)
+    df_store.to_pickle(store_path + '.tmp')
+    os.replace(store_path + '.tmp', store_path)
+
+    watermark_path = os.path.join(store_dir, WATERMARK_NAME)
+    with open(watermark_path + '.tmp', 'w', encoding='utf-8') as f:
+        json.dump(watermark, f, ensure_ascii=False, indent=1)
+    os.replace(watermark_path + '.tmp', watermark_path)
+
+def run_incremental_news_pipeline(epi_xlsx_path, tcdc_csv_path, country_xlsx_path, transmission_xlsx_path,
+                                  research_end_date='2025-11-27', store_dir='output/incremental',
+                                  cache_dir=None, full_rebuild=False):
+    """
+    Same output as run_daily_news_pipeline, but only rows that are new or edited since the
+    last run go through the mapping steps; the result is appended to the persisted store.
+    Returns the consolidated DataFrame and a small summary dict of what was reprocessed.
+    """
+    # 1. Load data and key every row
+    df_raw, country_mapping_df, dat_transmission_route_raw, region_mapping_df = load_raw_data(
+        epi_xlsx_path, tcdc_csv_path, country_xlsx_path, transmission_xlsx_path, research_end_date, cache_dir
+    )
+    df_raw = df_raw.reset_index(drop=True)
+    keys = compute_row_keys(df_raw)
+    mapping_hash = hash_mapping_tables(country_mapping_df, dat_transmission_route_raw, region_mapping_df)
+
+    # 2. Decide which rows need processing
+    df_store, watermark = (None, None) if full_rebuild else load_incremental_state(store_dir)
+    rows_dropped = 0
+    if df_store is None or watermark.get('mapping_hash') != mapping_hash:
+        mode = 'full'
+        new_mask = pd.Series(True, index=df_raw.index)
+        df_kept = None
+    else:
+        last_date = date.fromisoformat(watermark['last_date'])
+        before_watermark = (df_raw['date'] <= last_date).to_numpy()
+        if fingerprint_keys(keys[before_watermark]) == watermark['fingerprint']:
+            # Nothing up to the watermark changed: only rows after it are new
+            mode = 'append'
+            new_mask = pd.Series(~before_watermark, index=df_raw.index)
+        else:
+            # Some processed rows were edited or deleted: diff the keys
+            mode = 'diff'
+            stored_keys = set(df_store[ROW_KEY])
+            new_mask = ~keys.isin(stored_keys)
+            rows_dropped = len(stored_keys - set(keys))
+        df_kept = df_store[df_store[ROW_KEY].isin(set(keys))]
+
+    # 3. Run the mapping steps on the new rows only
+    df_new = None
+    if new_mask.any():
+        df_todo = df_raw[new_mask].copy()
+        df_todo[ROW_KEY] = keys[new_mask]
+        df_new = process_news_data(
+            df_todo, country_mapping_df, dat_transmission_route_raw, region_mapping_df,
+            vectorized=True, extra_columns=[ROW_KEY]
+        )
+
+    # 4. Merge with the store, in the order of the current df_raw
+    parts = [part for part in (df_kept, df_new) if part is not None and len(part)]
+    if parts:
+        df_store = pd.concat(parts, ignore_index=True) if len(parts) > 1 else parts[0]
+        position = df_store[ROW_KEY].map(pd.Series(keys.index, index=keys.to_numpy()))
+        df_store = df_store.iloc[position.argsort(kind='stable')].reset_index(drop=True)
+    else:
+        df_store = df_store.iloc[0:0] if df_store is not None else pd.DataFrame(columns=[ROW_KEY])
+
+    valid_dates = df_raw['date'].dropna()
+    watermark = {
+        'last_date': max(valid_dates).isoformat() if len(valid_dates) else '0001-01-01',
+        'fingerprint': fingerprint_keys(keys),
+        'mapping_hash': mapping_hash,
+        'n_rows': int(len(df_raw))
+    }
+    save_incremental_state(store_dir, df_store, watermark)
+
+    summary = {
+        'mode': mode,
+        'rows_total': int(len(df_raw)),
+        'rows_processed': int(new_mask.sum()),
+        'rows_dropped': rows_dropped
+    }
+    return df_store.drop(columns=ROW_KEY), summary
@@ -0,0 +1,220 @@
+import pandas as pd
+import json
+import os
+import sys
+import time
+from contextlib import contextmanager
+from datetime import datetime
+
+# Per-stage instrumentation of the pipeline.
+# - every stage records wall time, CPU time, the change of the current RSS over the stage (rss_delta_mb: memory the
+#   stage kept, negative when it freed more than it allocated), the process peak RSS so far and input/output row
+#   counts; the process peak only grows when a stage exceeds every earlier stage, so it is not a per-stage measure
+# - cProfile and tracemalloc capture are optional (profile=... or the CDC_EIC_PROFILE environment variable,
+#   e.g. CDC_EIC_PROFILE=cprofile,tracemalloc); both slow the stage down, so timings are not comparable across modes
+# - cProfile, pstats and tracemalloc are imported only when a capture mode asks for them
+# - the run report is plain JSON, one record per stage in execution order
+# - functions take recorder=None and fall back to NULL_RECORDER, which records nothing
+
+PROFILE_ENV = 'CDC_EIC_PROFILE'
+REPORT_ENV = 'CDC_EIC_RUN_REPORT'
+PROFILE_TOP_N = 20
+
+def current_rss_mb():
+    """
+    Current resident set size of the process in MB (None where it cannot be measured).
+    """
+    try:
+        with open('/proc/self/status') as f:
+            for line in f:
+                if line.startswith('VmRSS:'):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    try:
+        import psutil
+        return psutil.Process().memory_info().rss / 1024 ** 2
+    except ImportError:
+        return None
+
+def peak_rss_mb():
+    """
+    Peak resident set size of the current process in MB (None where it cannot be measured).
+    """
+    # Linux: VmHWM is per process image; ru_maxrss would carry over the parent's peak across exec
+    try:
+        with open('/proc/self/status') as f:
+            for line in f:
+                if line.startswith('VmHWM:'):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    try:
+        import resource
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # Linux reports kB, macOS bytes
+        return peak / 1024 ** 2 if sys.platform == 'darwin' else peak / 1024
+    except ImportError:
+        pass
+    try:
+        import psutil
+        return psutil.Process().memory_info().peak_wset / 1024 ** 2  # Windows
+    except (ImportError, AttributeError):
+        return None
+
+def parse_profile_option(profile=None):
+    """
+    Returns the set of capture modes ({'cprofile', 'tracemalloc'}) from profile or, when None, CDC_EIC_PROFILE.
+    Accepts True/'all'/'1', a comma-separated string, or an iterable of mode names.
+    """
+    if profile is None:
+        profile = os.environ.get(PROFILE_ENV, '')
+    if profile is True:
+        return {'cprofile', 'tracemalloc'}
+    if not profile:
+        return set()
+    modes = profile.split(',') if isinstance(profile, str) else profile
+    modes = {m.strip().lower() for m in modes if m and m.strip()}
+    if modes & {'1', 'all', 'true'}:
+        return {'cprofile', 'tracemalloc'}
+    unknown = modes - {'cprofile', 'tracemalloc'}
+    if unknown:
+        raise ValueError(f"Unknown profile mode(s): {', '.join(sorted(unknown))}")
+    return modes
+
+def _profile_stats(profiler, top_n):
+    import pstats
+    stats = pstats.Stats(profiler)
+    rows = []
+    for (file_name, line, func), (cc, nc, tt, ct, _) in stats.stats.items():
+        rows.append({'function': f"{os.path.basename(file_name)}:{line}({func})", 'calls': nc,
+                     'tottime_s': round(tt, 6), 'cumtime_s': round(ct, 6)})
+    return sorted(rows, key=lambda r: r['cumtime_s'], reverse=True)[:top_n]
+
+class StageRecorder:
+    """
+    Collects one record per pipeline stage. Use as
+        with recorder.stage('country_mapping', rows_in=len(df)) as record:
+            ...
+            record['rows_out'] = len(df)
+    """
+    def __init__(self, name='run_daily_news_pipeline', profile=None, profile_dir=None, top_n=PROFILE_TOP_N):
+        self.name = name
+        self.modes = parse_profile_option(profile)
+        self.profile_dir = profile_dir
+        self.top_n = top_n
+        self.records = []
+        self.meta = {}
+        self.started = datetime.now().isoformat(timespec='seconds')
+        self._start_wall = time.perf_counter()
+
+    @contextmanager
+    def stage(self, stage_name, rows_in=None):
+        record = {'stage': stage_name, 'rows_in': rows_in, 'rows_out': None}
+
+        profiler = None
+        if 'cprofile' in self.modes:
+            import cProfile
+            profiler = cProfile.Profile()
+        own_tracing = False
+        if 'tracemalloc' in self.modes:
+            import tracemalloc
+            if not tracemalloc.is_tracing():
+                tracemalloc.start()
+                own_tracing = True
+            traced_start = tracemalloc.get_traced_memory()[0]
+            tracemalloc.reset_peak()
+
+        rss_before = current_rss_mb()
+        start_wall, start_cpu = time.perf_counter(), time.process_time()
+        if profiler is not None:
+            profiler.enable()
+        try:
+            yield record
+        except BaseException as e:
+            record['error'] = f"{type(e).__name__}: {e}"
+            raise
+        finally:
+            if profiler is not None:
+                profiler.disable()
+            record['wall_s'] = round(time.perf_counter() - start_wall, 6)
+            record['cpu_s'] = round(time.process_time() - start_cpu, 6)
+            rss_after = current_rss_mb()
+            record['rss_delta_mb'] = round(rss_after - rss_before, 3) if rss_after is not None and rss_before is not None else None
+            record['peak_rss_mb'] = peak_rss_mb()
+
+            if 'tracemalloc' in self.modes:
+                traced_now, traced_peak = tracemalloc.get_traced_memory()
+                record['traced_peak_delta_mb'] = round((traced_peak - traced_start) / 1024 ** 2, 3)
+                record['traced_net_mb'] = round((traced_now - traced_start) / 1024 ** 2, 3)
+                if own_tracing:
+                    tracemalloc.stop()
+
+            if profiler is not None:
+                record['profile'] = _profile_stats(profiler, self.top_n)
+                if self.profile_dir is not None:
+                    os.makedirs(self.profile_dir, exist_ok=True)
+                    prof_path = os.path.join(self.profile_dir, f"{len(self.records):02d}_{stage_name}.prof")
+                    profiler.dump_stats(prof_path)
+                    record['profile_path'] = prof_path
+
+            self.records.append(record)
+
+    def report(self):
+        """
+        The run report as a JSON-serializable dict.
+        """
+        return {
+            'name': self.name,
+            'started': self.started,
+            'total_wall_s': round(time.perf_counter() - self._start_wall, 6),
+            'profile_modes': sorted(self.modes),
+            'meta': self.meta,
+            'stages': self.records
+        }
+
+    def summary(self):
+        """
+        Stage records as a DataFrame (profile listings dropped); stages recorded several times
+        (e.g. once per chunk) are summed.
+        """
+        columns = ['stage', 'rows_in', 'rows_out', 'wall_s', 'cpu_s', 'rss_delta_mb']
+        df = pd.DataFrame(self.records).reindex(columns=columns)
+        return df.groupby('stage', sort=False, as_index=False).sum(min_count=1)
+
+    def to_json(self, path):
+        """
+        Writes the run report to path; a directory gets a timestamped file name. Returns the file path.
+        """
+        if os.path.isdir(path) or path.endswith(os.sep):
+            os.makedirs(path, exist_ok=True)
+            path = os.path.join(path, f"{self.name}_{datetime.now():%Y%m%d_%H%M%S}.json")
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        with open(path + '.tmp', 'w', encoding='utf-8') as f:
+            json.dump(self.report(), f, ensure_ascii=False, indent=1, default=str)
+        os.replace(path + '.tmp', path)
+        return path
+
+class _NullRecorder:
+    """
+    Recorder that records nothing; the default when no recorder is passed.
+    """
+    modes = frozenset()
+
+    @contextmanager
+    def stage(self, stage_name, rows_in=None):
+        yield {}
+
+NULL_RECORDER = _NullRecorder()
+
+def resolve_recorder(recorder, name):
+    """
+    Returns (recorder to use, report path to write at the end or None).
+    Without a recorder, CDC_EIC_RUN_REPORT (a file or directory) or CDC_EIC_PROFILE switches recording on.
+    """
+    if recorder is not None:
+        return recorder, None
+    report_path = os.environ.get(REPORT_ENV)
+    if report_path or parse_profile_option():
+        return StageRecorder(name), report_path or os.path.join('output', 'run_reports') + os.sep
+    return NULL_RECORDER, None
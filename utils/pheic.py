@@ -0,0 +1,265 @@
+import pandas as pd
+import numpy as np
+import itertools
+
+# PHEIC analysis: event counts of PHEIC diseases in phase intervals (pre / during / post declaration).
+# - EventDateIndex keeps one sorted datetime64 array per disease (or per disease x country, any key columns);
+#   "events in [start, end)" is two searchsorted calls instead of a boolean filter over the whole df_PHEIC
+# - count_intervals answers many intervals at once (one vectorized searchsorted per key present in the query),
+#   so the summary table, the negative binomial input and phase-boundary sensitivity scenarios share one index
+# - interval rules (half-open [start, end), weeks = days / 7) follow compute_avg_obs, calculate_metrics and
+#   build_intervals of the notebook
+
+PHEIC_DISEASES = ["COVID-19", "新型A型流感", "禽類禽流感", "小兒麻痺症", "伊波拉病毒感染", "M痘", "茲卡病毒感染症"]
+# Novel influenza A and avian influenza are analysed as one disease
+PHEIC_DISEASE_GROUPS = {'新型A型流感': '新型A型流感/禽類禽流感', '禽類禽流感': '新型A型流感/禽類禽流感'}
+PHEIC_DISEASE_EN_GROUPS = {'Avian influenza (animal)': 'Novel influenza A'}
+# Diseases with two PHEIC declarations in the study period
+TWO_CYCLE_DISEASES = ["M痘", "伊波拉病毒感染"]
+
+PHEIC_TIMELINE = pd.DataFrame({
+    'PHEIC_name': [
+        'H5N1流感', '小兒麻痺症', '伊波拉病毒感染(西非)', '茲卡病毒感染症',
+        '伊波拉病毒感染(剛果民主共和國)', 'COVID-19', 'M痘(II型)', 'M痘(Ib型)'],
+    'disease_name': [
+        '新型A型流感/禽類禽流感', '小兒麻痺症', '伊波拉病毒感染', '茲卡病毒感染症',
+        '伊波拉病毒感染', 'COVID-19', 'M痘', 'M痘'],
+    # references: see the PHEIC ANALYSIS cell of main.ipynb
+    'date_PHEIC_start': [
+        '2009-04-25', '2014-05-05', '2014-08-08', '2016-02-01',
+        '2019-07-17', '2020-01-30', '2022-07-23', '2024-08-14'],
+    'date_PHEIC_end': [
+        '2010-08-10', None, '2016-03-29', '2016-11-18',
+        '2020-06-25', '2023-05-05', '2023-05-11', '2025-09-05'],
+})
+
+PHASE_ORDER = ['pre', 'during', 'post']
+BOUNDARY_COLUMNS = ['date_CDC_initial_alert', 'date_PHEIC_start_1', 'date_PHEIC_end_1',
+                    'date_PHEIC_start_2', 'date_PHEIC_end_2', 'date_study_end']
+
+def _to_datetime64(values):
+    """
+    Any scalar / array-like of dates as a datetime64[ns] array (NaT for missing).
+    """
+    values = np.atleast_1d(values) if np.ndim(values) == 0 else values
+    if isinstance(values, (list, tuple)):
+        values = pd.Series(values, dtype=object)
+    return pd.to_datetime(pd.Series(values), errors='coerce').to_numpy(dtype='datetime64[ns]')
+
+class EventDateIndex:
+    """
+    Sorted event dates per key for interval counting. Use as
+        index = EventDateIndex(df_PHEIC, keys='disease_name')
+        index.count('COVID-19', '2020-01-30', '2023-05-05')
+        index.count_intervals(intervals_df['disease_name'], intervals_df['start_date'], intervals_df['end_date'])
+    keys may be a list of columns, e.g. ['disease_name', 'country_iso3']; keys are then tuples.
+    """
+    def __init__(self, df, keys='disease_name', date_column='date'):
+        self.keys = [keys] if isinstance(keys, str) else list(keys)
+        dates = pd.to_datetime(df[date_column], errors='coerce')
+        valid = dates.notna().to_numpy()
+        values = dates.to_numpy(dtype='datetime64[ns]')[valid]
+
+        key_frame = df.loc[valid, self.keys]
+        if len(self.keys) == 1:
+            codes, self.groups = pd.factorize(key_frame[self.keys[0]])
+            self.groups = pd.Index(self.groups)
+        else:
+            codes, self.groups = pd.MultiIndex.from_frame(key_frame).factorize()
+
+        # dates sorted within each key, keys laid out one after another (offsets[c]:offsets[c + 1])
+        order = np.lexsort((values, codes))
+        self._dates = values[order]
+        self._offsets = np.searchsorted(codes[order], np.arange(len(self.groups) + 1))
+
+    def __len__(self):
+        return len(self._dates)
+
+    def dates(self, key):
+        """
+        Sorted event dates of one key (empty for an unknown key).
+        """
+        code = self.groups.get_indexer([key])[0] if len(self.groups) else -1
+        if code < 0:
+            return self._dates[:0]
+        return self._dates[self._offsets[code]:self._offsets[code + 1]]
+
+    def count(self, key, start, end):
+        """
+        Number of events of key in [start, end).
+        """
+        dates = self.dates(key)
+        start, end = _to_datetime64([start, end])
+        return int(max(np.searchsorted(dates, end) - np.searchsorted(dates, start), 0))
+
+    def count_intervals(self, keys, starts, ends):
+        """
+        Events in [start, end) for aligned arrays of keys, starts and ends; keys may also be a DataFrame with
+        the key columns. Unknown keys count 0, intervals with a missing bound give NaN (float array).
+        """
+        if isinstance(keys, pd.DataFrame):
+            keys = pd.MultiIndex.from_frame(keys[self.keys]) if len(self.keys) > 1 else keys[self.keys[0]]
+        elif len(self.keys) > 1 and not isinstance(keys, pd.MultiIndex):
+            keys = pd.MultiIndex.from_tuples(list(keys))
+        codes = self.groups.get_indexer(keys) if len(self.groups) else np.full(len(keys), -1)
+        starts, ends = _to_datetime64(starts), _to_datetime64(ends)
+
+        counts = np.zeros(len(codes), dtype=float)
+        known = codes >= 0
+        order = np.argsort(codes[known], kind='stable')
+        rows = np.flatnonzero(known)[order]
+        # one searchsorted per key present in the query
+        bounds = np.searchsorted(codes[rows], np.arange(len(self.groups) + 1))
+        for code in np.flatnonzero(np.diff(bounds)):
+            idx = rows[bounds[code]:bounds[code + 1]]
+            dates = self._dates[self._offsets[code]:self._offsets[code + 1]]
+            counts[idx] = np.searchsorted(dates, ends[idx]) - np.searchsorted(dates, starts[idx])
+
+        counts = np.maximum(counts, 0)
+        counts[np.isnat(starts) | np.isnat(ends)] = np.nan
+        return counts
+
+    def weekly_rates(self, keys, starts, ends, min_weeks=1e-6):
+        """
+        count_intervals divided by the interval length in weeks (at least min_weeks).
+        """
+        starts, ends = _to_datetime64(starts), _to_datetime64(ends)
+        weeks = np.maximum((ends - starts) / np.timedelta64(1, 'D') / 7, min_weeks)
+        return self.count_intervals(keys, starts, ends) / weeks
+
+def get_pheic_subset(df):
+    """
+    Rows of the PHEIC diseases from the pipeline output, novel / avian influenza merged, sorted by date.
+    """
+    df_PHEIC = df.loc[df['disease_name'].isin(PHEIC_DISEASES),
+                      ['disease_name', 'date', 'country_name_zh', 'country_iso3', 'description', 'disease_name_en']].copy()
+    df_PHEIC['disease_name'] = df_PHEIC['disease_name'].replace(PHEIC_DISEASE_GROUPS)
+    df_PHEIC['disease_name_en'] = df_PHEIC['disease_name_en'].replace(PHEIC_DISEASE_EN_GROUPS)
+    df_PHEIC['date'] = pd.to_datetime(df_PHEIC['date'])
+    return df_PHEIC.sort_values(by='date')
+
+def build_pheic_timeline(df_PHEIC, research_end_date, timeline=PHEIC_TIMELINE):
+    """
+    One row per PHEIC disease: first CDC alert date and up to two PHEIC start/end dates
+    (date_PHEIC_start_1, date_PHEIC_end_1, ...), as table_PHEIC_timeline of the notebook.
+    """
+    earliest = (df_PHEIC.sort_values(by='date', kind='stable')
+                .groupby(['disease_name', 'disease_name_en']).first().reset_index()
+                .rename(columns={'date': 'date_CDC_initial_alert'}))
+    table = pd.merge(timeline.assign(date_study_end=research_end_date),
+                     earliest[['disease_name', 'disease_name_en', 'date_CDC_initial_alert', 'description']],
+                     on='disease_name', how='left')
+    for col in ['date_CDC_initial_alert', 'date_PHEIC_start', 'date_PHEIC_end', 'date_study_end']:
+        table[col] = pd.to_datetime(table[col])
+
+    table['event_number'] = table.groupby('disease_name').cumcount() + 1
+    pivoted = table.pivot(index=['disease_name', 'disease_name_en', 'date_study_end', 'date_CDC_initial_alert'],
+                          columns='event_number', values=['PHEIC_name', 'date_PHEIC_start', 'date_PHEIC_end'])
+    pivoted.columns = [f"{col}_{num}" for col, num in pivoted.columns]
+    table = pivoted.reset_index()
+    for col in BOUNDARY_COLUMNS:
+        if col in table.columns:
+            table[col] = pd.to_datetime(table[col])
+    return table
+
+def build_pheic_summary(table_PHEIC_timeline, index):
+    """
+    table_PHEIC_timeline with the weekly averages of calculate_metrics: events in [start, end) divided by
+    max(weeks, 1), rounded to 1 decimal; a missing end falls back to date_study_end, a missing start gives NaN.
+    """
+    table = table_PHEIC_timeline
+    disease = table['disease_name']
+    study_end = table['date_study_end']
+    two_cycle = disease.isin(TWO_CYCLE_DISEASES).to_numpy()
+
+    def boundary(col):
+        return table[col] if col in table.columns else pd.Series(pd.NaT, index=table.index)
+
+    def avg_obs(start, end, rows):
+        start, end = boundary(start), boundary(end).fillna(study_end)
+        weeks = np.maximum((end - start).dt.days / 7, 1)
+        rates = np.round(index.count_intervals(disease, start, end) / weeks, 1)
+        return rates.where(np.broadcast_to(rows, len(table)))
+
+    metrics = pd.DataFrame(index=table.index)
+    alert, s1 = boundary('date_CDC_initial_alert'), boundary('date_PHEIC_start_1')
+    metrics['interval_days_alert_to_start_1'] = (s1 - alert).dt.days
+    metrics['avg_obs_alert_to_start_1'] = avg_obs('date_CDC_initial_alert', 'date_PHEIC_start_1', True)
+    metrics['avg_obs_start_to_end_1'] = avg_obs('date_PHEIC_start_1', 'date_PHEIC_end_1', True)
+    metrics['avg_obs_end1_to_start2'] = avg_obs('date_PHEIC_end_1', 'date_PHEIC_start_2', two_cycle)
+    metrics['avg_obs_start2_to_end2'] = avg_obs('date_PHEIC_start_2', 'date_PHEIC_end_2', two_cycle)
+    metrics['avg_obs_end2_to_study'] = avg_obs('date_PHEIC_end_2', 'date_study_end', two_cycle)
+    metrics['avg_obs_end1_to_study'] = avg_obs('date_PHEIC_end_1', 'date_study_end', ~two_cycle)
+    return pd.concat([table, metrics], axis=1)
+
+def build_phase_intervals(table_PHEIC_timeline, id_columns=('disease_name',)):
+    """
+    Pre / during / post intervals per PHEIC cycle (build_intervals of the notebook), vectorized over the rows
+    of the timeline. id_columns are carried over (e.g. add 'scenario' for phase_boundary_scenarios output).
+    Returns columns id_columns + cycle, phase, start_date, end_date.
+    """
+    table = table_PHEIC_timeline
+
+    def col(name):
+        if name not in table.columns:
+            return np.full(len(table), np.datetime64('NaT'), dtype='datetime64[ns]')
+        return pd.to_datetime(table[name], errors='coerce').to_numpy(dtype='datetime64[ns]')
+
+    alert, study_end = col('date_CDC_initial_alert'), col('date_study_end')
+    s1, e1, s2, e2 = col('date_PHEIC_start_1'), col('date_PHEIC_end_1'), col('date_PHEIC_start_2'), col('date_PHEIC_end_2')
+    has_alert, has_s1, has_e1, has_s2, has_e2 = (~np.isnat(d) for d in (alert, s1, e1, s2, e2))
+    pre2_start = np.where(has_e1, e1, alert)
+
+    # (cycle, phase, start, end, condition) in the order build_intervals appends them
+    candidates = [
+        (1, 'pre', alert, s1, has_s1 & has_alert),
+        (1, 'pre', alert, study_end, ~has_s1 & has_alert),
+        (1, 'during', s1, np.where(has_e1, e1, study_end), has_s1),
+        (1, 'post', e1, np.where(has_s2, s2, study_end), has_s1 & has_e1),
+        (2, 'pre', pre2_start, s2, has_s2 & ~np.isnat(pre2_start) & (s2 > pre2_start)),
+        (2, 'during', s2, np.where(has_e2, e2, study_end), has_s2),
+        (2, 'post', e2, study_end, has_s2 & has_e2),
+    ]
+    starts = np.column_stack([c[2] for c in candidates])
+    ends = np.column_stack([c[3] for c in candidates])
+    # add() of build_intervals: both bounds present and end > start
+    keep = np.column_stack([c[4] for c in candidates]) & ~np.isnat(starts) & ~np.isnat(ends) & (ends > starts)
+
+    rows, slots = np.nonzero(keep)
+    id_columns = list(id_columns)
+    intervals = table[id_columns].iloc[rows].reset_index(drop=True)
+    intervals['cycle'] = np.array([c[0] for c in candidates])[slots]
+    intervals['phase'] = np.array([c[1] for c in candidates], dtype=object)[slots]
+    intervals['start_date'] = starts[rows, slots]
+    intervals['end_date'] = ends[rows, slots]
+    return intervals
+
+def count_phase_intervals(intervals_df, index, min_weeks=1e-6):
+    """
+    Adds count, weeks (clipped at min_weeks) and avg_obs to the build_phase_intervals output.
+    """
+    df = intervals_df.copy()
+    df['count'] = index.count_intervals(df[index.keys], df['start_date'], df['end_date']).astype(int)
+    df['weeks'] = ((df['end_date'] - df['start_date']).dt.days / 7).clip(lower=min_weeks)
+    df['avg_obs'] = df['count'] / df['weeks']
+    return df
+
+def phase_boundary_scenarios(table_PHEIC_timeline, shifts_days):
+    """
+    Alternative phase boundaries for sensitivity analyses: one copy of the timeline per combination of day
+    offsets, e.g. {'date_PHEIC_start_1': range(-60, 61), 'date_PHEIC_end_1': range(-60, 61)}.
+    Returns the stacked timelines with a scenario number and one shift_<column> column per shifted column.
+    """
+    columns = list(shifts_days)
+    combos = np.array(list(itertools.product(*(list(shifts_days[c]) for c in columns))), dtype='int64')
+    if combos.size == 0:
+        combos = combos.reshape(0, len(columns))
+    n_rows, n_combos = len(table_PHEIC_timeline), len(combos)
+
+    scenarios = table_PHEIC_timeline.iloc[np.tile(np.arange(n_rows), n_combos)].reset_index(drop=True)
+    scenarios.insert(0, 'scenario', np.repeat(np.arange(n_combos), n_rows))
+    for i, c in enumerate(columns):
+        shift = np.repeat(combos[:, i], n_rows)
+        scenarios[f'shift_{c}'] = shift
+        scenarios[c] = pd.to_datetime(scenarios[c]) + pd.to_timedelta(shift, unit='D')
+    return scenarios
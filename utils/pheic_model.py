@@ -0,0 +1,251 @@
+import pandas as pd
+import numpy as np
+import os
+from scipy.optimize import minimize_scalar
+from scipy.special import gammaln, ndtr
+
+# Negative binomial model of PHEIC phase counts (count ~ phase, offset log(weeks)), as the GLM cell of the notebook.
+# - the design is built once as NumPy arrays from count_phase_intervals output (utils.pheic); no formula parsing
+# - fit_nb_glm is a plain IRLS fit with a log link and fixed alpha (NB2, var = mu + alpha * mu^2; alpha=0 is Poisson),
+#   matching smf.glm(..., family=NegativeBinomial(alpha)) estimates and non-robust standard errors
+# - bootstrap replicates resample whole clusters (diseases, or disease x cycle) with replacement; replicates are
+#   split into fixed chunks, each with its own seed spawned from one SeedSequence, so results do not depend on
+#   n_workers
+
+PHASE_REFERENCE = 'pre'
+PHASE_TERMS = ['during', 'post']
+TERM_LABELS = {'during': 'During vs Pre', 'post': 'Post vs Pre'}
+EPS = 1e-9
+MAX_ITER = 100
+TOL = 1e-10
+Z_95 = 1.959963984540054
+BOOTSTRAP_CHUNK = 100
+ALPHA_GRID = np.logspace(-3, 1.5, 46)
+
+def build_design(intervals_df, cluster='disease_name'):
+    """
+    Design arrays of the phase model: y (count), X (intercept + phase dummies vs pre), offset log(weeks),
+    and per-row cluster codes (cluster is a column or list of columns, e.g. ['disease_name', 'cycle']).
+    """
+    cluster = [cluster] if isinstance(cluster, str) else list(cluster)
+    phase = intervals_df['phase'].astype(str).to_numpy()
+    X = np.column_stack([np.ones(len(phase))] + [(phase == term).astype(float) for term in PHASE_TERMS])
+    if len(cluster) == 1:
+        codes, names = pd.factorize(intervals_df[cluster[0]])
+    else:
+        codes, names = pd.MultiIndex.from_frame(intervals_df[cluster]).factorize()
+    return {
+        'y': intervals_df['count'].to_numpy(dtype=float),
+        'X': X,
+        'offset': np.log(intervals_df['weeks'].to_numpy(dtype=float) + EPS),
+        'columns': ['Intercept'] + PHASE_TERMS,
+        'clusters': codes,
+        'cluster_names': list(names),
+        'cluster_rows': [np.flatnonzero(codes == c) for c in range(len(names))]
+    }
+
+def nb_loglike(y, mu, alpha):
+    """
+    NB2 log-likelihood (Poisson for alpha=0).
+    """
+    if alpha == 0:
+        return float(np.sum(y * np.log(mu) - mu - gammaln(y + 1)))
+    size = 1 / alpha
+    return float(np.sum(gammaln(y + size) - gammaln(size) - gammaln(y + 1)
+                        + size * np.log(size / (size + mu)) + y * np.log(mu / (size + mu))))
+
+def fit_nb_glm(y, X, offset, alpha=1.0, max_iter=MAX_ITER, tol=TOL):
+    """
+    IRLS fit of a log-link NB2 GLM with fixed alpha. Columns of X without any nonzero row (e.g. a phase absent
+    from a resample) are left out and get NaN. Returns a dict of params, bse, mu, loglike, pearson_chi2, ...
+    """
+    k = X.shape[1]
+    used = np.flatnonzero(np.any(X != 0, axis=0))
+    Xu = X[:, used]
+    if np.linalg.matrix_rank(Xu) < len(used):
+        # e.g. no 'pre' interval left: the phase contrasts are not identified
+        return {'params': np.full(k, np.nan), 'bse': np.full(k, np.nan), 'cov': np.full((k, k), np.nan),
+                'pvalues': np.full(k, np.nan), 'mu': np.full(len(y), np.nan), 'alpha': alpha, 'loglike': np.nan,
+                'pearson_chi2': np.nan, 'df_resid': len(y) - len(used), 'converged': False, 'n_iter': 0}
+    mu = (y + y.mean()) / 2 + EPS
+    eta = np.log(mu)
+    beta = np.zeros(len(used))
+    converged = False
+    n_iter = 0
+    for n_iter in range(1, max_iter + 1):
+        w = mu / (1 + alpha * mu)
+        z = eta - offset + (y - mu) / mu
+        XtW = Xu.T * w
+        try:
+            beta_new = np.linalg.solve(XtW @ Xu, XtW @ z)
+        except np.linalg.LinAlgError:
+            beta_new = np.linalg.lstsq(XtW @ Xu, XtW @ z, rcond=None)[0]
+        eta = Xu @ beta_new + offset
+        mu = np.exp(eta)
+        change = np.max(np.abs(beta_new - beta)) if n_iter > 1 else np.inf
+        beta = beta_new
+        if change < tol * (1 + np.max(np.abs(beta))):
+            converged = True
+            break
+
+    w = mu / (1 + alpha * mu)
+    cov_used = np.linalg.pinv((Xu.T * w) @ Xu)
+    params = np.full(k, np.nan)
+    bse = np.full(k, np.nan)
+    cov = np.full((k, k), np.nan)
+    params[used] = beta
+    bse[used] = np.sqrt(np.diag(cov_used))
+    cov[np.ix_(used, used)] = cov_used
+    return {
+        'params': params,
+        'bse': bse,
+        'cov': cov,
+        'pvalues': 2 * ndtr(-np.abs(params / bse)),
+        'mu': mu,
+        'alpha': alpha,
+        'loglike': nb_loglike(y, mu, alpha),
+        'pearson_chi2': float(np.sum((y - mu) ** 2 / (mu + alpha * mu ** 2))),
+        'df_resid': len(y) - len(used),
+        'converged': converged,
+        'n_iter': n_iter
+    }
+
+def rate_ratio_table(fit, columns=None):
+    """
+    During / post rate ratios vs pre with Wald 95% CI and p-values (the df_model table of the notebook).
+    A fit that did not converge gives NaN rows: its estimates (often diverging towards a zero count) are not valid.
+    """
+    columns = columns or ['Intercept'] + PHASE_TERMS
+    rows = []
+    for term in PHASE_TERMS:
+        if not fit['converged']:
+            rows.append([TERM_LABELS[term]] + [np.nan] * 5)
+            continue
+        i = columns.index(term)
+        coef, se = fit['params'][i], fit['bse'][i]
+        rows.append([TERM_LABELS[term], coef, np.exp(coef), np.exp(coef - Z_95 * se), np.exp(coef + Z_95 * se),
+                     fit['pvalues'][i]])
+    return pd.DataFrame(rows, columns=['Term', 'coef', 'rate_ratio', 'ci_lower_rr', 'ci_upper_rr', 'p_value'])
+
+def fit_phase_model(intervals_df, alpha=1.0):
+    """
+    Pooled model over all diseases; the fit dict of fit_nb_glm plus a 'rate_ratios' table.
+    """
+    design = build_design(intervals_df)
+    fit = fit_nb_glm(design['y'], design['X'], design['offset'], alpha)
+    fit['rate_ratios'] = rate_ratio_table(fit, design['columns'])
+    return fit
+
+def fit_phase_model_by_disease(intervals_df, alpha=1.0):
+    """
+    One model per disease; rate ratio tables stacked with disease_name, converged and n_intervals columns.
+    Phases a disease does not have, and diseases whose fit did not converge (converged False), give NaN.
+    """
+    tables = []
+    for disease, df_disease in intervals_df.groupby('disease_name', sort=False):
+        fit = fit_phase_model(df_disease, alpha)
+        table = fit['rate_ratios']
+        table.insert(0, 'disease_name', disease)
+        table['converged'] = fit['converged']
+        table['n_intervals'] = len(df_disease)
+        tables.append(table)
+    return pd.concat(tables, ignore_index=True) if tables else pd.DataFrame()
+
+def overdispersion_ratio(intervals_df):
+    """
+    Pearson chi2 / df of the Poisson fit; values well above 1 support the negative binomial model.
+    """
+    design = build_design(intervals_df)
+    fit = fit_nb_glm(design['y'], design['X'], design['offset'], alpha=0)
+    return fit['pearson_chi2'] / fit['df_resid'] if fit['df_resid'] > 0 else np.nan
+
+def profile_alpha(intervals_df, alphas=ALPHA_GRID):
+    """
+    Profile log-likelihood over alpha: the grid, the maximizing alpha (refined between grid neighbours)
+    and its 95% profile-likelihood interval on the grid (drop of 1.92 from the maximum).
+    """
+    design = build_design(intervals_df)
+    y, X, offset = design['y'], design['X'], design['offset']
+
+    def loglike(alpha):
+        return fit_nb_glm(y, X, offset, alpha)['loglike']
+
+    alphas = np.asarray(alphas, dtype=float)
+    profile = pd.DataFrame({'alpha': alphas, 'loglike': [loglike(a) for a in alphas]})
+    best = int(profile['loglike'].idxmax())
+    lo, hi = alphas[max(best - 1, 0)], alphas[min(best + 1, len(alphas) - 1)]
+    if hi > lo:
+        res = minimize_scalar(lambda log_a: -loglike(np.exp(log_a)), bounds=(np.log(lo), np.log(hi)), method='bounded')
+        alpha_hat, ll_max = float(np.exp(res.x)), -float(res.fun)
+    else:
+        alpha_hat, ll_max = float(alphas[best]), float(profile['loglike'].iloc[best])
+    inside = profile.loc[profile['loglike'] >= ll_max - 1.92, 'alpha']
+    return {
+        'alpha': alpha_hat,
+        'loglike': ll_max,
+        'ci': (float(inside.min()), float(inside.max())) if len(inside) else (np.nan, np.nan),
+        'profile': profile
+    }
+
+_WORKER_DESIGN = None
+_WORKER_ALPHA = None
+
+def _init_bootstrap_worker(design, alpha):
+    global _WORKER_DESIGN, _WORKER_ALPHA
+    _WORKER_DESIGN, _WORKER_ALPHA = design, alpha
+
+def _bootstrap_params(design, alpha, seed_seq, n_rep):
+    """
+    Coefficients of n_rep cluster-bootstrap replicates, shape (n_rep, n_columns).
+    """
+    rng = np.random.default_rng(seed_seq)
+    y, X, offset = design['y'], design['X'], design['offset']
+    cluster_rows = design['cluster_rows']
+    n_clusters = len(cluster_rows)
+    out = np.full((n_rep, X.shape[1]), np.nan)
+    for r in range(n_rep):
+        rows = np.concatenate([cluster_rows[c] for c in rng.integers(0, n_clusters, n_clusters)])
+        fit = fit_nb_glm(y[rows], X[rows], offset[rows], alpha)
+        if fit['converged']:
+            out[r] = fit['params']
+    return out
+
+def _bootstrap_chunk(args):
+    return _bootstrap_params(_WORKER_DESIGN, _WORKER_ALPHA, *args)
+
+def bootstrap_rate_ratios(intervals_df, n_boot=2000, cluster='disease_name', alpha=1.0, seed=0, n_workers=None,
+                          chunk_size=BOOTSTRAP_CHUNK, ci=0.95):
+    """
+    Cluster bootstrap of the pooled model: whole clusters (cluster column(s), e.g. ['disease_name', 'cycle'])
+    are resampled with replacement. With n_workers > 1 (or -1 for all cores) chunks of replicates run on a
+    process pool; the same seed gives the same replicates for any n_workers.
+    Returns {'replicates': coefficients per replicate, 'summary': percentile CIs on the rate ratio scale}.
+    """
+    design = build_design(intervals_df, cluster)
+    sizes = [min(chunk_size, n_boot - start) for start in range(0, n_boot, chunk_size)]
+    tasks = list(zip(np.random.SeedSequence(seed).spawn(len(sizes)), sizes))
+
+    if n_workers == -1:
+        n_workers = os.cpu_count() or 1
+    if n_workers is None or n_workers <= 1 or len(tasks) <= 1:
+        chunks = [_bootstrap_params(design, alpha, seed_seq, n_rep) for seed_seq, n_rep in tasks]
+    else:
+        from concurrent.futures import ProcessPoolExecutor
+        with ProcessPoolExecutor(max_workers=n_workers, initializer=_init_bootstrap_worker, initargs=(design, alpha)) as executor:
+            # map yields chunks in submission order
+            chunks = list(executor.map(_bootstrap_chunk, tasks))
+
+    params = np.vstack(chunks) if chunks else np.empty((0, len(design['columns'])))
+    replicates = pd.DataFrame(params, columns=design['columns'])
+    replicates.index.name = 'replicate'
+
+    point = fit_nb_glm(design['y'], design['X'], design['offset'], alpha)
+    q = [(1 - ci) / 2 * 100, (1 + ci) / 2 * 100]
+    rows = []
+    for term in PHASE_TERMS:
+        i = design['columns'].index(term)
+        values = replicates[term].dropna().to_numpy()
+        lo, hi = np.percentile(values, q) if len(values) else (np.nan, np.nan)
+        rows.append([TERM_LABELS[term], point['params'][i], np.exp(point['params'][i]), np.exp(lo), np.exp(hi), len(values)])
+    summary = pd.DataFrame(rows, columns=['Term', 'coef', 'rate_ratio', 'ci_lower_rr', 'ci_upper_rr', 'n_valid'])
+    return {'replicates': replicates, 'summary': summary}
@@ -1,24 +1,47 @@
 import pandas as pd
+import numpy as np
 import unicodedata
 from utils.data_loader import (
     load_raw_data, 
+    load_reference_tables,
+    clean_news_frame,
     get_transmission_route_mapping, 
     get_who_region_mapping,
     get_source_name_mapping,
-    process_source_list
+    process_source_list,
+    process_source_series
 )
 from utils.country_name_mapping import (
     build_country_mappings,
     extract_country_iso3_from_description,
     convert_iso2_to_iso3,
     map_headline_country_to_iso3,
-    combine_iso_codes
+    combine_iso_codes,
+    extract_country_iso3_series,
+    convert_iso2_to_iso3_series,
+    map_headline_country_to_iso3_series,
+    combine_iso_codes_series
 )
 from utils.disease_name_mapping import (
-    dict_disease_name_mapping,
-    dict_disease_name_mapping_en
+    dict_disease_name_mapping_en_norm,
+    resolve_disease_series
 )
-from utils.clean_visitor_data import clean_visitor_data, get_processed_visitor_data
+from utils.instrumentation import NULL_RECORDER, resolve_recorder
+
+# Visitor cleaning and the count cube are not needed by the news pipeline itself; they are imported where they
+# are used, and the names stay importable from this module through __getattr__
+_LAZY_NAMES = {
+    'clean_visitor_data': 'utils.clean_visitor_data',
+    'get_processed_visitor_data': 'utils.clean_visitor_data',
+    'build_count_cube': 'utils.aggregate_cube',
+    'save_count_cube': 'utils.aggregate_cube',
+}
+
+def __getattr__(name):
+    if name in _LAZY_NAMES:
+        import importlib
+        return getattr(importlib.import_module(_LAZY_NAMES[name]), name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 def normalize_token(s):
     """
@@ -28,62 +51,208 @@ def normalize_token(s):
         return s
     return unicodedata.normalize("NFKC", str(s)).strip()
 
-def run_daily_news_pipeline(epi_xlsx_path, tcdc_csv_path, country_xlsx_path, transmission_xlsx_path, research_end_date='2025-11-27'):
+def split_disease_names(disease_series):
+    """
+    Vectorized split of '/'-separated disease names into stripped lists (None where missing).
+    """
+    s = disease_series.reset_index(drop=True)
+    result = np.full(len(s), None, dtype=object)
+
+    valid = s[s.notna()]
+    if len(valid):
+        # Stripping the whole string and the whitespace around each '/' strips every token
+        lists = valid.astype(str).str.strip().str.split(r'\s*/\s*', regex=True)
+        result[valid.index.to_numpy()] = pd.Series(lists.tolist(), dtype=object).to_numpy()
+
+    return pd.Series(result, index=disease_series.index, dtype=object)
+
+def map_normalized_tokens(token_series, dict_norm):
+    """
+    Vectorized dict_norm.get(normalize_token(tok), tok).
+    """
+    valid = token_series.notna()
+    normalized = token_series[valid].astype(str).str.normalize("NFKC").str.strip()
+    mapped = normalized.map(dict_norm)
+
+    result = token_series.to_numpy(dtype=object, copy=True)
+    hit = mapped.notna().to_numpy()
+    result[np.flatnonzero(valid.to_numpy())[hit]] = mapped.to_numpy(dtype=object)[hit]
+    # Let pandas infer the dtype from the values, as Series.apply does
+    return pd.Series(result.tolist(), index=token_series.index)
+
+def concat_pair(left, right, sep='_'):
+    """
+    Vectorized f"{left}{sep}{right}" where both are present, None otherwise.
+    """
+    both = (left.notna() & right.notna()).to_numpy()
+    result = np.full(len(left), None, dtype=object)
+    if both.any():
+        joined = left[both].astype(str) + sep + right[both].astype(str)
+        result[both] = joined.to_numpy(dtype=object)
+    return pd.Series(result.tolist(), index=left.index)
+
+def run_daily_news_pipeline(epi_xlsx_path, tcdc_csv_path, country_xlsx_path, transmission_xlsx_path, research_end_date='2025-11-27', vectorized=False, cache_dir=None, n_workers=None, recorder=None, cube_path=None):
     """
     Orchestrates the entire data processing flow from raw files to the final consolidated DataFrame.
+    With vectorized=True, the row-wise apply calls are replaced by pandas string/explode/map operations;
+    the output is identical. cache_dir enables the raw input cache of load_raw_data.
+    n_workers > 1 (or -1 for all cores) shards the description country matching over a process pool.
+    recorder (a utils.instrumentation.StageRecorder) records time, memory and row counts of every stage;
+    without one, setting CDC_EIC_RUN_REPORT or CDC_EIC_PROFILE writes a JSON run report.
+    cube_path also builds the aggregate count cube (utils.aggregate_cube) and writes it there.
     """
+    recorder, report_path = resolve_recorder(recorder, 'run_daily_news_pipeline')
+
     # 1. Load data
-    df_raw, country_mapping_df, dat_transmission_route_raw, region_mapping_df = load_raw_data(
-        epi_xlsx_path, tcdc_csv_path, country_xlsx_path, transmission_xlsx_path, research_end_date
-    )
+    with recorder.stage('load') as record:
+        df_raw, country_mapping_df, dat_transmission_route_raw, region_mapping_df = load_raw_data(
+            epi_xlsx_path, tcdc_csv_path, country_xlsx_path, transmission_xlsx_path, research_end_date, cache_dir
+        )
+        record['rows_out'] = len(df_raw)
 
-    # 2. Country Mapping
+    df = process_news_data(df_raw, country_mapping_df, dat_transmission_route_raw, region_mapping_df, vectorized, n_workers=n_workers, recorder=recorder)
+
+    if cube_path is not None:
+        from utils.aggregate_cube import build_count_cube, save_count_cube
+        with recorder.stage('aggregate_cube', rows_in=len(df)) as record:
+            cube = build_count_cube(df)
+            save_count_cube(cube, cube_path)
+            record['rows_out'] = len(cube)
+
+    if report_path is not None:
+        recorder.meta.update({'vectorized': vectorized, 'n_workers': n_workers, 'research_end_date': research_end_date})
+        recorder.to_json(report_path)
+    return df
+
+def build_news_mappings(country_mapping_df, dat_transmission_route_raw, region_mapping_df):
+    """
+    Builds every lookup used by the mapping steps, so it can be done once and shared across chunks or workers.
+    """
     sorted_mapping, headline_cn_to_iso3, iso2_to_iso3 = build_country_mappings(country_mapping_df)
+    return {
+        'sorted_mapping': sorted_mapping,
+        'headline_cn_to_iso3': headline_cn_to_iso3,
+        'iso2_to_iso3': iso2_to_iso3,
+        'route_dict': get_transmission_route_mapping(dat_transmission_route_raw),
+        'source_mapping': get_source_name_mapping(),
+        'country_name_map_zh': dict(zip(country_mapping_df['ISO3166-1三位代碼'], country_mapping_df['監測國家/區域'])),
+        'country_name_map_en': dict(zip(country_mapping_df['ISO3166-1三位代碼'], country_mapping_df['監測國家/區域(英文)'])),
+        'dict_norm': dict_disease_name_mapping_en_norm,
+        'region_dict': get_who_region_mapping(region_mapping_df)
+    }
+
+def process_news_data(df_raw, country_mapping_df, dat_transmission_route_raw, region_mapping_df, vectorized=False, extra_columns=(), mappings=None, n_workers=None, recorder=None):
+    """
+    Runs the mapping and consolidation steps (2-7) on a loaded df_raw.
+    extra_columns of df_raw are carried through to the output (e.g. a row key).
+    mappings from build_news_mappings can be passed in to skip rebuilding them.
+    Each step is recorded as a stage of recorder (see utils.instrumentation).
+    """
+    recorder = recorder if recorder is not None else NULL_RECORDER
+
+    if mappings is None:
+        with recorder.stage('build_mappings'):
+            mappings = build_news_mappings(country_mapping_df, dat_transmission_route_raw, region_mapping_df)
+
+    n_rows = len(df_raw)
+    with recorder.stage('country_mapping', rows_in=n_rows) as record:
+        df_raw = _map_countries(df_raw, mappings, vectorized, n_workers)
+        record['rows_out'] = len(df_raw)
+
+    with recorder.stage('disease_mapping', rows_in=n_rows) as record:
+        df_raw = _map_diseases(df_raw, vectorized)
+        record['rows_out'] = len(df_raw)
+
+    with recorder.stage('transmission_routes', rows_in=n_rows) as record:
+        # 4. Transmission routes
+        route_dict = mappings['route_dict']
+        df_raw["transmission_route"] = df_raw["disease_name_unlist"].map(route_dict)
+        record['rows_out'] = len(df_raw)
+
+    with recorder.stage('source_cleaning', rows_in=n_rows) as record:
+        df_raw = _clean_sources(df_raw, mappings, vectorized)
+        record['rows_out'] = len(df_raw)
+
+    with recorder.stage('consolidation', rows_in=n_rows) as record:
+        df = _consolidate(df_raw, mappings, vectorized, extra_columns)
+        record['rows_out'] = len(df)
+
+    with recorder.stage('who_region', rows_in=len(df)) as record:
+        df = _map_who_regions(df, mappings)
+        record['rows_out'] = len(df)
+
+    return df
+
+def _map_countries(df_raw, mappings, vectorized, n_workers):
+    # 2. Country Mapping
+    sorted_mapping = mappings['sorted_mapping']
+    headline_cn_to_iso3 = mappings['headline_cn_to_iso3']
+    iso2_to_iso3 = mappings['iso2_to_iso3']
     
-    df_raw['description_iso3'] = df_raw['description'].apply(
-        lambda x: extract_country_iso3_from_description(x, sorted_mapping)
-    )
-    df_raw['ISO3166_to_3code'] = df_raw['ISO3166'].apply(
-        lambda x: convert_iso2_to_iso3(x, iso2_to_iso3)
-    )
-    df_raw['headline_country_iso3'] = df_raw['headline_country'].apply(
-        lambda x: map_headline_country_to_iso3(x, headline_cn_to_iso3)
-    )
-    df_raw['country_iso3'] = df_raw.apply(
-        lambda row: combine_iso_codes(row['ISO3166_to_3code'], 
-                                      row['description_iso3'],
-                                      row['headline_country_iso3']),
-        axis=1
-    )
+    if vectorized or (n_workers is not None and n_workers != 1):
+        df_raw['description_iso3'] = extract_country_iso3_series(df_raw['description'], sorted_mapping, n_workers)
+    else:
+        df_raw['description_iso3'] = df_raw['description'].apply(
+            lambda x: extract_country_iso3_from_description(x, sorted_mapping)
+        )
+
+    if vectorized:
+        df_raw['ISO3166_to_3code'] = convert_iso2_to_iso3_series(df_raw['ISO3166'], iso2_to_iso3)
+        df_raw['headline_country_iso3'] = map_headline_country_to_iso3_series(df_raw['headline_country'], headline_cn_to_iso3)
+        df_raw['country_iso3'] = combine_iso_codes_series(
+            df_raw['ISO3166_to_3code'], df_raw['description_iso3'], df_raw['headline_country_iso3']
+        )
+    else:
+        df_raw['ISO3166_to_3code'] = df_raw['ISO3166'].apply(
+            lambda x: convert_iso2_to_iso3(x, iso2_to_iso3)
+        )
+        df_raw['headline_country_iso3'] = df_raw['headline_country'].apply(
+            lambda x: map_headline_country_to_iso3(x, headline_cn_to_iso3)
+        )
+        df_raw['country_iso3'] = df_raw.apply(
+            lambda row: combine_iso_codes(row['ISO3166_to_3code'], 
+                                          row['description_iso3'],
+                                          row['headline_country_iso3']),
+            axis=1
+        )
+    return df_raw
 
+def _map_diseases(df_raw, vectorized):
     # 3. Disease Mapping
-    df_raw['disease_name_unlist'] = df_raw['headline_disease'].map(dict_disease_name_mapping).fillna(df_raw['headline_disease'])
+    # Listed variants map as in dict_disease_name_mapping; unseen variants go through the resolver rules
+    df_raw['disease_name_unlist'] = resolve_disease_series(df_raw['headline_disease'])
     
     # Split into list
-    df_raw['disease_name'] = df_raw['disease_name_unlist'].apply(
-        lambda x: [d.strip() for d in str(x).split('/')] if pd.notna(x) else None
-    )
-
-    # 4. Transmission routes
-    route_dict = get_transmission_route_mapping(dat_transmission_route_raw)
-    df_raw["transmission_route"] = df_raw["disease_name_unlist"].map(route_dict)
+    if vectorized:
+        df_raw['disease_name'] = split_disease_names(df_raw['disease_name_unlist'])
+    else:
+        df_raw['disease_name'] = df_raw['disease_name_unlist'].apply(
+            lambda x: [d.strip() for d in str(x).split('/')] if pd.notna(x) else None
+        )
+    return df_raw
 
+def _clean_sources(df_raw, mappings, vectorized):
     # 5. Source cleaning
-    source_mapping = get_source_name_mapping()
-    df_raw['Source_list'] = df_raw['Source'].apply(
-        lambda x: process_source_list(x, source_mapping)
-    )
+    source_mapping = mappings['source_mapping']
+    if vectorized:
+        df_raw['Source_list'] = process_source_series(df_raw['Source'], source_mapping)
+    else:
+        df_raw['Source_list'] = df_raw['Source'].apply(
+            lambda x: process_source_list(x, source_mapping)
+        )
+    return df_raw
 
+def _consolidate(df_raw, mappings, vectorized, extra_columns):
     # 6. Consolidation (Explode and Full Names)
     # Selecting meaningful variables as done in original notebook logic
-    df_temp = df_raw[["date","country_iso3","disease_name","description","transmission_route","Source","Source_list","SourceTime","SourceTime2"]].copy()
+    df_temp = df_raw[["date","country_iso3","disease_name","description","transmission_route","Source","Source_list","SourceTime","SourceTime2", *extra_columns]].copy()
     
     # Explode country
     df_expanded = df_temp.explode('country_iso3').reset_index(drop=True)
     
     # Map back full names
-    country_name_map_zh = dict(zip(country_mapping_df['ISO3166-1三位代碼'], country_mapping_df['監測國家/區域']))
-    country_name_map_en = dict(zip(country_mapping_df['ISO3166-1三位代碼'], country_mapping_df['監測國家/區域(英文)']))
+    country_name_map_zh = mappings['country_name_map_zh']
+    country_name_map_en = mappings['country_name_map_en']
     
     df_expanded['country_name_zh'] = df_expanded['country_iso3'].map(country_name_map_zh)
     df_expanded['country_name_en'] = df_expanded['country_iso3'].map(country_name_map_en)
@@ -92,25 +261,32 @@ def run_daily_news_pipeline(epi_xlsx_path, tcdc_csv_path, country_xlsx_path, tra
     df = df_expanded.explode('disease_name').reset_index(drop=True)
     
     # Map disease English name
-    dict_norm = {normalize_token(k): v for k, v in dict_disease_name_mapping_en.items()}
-    df['disease_name_en'] = df['disease_name'].apply(
-        lambda tok: dict_norm.get(normalize_token(tok), tok)
-    )
+    dict_norm = mappings['dict_norm']
+    if vectorized:
+        df['disease_name_en'] = map_normalized_tokens(df['disease_name'], dict_norm)
+        df['country_disease'] = concat_pair(df['country_name_zh'], df['disease_name'])
+        df['country_disease_en'] = concat_pair(df['country_name_en'], df['disease_name_en'])
+    else:
+        df['disease_name_en'] = df['disease_name'].apply(
+            lambda tok: dict_norm.get(normalize_token(tok), tok)
+        )
     
-    # Combined columns
-    df['country_disease'] = df.apply(
-        lambda row: f"{row['country_name_zh']}_{row['disease_name']}"
-        if pd.notna(row['country_name_zh']) and pd.notna(row['disease_name'])
-        else None,
-        axis=1)
-    df['country_disease_en'] = df.apply(
-        lambda row: f"{row['country_name_en']}_{row['disease_name_en']}"
-        if pd.notna(row['country_name_en']) and pd.notna(row['disease_name_en'])
-        else None,
-        axis=1)
+        # Combined columns
+        df['country_disease'] = df.apply(
+            lambda row: f"{row['country_name_zh']}_{row['disease_name']}"
+            if pd.notna(row['country_name_zh']) and pd.notna(row['disease_name'])
+            else None,
+            axis=1)
+        df['country_disease_en'] = df.apply(
+            lambda row: f"{row['country_name_en']}_{row['disease_name_en']}"
+            if pd.notna(row['country_name_en']) and pd.notna(row['disease_name_en'])
+            else None,
+            axis=1)
+    return df
 
+def _map_who_regions(df, mappings):
     # 7. WHO Region Mappings
-    region_dict = get_who_region_mapping(region_mapping_df)
+    region_dict = mappings['region_dict']
     df["WHO_region"] = df["country_iso3"].map(region_dict).fillna("其它")
     
     who_region_map_en = {
@@ -126,10 +302,54 @@ def run_daily_news_pipeline(epi_xlsx_path, tcdc_csv_path, country_xlsx_path, tra
 
     return df
 
+def iter_daily_news_pipeline(epi_xlsx_path, tcdc_csv_path, country_xlsx_path, transmission_xlsx_path, research_end_date='2025-11-27', chunksize=10000, cache_dir=None):
+    """
+    Streaming variant of run_daily_news_pipeline: reads the TCDC CSV in chunks and yields each
+    processed chunk, so peak memory follows chunksize instead of the full history.
+    The row index continues across chunks; concatenating the chunks gives the vectorized pipeline output.
+    """
+    df_source, country_mapping_df, dat_transmission_route_raw, region_mapping_df = load_reference_tables(
+        epi_xlsx_path, country_xlsx_path, transmission_xlsx_path, cache_dir
+    )
+    mappings = build_news_mappings(country_mapping_df, dat_transmission_route_raw, region_mapping_df)
+
+    offset = 0
+    for chunk in pd.read_csv(tcdc_csv_path, chunksize=chunksize):
+        df_chunk = clean_news_frame(chunk, df_source, research_end_date)
+        if df_chunk.empty:
+            continue
+        df = process_news_data(df_chunk, None, None, None, vectorized=True, mappings=mappings)
+        df.index = pd.RangeIndex(offset, offset + len(df))
+        offset += len(df)
+        yield df
+
+def make_csv_sink(output_path):
+    """
+    Returns a sink that writes streamed chunks into one CSV file (header written once).
+    """
+    state = {'first': True}
+
+    def sink(df_chunk):
+        df_chunk.to_csv(output_path, mode='w' if state['first'] else 'a', header=state['first'], index=False, encoding='utf-8-sig' if state['first'] else 'utf-8')
+        state['first'] = False
+
+    return sink
+
+def run_daily_news_pipeline_streaming(epi_xlsx_path, tcdc_csv_path, country_xlsx_path, transmission_xlsx_path, sink, research_end_date='2025-11-27', chunksize=10000, cache_dir=None):
+    """
+    Passes every processed chunk to sink (a callable, e.g. make_csv_sink(path)) and returns the number of rows written.
+    """
+    n_rows = 0
+    for df_chunk in iter_daily_news_pipeline(epi_xlsx_path, tcdc_csv_path, country_xlsx_path, transmission_xlsx_path, research_end_date, chunksize, cache_dir):
+        sink(df_chunk)
+        n_rows += len(df_chunk)
+    return n_rows
+
 def run_full_pipeline(epi_xlsx_path, tcdc_csv_path, country_xlsx_path, transmission_xlsx_path, visitor_xlsx_path):
     """
     Runs both the daily news pipeline and the visitor data cleaning.
     """
+    from utils.clean_visitor_data import clean_visitor_data
     df_news = run_daily_news_pipeline(epi_xlsx_path, tcdc_csv_path, country_xlsx_path, transmission_xlsx_path)
     df_visitors = clean_visitor_data(visitor_xlsx_path)
     
@@ -0,0 +1,620 @@
+import pandas as pd
+import asyncio
+import concurrent.futures
+import hashlib
+import json
+import os
+import random
+import re
+import time
+import urllib.error
+import urllib.request
+
+# Gemini classification of press releases (does the release contain international epidemic intelligence?).
+# - requests go to the Gemini REST endpoint (generateContent); base_url can point to a local stub server
+# - a token bucket keeps the request rate at target_rpm; a 429 halves the rate and pauses the bucket,
+#   successes raise it back to target_rpm step by step (additive increase, multiplicative decrease)
+# - responses are cached on disk by hash(prompt, model, system instruction), so a re-run with the same
+#   prompts costs no API calls; failed calls are never cached
+# - classify_press_data appends every finished row to a JSONL checkpoint and skips checkpointed rows on resume;
+#   records are matched by a hash of the release text (with model and system instruction, as the response cache),
+#   not by Index, which shifts when a new dump adds or corrects releases
+# - with batch_size > 1, several releases are packed into one request (split by a token budget) and answered
+#   as an array of {index, analysis, result}; a batch whose answer does not parse falls back to single calls
+
+DEFAULT_MODEL = 'gemini-2.5-flash'
+DEFAULT_BASE_URL = 'https://generativelanguage.googleapis.com'
+DEFAULT_CACHE_DIR = 'cache/gemini'
+TARGET_RPM = 700         # Target Requests Per Minute (safety margin below the 1000 limit)
+MAX_CONCURRENCY = 32     # requests in flight at once
+MAX_RETRIES = 5
+REQUEST_TIMEOUT = 120
+
+# System Instruction: This defines the AI's persona, rules, and output format.
+SYSTEM_INSTRUCTION = """
+# 角色
+你是一位臺灣疾病管制署的流行病學家。
+# 任務
+二分法分類任務為判斷新聞稿是否提及「臺灣以外的國際疫情資訊」，準則如下：
+## 判定為'1'(是)的準則(任一項即符合)
+- 文中提及國外(如中國、東南亞區域、全球等）的病例數、規模、流行型別、或疫情趨勢(範例：香港累計報告10例病例、歐洲疫情下降、全球疫情嚴峻、WHO指出目前BA.5及其衍生變異株仍為全球主流株)。
+- 文中提及「國際旅遊疫情建議等級」(範例：全球疫情等級第二級、日本疫情等級第一級)。
+## 判定為'0'(否)的準則(任一項即符合)
+- 僅提到地名疾病(如：日本腦炎、德國麻疹），但個案在臺灣且未描述外國疫情資訊(範例：國內新增5例日本腦炎確定病例)。
+- 僅提及臺灣的「境外移入個案」，但並未描述該來源國的疫情資訊(範例：國內境外移入之2例個案，分別自中國及越南移入)。
+- 其餘任何不完全符合「判定為 1(是)」準則之內容，一律判定為'0'。
+## 任務執行要求
+請評估新聞稿內容，並嚴格以JSON格式回復如下：
+- analysis：分析並簡述文中是否包含「臺灣以外的國際疫情資訊」。
+- result：僅回覆'1'或'0'。
+## 輸出範例
+{"analysis":"文中提到泰國病例數，符合準則1。", "result":1}
+"""
+
+RESPONSE_SCHEMA = {
+    "type": "OBJECT",
+    "properties": {
+        "analysis": {"type": "STRING", "description": "Brief reasoning in 30 chars."},
+        "result": {"type": "INTEGER", "description": "1 if international outbreak, 0 otherwise."}
+    },
+    "required": ["analysis", "result"]
+}
+
+# Appended to SYSTEM_INSTRUCTION for packed requests
+BATCH_INSTRUCTION_SUFFIX = """
+## 批次輸入
+輸入包含多則新聞稿，每則以「[編號]」開頭。請逐則依上述準則獨立判斷，
+並回覆JSON陣列，每則一個物件：index(該則編號)、analysis、result，不可遺漏任何編號。
+## 批次輸出範例
+[{"index":0, "analysis":"文中提到泰國病例數，符合準則1。", "result":1}, {"index":1, "analysis":"僅國內病例。", "result":0}]
+"""
+
+BATCH_RESPONSE_SCHEMA = {
+    "type": "ARRAY",
+    "items": {
+        "type": "OBJECT",
+        "properties": {
+            "index": {"type": "INTEGER", "description": "Number of the press release in the input."},
+            "analysis": {"type": "STRING", "description": "Brief reasoning in 30 chars."},
+            "result": {"type": "INTEGER", "description": "1 if international outbreak, 0 otherwise."}
+        },
+        "required": ["index", "analysis", "result"]
+    }
+}
+
+DEFAULT_BATCH_SIZE = 10
+MAX_BATCH_TOKENS = 24000   # input token budget per packed request
+
+def build_prompt(text):
+    return f"新聞稿內容：{text}。"
+
+def build_batch_prompt(texts):
+    return "\n\n".join(f"[{i}] {build_prompt(text)}" for i, text in enumerate(texts))
+
+def estimate_tokens(text):
+    """
+    Rough token count: about one token per CJK character, four characters per token otherwise.
+    """
+    n_cjk = len(re.findall(r'[\u3000-\u9fff\uff00-\uffef]', text))
+    return n_cjk + (len(text) - n_cjk) // 4 + 8
+
+def pack_batches(texts, batch_size=DEFAULT_BATCH_SIZE, max_batch_tokens=MAX_BATCH_TOKENS):
+    """
+    Splits positions of texts into batches of at most batch_size items and max_batch_tokens estimated tokens.
+    An item over the budget on its own gets a batch of one.
+    """
+    batches, current, current_tokens = [], [], 0
+    for position, text in enumerate(texts):
+        tokens = estimate_tokens(text)
+        if current and (len(current) >= batch_size or current_tokens + tokens > max_batch_tokens):
+            batches.append(current)
+            current, current_tokens = [], 0
+        current.append(position)
+        current_tokens += tokens
+    if current:
+        batches.append(current)
+    return batches
+
+def parse_batch_classification(text, n_items):
+    """
+    Parses a packed answer into n_items result dicts (in input order), or returns None when any item
+    is missing, duplicated or not 0/1.
+    """
+    try:
+        items = json.loads(text)
+    except (TypeError, json.JSONDecodeError):
+        return None
+    if not isinstance(items, list):
+        return None
+    results = [None] * n_items
+    for item in items:
+        if not isinstance(item, dict):
+            return None
+        index, result = item.get('index'), item.get('result')
+        if not isinstance(index, int) or not 0 <= index < n_items or results[index] is not None:
+            return None
+        if result not in (0, 1):
+            return None
+        results[index] = {"analysis": item.get('analysis', ''), "result": result}
+    return results if all(r is not None for r in results) else None
+
+def parse_classification(text):
+    """
+    Parses the model's JSON answer; malformed JSON, or JSON that is not an object, falls back to regex
+    extraction of result/analysis.
+    """
+    if not text:
+        return {"analysis": "Empty Response", "result": 0}
+    try:
+        parsed = json.loads(text)
+    except json.JSONDecodeError:
+        parsed = None
+    if isinstance(parsed, dict):
+        return parsed
+    res_match = re.search(r'"result":\s*"?(0|1)', text)
+    ana_match = re.search(r'"analysis":\s*"(.*?)"', text, re.DOTALL)
+    result_val = int(res_match.group(1)) if res_match else 0
+    analysis_val = ana_match.group(1) if ana_match else "Regex Recovery"
+    return {"analysis": f"Fixed: {analysis_val[:20]}", "result": result_val}
+
+class RateLimitError(Exception):
+    def __init__(self, status, retry_after=None):
+        super().__init__(f"HTTP {status}")
+        self.status = status
+        self.retry_after = retry_after
+
+class TokenBucket:
+    """
+    Async token bucket at `rpm` requests per minute with additive-increase / multiplicative-decrease on 429s.
+    """
+    def __init__(self, rpm=TARGET_RPM, burst=None, min_rpm=30):
+        self.target_rate = rpm / 60
+        self.rate = self.target_rate
+        self.min_rate = min_rpm / 60
+        self.capacity = burst if burst is not None else max(1, int(self.target_rate))
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.paused_until = 0.0
+        self._lock = asyncio.Lock()
+
+    def _refill(self, now):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    async def acquire(self):
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                if now < self.paused_until:
+                    await asyncio.sleep(self.paused_until - now)
+                    continue
+                self._refill(now)
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+
+    def on_success(self):
+        # Regain the target rate over roughly a minute of successful calls
+        self.rate = min(self.target_rate, self.rate + self.target_rate / 60)
+
+    def on_rate_limited(self, retry_after=None):
+        now = time.monotonic()
+        self._refill(now)
+        self.rate = max(self.min_rate, self.rate / 2)
+        self.tokens = 0
+        self.paused_until = max(self.paused_until, now + (retry_after if retry_after else 1 / self.rate))
+
+class ResponseCache:
+    """
+    On-disk cache of model answers, one JSON file per hash(prompt, model, system instruction).
+    """
+    def __init__(self, cache_dir=DEFAULT_CACHE_DIR):
+        self.cache_dir = cache_dir
+
+    @staticmethod
+    def key(prompt, model, system_instruction):
+        payload = json.dumps([model, system_instruction, prompt], ensure_ascii=False)
+        return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+    def _path(self, key):
+        return os.path.join(self.cache_dir, key[:2], key + '.json')
+
+    def get(self, key):
+        path = self._path(key)
+        if not os.path.exists(path):
+            return None
+        try:
+            with open(path, encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def put(self, key, value):
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path + '.tmp', 'w', encoding='utf-8') as f:
+            json.dump(value, f, ensure_ascii=False)
+        os.replace(path + '.tmp', path)
+
+class GeminiClassifier:
+    """
+    Async press release classifier. api_key defaults to GEMINI_API_KEY / GOOGLE_API_KEY;
+    cache_dir=None disables the response cache. stats counts API calls, cache hits, 429s and failures.
+    """
+    def __init__(self, api_key=None, model=DEFAULT_MODEL, system_instruction=SYSTEM_INSTRUCTION,
+                 response_schema=RESPONSE_SCHEMA, temperature=1.0, base_url=DEFAULT_BASE_URL,
+                 target_rpm=TARGET_RPM, max_concurrency=MAX_CONCURRENCY, cache_dir=DEFAULT_CACHE_DIR,
+                 max_retries=MAX_RETRIES, timeout=REQUEST_TIMEOUT):
+        self.api_key = api_key or os.environ.get('GEMINI_API_KEY') or os.environ.get('GOOGLE_API_KEY')
+        self.model = model
+        self.system_instruction = system_instruction
+        self.response_schema = response_schema
+        self.temperature = temperature
+        self.base_url = base_url.rstrip('/')
+        self.target_rpm = target_rpm
+        self.max_concurrency = max_concurrency
+        self.cache = ResponseCache(cache_dir) if cache_dir is not None else None
+        self.max_retries = max_retries
+        self.timeout = timeout
+        self.stats = {'api_calls': 0, 'cache_hits': 0, 'rate_limited': 0, 'failures': 0, 'batch_fallbacks': 0}
+        # Created inside the running event loop (see _ensure_loop_state)
+        self._loop = None
+        self._limiter = None
+        self._semaphore = None
+        # The blocking HTTP calls run here; asyncio's default executor may have fewer threads than max_concurrency
+        self._executor = concurrent.futures.ThreadPoolExecutor(max_workers=max_concurrency)
+
+    def close(self):
+        """
+        Shuts down the worker threads of the HTTP calls; the classifier cannot be used afterwards.
+        """
+        self._executor.shutdown(wait=True)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def _ensure_loop_state(self):
+        loop = asyncio.get_running_loop()
+        if self._limiter is None or self._loop is not loop:
+            self._loop = loop
+            self._limiter = TokenBucket(self.target_rpm)
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+
+    @property
+    def batch_system_instruction(self):
+        return self.system_instruction + BATCH_INSTRUCTION_SUFFIX
+
+    def _request_body(self, prompt, system_instruction, response_schema):
+        return {
+            "systemInstruction": {"parts": [{"text": system_instruction}]},
+            "contents": [{"role": "user", "parts": [{"text": prompt}]}],
+            "generationConfig": {
+                "temperature": self.temperature,
+                "responseMimeType": "application/json",
+                "responseSchema": response_schema
+            }
+        }
+
+    def _post(self, prompt, system_instruction, response_schema):
+        """
+        Blocking generateContent call; returns the answer text. Raises RateLimitError on 429/5xx.
+        """
+        url = f"{self.base_url}/v1beta/models/{self.model}:generateContent"
+        headers = {'Content-Type': 'application/json'}
+        if self.api_key:
+            headers['x-goog-api-key'] = self.api_key
+        data = json.dumps(self._request_body(prompt, system_instruction, response_schema), ensure_ascii=False).encode('utf-8')
+        request = urllib.request.Request(url, data=data, headers=headers, method='POST')
+        try:
+            with urllib.request.urlopen(request, timeout=self.timeout) as response:
+                payload = json.loads(response.read().decode('utf-8'))
+        except urllib.error.HTTPError as e:
+            if e.code == 429 or e.code >= 500:
+                retry_after = e.headers.get('Retry-After') if e.headers else None
+                raise RateLimitError(e.code, float(retry_after) if retry_after and retry_after.isdigit() else None)
+            raise
+        candidates = payload.get('candidates') or []
+        if not candidates:
+            return ''
+        parts = candidates[0].get('content', {}).get('parts') or []
+        return ''.join(part.get('text', '') for part in parts)
+
+    async def generate(self, prompt, system_instruction=None, response_schema=None, use_cache=True):
+        """
+        Returns the raw answer text for prompt (cached), retrying 429/5xx/network errors with backoff.
+        system_instruction/response_schema default to the single-item ones.
+        """
+        self._ensure_loop_state()
+        system_instruction = system_instruction or self.system_instruction
+        response_schema = response_schema or self.response_schema
+        key = ResponseCache.key(prompt, self.model, system_instruction)
+        use_cache = use_cache and self.cache is not None
+        if use_cache:
+            cached = self.cache.get(key)
+            if cached is not None:
+                self.stats['cache_hits'] += 1
+                return cached['text']
+
+        for attempt in range(self.max_retries):
+            await self._limiter.acquire()
+            try:
+                async with self._semaphore:
+                    self.stats['api_calls'] += 1
+                    text = await asyncio.get_running_loop().run_in_executor(
+                        self._executor, self._post, prompt, system_instruction, response_schema
+                    )
+            except RateLimitError as e:
+                self.stats['rate_limited'] += 1
+                self._limiter.on_rate_limited(e.retry_after)
+                if attempt == self.max_retries - 1:
+                    raise
+                continue
+            except (urllib.error.URLError, TimeoutError, ConnectionError):
+                if attempt == self.max_retries - 1:
+                    raise
+                # Exponential backoff with jitter for network errors
+                await asyncio.sleep(min(60, 2 ** attempt) * (0.5 + random.random()))
+                continue
+
+            self._limiter.on_success()
+            if use_cache:
+                self.cache.put(key, {'text': text, 'model': self.model})
+            return text
+
+    async def classify(self, text, use_cache=True):
+        """
+        Classifies one press release; returns {"analysis": ..., "result": 0/1}.
+        Errors after all retries come back as result 0 with the error in analysis (not cached).
+        """
+        if not isinstance(text, str) or text.strip() == "":
+            return {"analysis": "Empty input", "result": 0}
+        try:
+            return parse_classification(await self.generate(build_prompt(text), use_cache=use_cache))
+        except Exception as e:
+            self.stats['failures'] += 1
+            return {"analysis": f"API Error: {str(e)[:40]}", "result": 0, "error": True}
+
+    def text_key(self, text):
+        """
+        Checkpoint key of a press release: the response cache key of its single-item prompt.
+        """
+        return ResponseCache.key(build_prompt(text if isinstance(text, str) else ''), self.model, self.system_instruction)
+
+    def _item_cache_key(self, text):
+        # Items answered inside a packed request are cached one by one, so re-runs do not depend on batch composition
+        return ResponseCache.key(build_prompt(text), self.model, self.batch_system_instruction)
+
+    def _cached_item_result(self, text):
+        """
+        A cached answer for text from a packed request or, failing that, from a single-item request.
+        """
+        if self.cache is None:
+            return None
+        cached = self.cache.get(self._item_cache_key(text))
+        if cached is not None:
+            return cached['result']
+        cached = self.cache.get(ResponseCache.key(build_prompt(text), self.model, self.system_instruction))
+        return parse_classification(cached['text']) if cached is not None else None
+
+    async def classify_batch(self, texts, use_cache=True):
+        """
+        Classifies several press releases with one packed request. Falls back to one call per item
+        when the answer cannot be parsed or the request fails.
+        use_cache=False neither reads nor stores cached answers (packed or single-item).
+        """
+        results = [None] * len(texts)
+        pending = []
+        for i, text in enumerate(texts):
+            if not isinstance(text, str) or text.strip() == "":
+                results[i] = {"analysis": "Empty input", "result": 0}
+                continue
+            cached = self._cached_item_result(text) if use_cache else None
+            if cached is not None:
+                self.stats['cache_hits'] += 1
+                results[i] = cached
+            else:
+                pending.append(i)
+        if not pending:
+            return results
+
+        parsed = None
+        try:
+            answer = await self.generate(build_batch_prompt([texts[i] for i in pending]),
+                                         self.batch_system_instruction, BATCH_RESPONSE_SCHEMA, use_cache=False)
+            parsed = parse_batch_classification(answer, len(pending))
+        except Exception:
+            pass
+
+        if parsed is None:
+            self.stats['batch_fallbacks'] += 1
+            singles = await asyncio.gather(*(self.classify(texts[i], use_cache) for i in pending))
+            for i, result in zip(pending, singles):
+                results[i] = result
+            return results
+
+        for i, result in zip(pending, parsed):
+            results[i] = result
+            if use_cache and self.cache is not None:
+                self.cache.put(self._item_cache_key(texts[i]), {'result': result, 'model': self.model})
+        return results
+
+    async def classify_many(self, texts, on_result=None, batch_size=1, max_batch_tokens=MAX_BATCH_TOKENS,
+                            use_cache=True):
+        """
+        Classifies texts concurrently; on_result(position, result) is called as each one finishes.
+        batch_size > 1 packs up to batch_size texts (within max_batch_tokens) into each request.
+        """
+        async def run(position, text):
+            result = await self.classify(text, use_cache)
+            if on_result is not None:
+                on_result(position, result)
+            return result
+
+        async def run_batch(positions):
+            batch_results = await self.classify_batch([texts[p] for p in positions], use_cache)
+            for position, result in zip(positions, batch_results):
+                if on_result is not None:
+                    on_result(position, result)
+            return batch_results
+
+        if batch_size <= 1:
+            return await asyncio.gather(*(run(i, t) for i, t in enumerate(texts)))
+
+        texts = ["" if not isinstance(t, str) else t for t in texts]
+        batches = pack_batches(texts, batch_size, max_batch_tokens)
+        results = [None] * len(texts)
+        for positions, batch_results in zip(batches, await asyncio.gather(*(run_batch(b) for b in batches))):
+            for position, result in zip(positions, batch_results):
+                results[position] = result
+        return results
+
+def load_checkpoint(checkpoint_path):
+    """
+    Returns {text_key: result dict} from a JSONL checkpoint (a torn last line is ignored). Records without
+    a text_key (written before it was stored) cannot be matched to their text and are ignored.
+    """
+    done = {}
+    if checkpoint_path is None or not os.path.exists(checkpoint_path):
+        return done
+    with open(checkpoint_path, encoding='utf-8') as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except ValueError:
+                continue
+            if 'text_key' in record:
+                done[record['text_key']] = record['output']
+    return done
+
+async def classify_press_data_async(df_press, classifier=None, checkpoint_path=None, text_column='subject_content', batch_size=1):
+    """
+    Adds gemini_output and flag_international_outbreak_gemini to the get_cleaned_press_data output.
+    Rows whose text is already in checkpoint_path are not classified again; finished rows are appended to it.
+    batch_size > 1 packs that many releases into each request.
+    """
+    owned = classifier is None
+    classifier = classifier or GeminiClassifier()
+    done = load_checkpoint(checkpoint_path)
+    keys = pd.Series([classifier.text_key(text) for text in df_press[text_column]], index=df_press.index)
+    todo = df_press[~keys.isin(list(done))]
+
+    checkpoint = None
+    if checkpoint_path is not None:
+        os.makedirs(os.path.dirname(checkpoint_path) or '.', exist_ok=True)
+        checkpoint = open(checkpoint_path, 'a', encoding='utf-8')
+
+    indexes, todo_keys = todo['Index'].tolist(), keys[todo.index].tolist()
+
+    def on_result(position, result):
+        done[todo_keys[position]] = result
+        if checkpoint is not None and not result.get('error'):
+            record = {'Index': int(indexes[position]), 'text_key': todo_keys[position], 'output': result}
+            checkpoint.write(json.dumps(record, ensure_ascii=False) + '\n')
+            checkpoint.flush()
+
+    try:
+        await classifier.classify_many(todo[text_column].tolist(), on_result, batch_size=batch_size)
+    finally:
+        if checkpoint is not None:
+            checkpoint.close()
+        # a classifier passed in stays open for the caller
+        if owned:
+            classifier.close()
+
+    df = df_press.copy()
+    outputs = keys.map(done)
+    df['gemini_output'] = outputs.map(lambda x: json.dumps({k: v for k, v in x.items() if k != 'error'}, ensure_ascii=False))
+    df['flag_international_outbreak_gemini'] = outputs.map(lambda x: int(x.get('result', 0)))
+    return df
+
+def classify_press_data(df_press, classifier=None, checkpoint_path=None, text_column='subject_content', batch_size=1):
+    """
+    Synchronous wrapper of classify_press_data_async (for scripts; in a notebook, await the async version).
+    """
+    return asyncio.run(classify_press_data_async(df_press, classifier, checkpoint_path, text_column, batch_size))
+
+def summarize_international_by_year(df):
+    """
+    Yearly count and percentage of press releases flagged as international.
+    """
+    df = df.copy()
+    df["year"] = pd.to_datetime(df["PublishTime"], errors='coerce').dt.year
+    df["flag_international_outbreak_gemini"] = pd.to_numeric(
+        df["flag_international_outbreak_gemini"], errors='coerce').fillna(0).astype(int)
+    return (
+        df.groupby("year")
+        .agg(
+            count_international=("flag_international_outbreak_gemini", "sum"),
+            count_total=("flag_international_outbreak_gemini", "size")
+        )
+        .assign(perc_international=lambda x: ((x["count_international"] / x["count_total"]) * 100).round(1))
+        .reset_index()
+    )
+
+def evaluate_classification(df, truth_column='flag_international_outbreak_human_final',
+                            pred_column='flag_international_outbreak_gemini', sampled_only=True):
+    """
+    Accuracy, precision, recall, F1 and confusion counts of pred_column against the human flags
+    (the metrics of evaluate_gemini_performance in main.ipynb), on the Sampled == 1 rows by default.
+    """
+    eval_df = df[df["Sampled"] == 1] if sampled_only else df
+    y_true = pd.to_numeric(eval_df[truth_column], errors='coerce').fillna(0).astype(int)
+    y_pred = pd.to_numeric(eval_df[pred_column], errors='coerce').fillna(0).astype(int)
+
+    tp = int(((y_true == 1) & (y_pred == 1)).sum())
+    tn = int(((y_true == 0) & (y_pred == 0)).sum())
+    fp = int(((y_true == 0) & (y_pred == 1)).sum())
+    fn = int(((y_true == 1) & (y_pred == 0)).sum())
+    n = len(eval_df)
+    precision = tp / (tp + fp) if tp + fp else float('nan')
+    recall = tp / (tp + fn) if tp + fn else float('nan')
+    return {
+        'n': n,
+        'accuracy': (tp + tn) / n if n else float('nan'),
+        'precision': precision,
+        'recall': recall,
+        'f1': 2 * precision * recall / (precision + recall) if tp else 0.0,
+        'tp': tp, 'tn': tn, 'fp': fp, 'fn': fn
+    }
+
+async def compare_batch_parity_async(df_press, classifier=None, batch_size=DEFAULT_BATCH_SIZE,
+                                     truth_column='flag_international_outbreak_human_final', text_column='subject_content'):
+    """
+    Classifies the Sampled rows one per request and packed batch_size per request, and returns
+    evaluate_classification of both plus their agreement, to confirm packing does not cost accuracy.
+    Both passes bypass the response cache, so each answer comes from its own kind of request.
+    """
+    owned = classifier is None
+    classifier = classifier or GeminiClassifier()
+    df_sample = df_press[df_press["Sampled"] == 1].copy()
+    texts = df_sample[text_column].tolist()
+
+    try:
+        single = await classifier.classify_many(texts, use_cache=False)
+        calls_before, fallbacks_before = classifier.stats['api_calls'], classifier.stats['batch_fallbacks']
+        packed = await classifier.classify_many(texts, batch_size=batch_size, use_cache=False)
+    finally:
+        if owned:
+            classifier.close()
+    packed_api_calls = classifier.stats['api_calls'] - calls_before
+    if packed_api_calls == 0 and any(isinstance(t, str) and t.strip() for t in texts):
+        raise RuntimeError("The packed pass made no API calls; its results would not show packed accuracy")
+
+    df_sample['flag_single'] = [int(r.get('result', 0)) for r in single]
+    df_sample['flag_packed'] = [int(r.get('result', 0)) for r in packed]
+    return {
+        'single': evaluate_classification(df_sample, truth_column, 'flag_single'),
+        'packed': evaluate_classification(df_sample, truth_column, 'flag_packed'),
+        'agreement': float((df_sample['flag_single'] == df_sample['flag_packed']).mean()) if len(df_sample) else float('nan'),
+        'packed_api_calls': packed_api_calls,
+        # packed requests answered one item per call instead (their items count as single-item answers)
+        'packed_batch_fallbacks': classifier.stats['batch_fallbacks'] - fallbacks_before
+    }
+
+def compare_batch_parity(df_press, classifier=None, batch_size=DEFAULT_BATCH_SIZE,
+                         truth_column='flag_international_outbreak_human_final', text_column='subject_content'):
+    return asyncio.run(compare_batch_parity_async(df_press, classifier, batch_size, truth_column, text_column))
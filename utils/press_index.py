@@ -0,0 +1,173 @@
+import pandas as pd
+import numpy as np
+import hashlib
+import json
+import os
+from utils.cache import module_source_hash
+from utils.country_name_mapping import CountryVariationMatcher, build_country_mappings
+from utils.disease_name_mapping import dict_disease_name_mapping, dict_disease_name_mapping_en, resolve_disease_name
+
+# Inverted index over cleaned press releases (get_cleaned_press_data output).
+# - fields: country (ISO3 via the country variations of build_country_mappings), disease (canonical names via
+#   the disease mapping) and year of PublishTime; each term maps to a sorted array of release Index values
+# - texts are scanned once, longest variation first (CountryVariationMatcher), so 尼日 is not found inside 奈及利亞
+#   and 流感 not inside 新型A型流感; distinct texts are scanned only once
+# - queries AND across fields and OR within a field's list of terms, on the posting arrays only
+# - the index is stored as JSON next to the cleaned table together with a fingerprint of everything it is built
+#   from: (Index, text, PublishTime), the country table, the extra disease names and the source of the matching
+#   code (INDEX_MODULES), so a new data dump or a changed mapping is detected and the index rebuilt
+
+INDEX_FIELDS = ['country', 'disease', 'year']
+DEFAULT_INDEX_PATH = 'output/table/press_index.json'
+# Modules whose code decides the terms found in a release
+INDEX_MODULES = ['utils.press_index', 'utils.country_name_mapping', 'utils.disease_name_mapping']
+
+def build_disease_matcher(disease_names=()):
+    """
+    Matcher over disease name variants -> canonical name: keys and values of dict_disease_name_mapping, the
+    names of dict_disease_name_mapping_en, plus disease_names (e.g. disease_name values of the pipeline output).
+    """
+    terms = dict(dict_disease_name_mapping)
+    for name in list(dict_disease_name_mapping.values()) + list(dict_disease_name_mapping_en) + list(disease_names):
+        if isinstance(name, str) and name.strip():
+            terms.setdefault(name.strip(), resolve_disease_name(name.strip()))
+    return CountryVariationMatcher(sorted(terms.items(), key=lambda x: len(x[0]), reverse=True))
+
+def press_fingerprint(df_press, country_mapping_df, text_column='subject_content', disease_names=(),
+                      modules=INDEX_MODULES):
+    """
+    Hash of the inputs of build_press_index: release Index values, texts and PublishTime, the country table,
+    disease_names and the source of the matching modules.
+    """
+    digest = hashlib.sha256()
+    hashed = pd.util.hash_pandas_object(df_press[['Index', text_column, 'PublishTime']], index=False)
+    digest.update(hashed.to_numpy().tobytes())
+    digest.update(','.join(map(str, country_mapping_df.columns)).encode('utf-8'))
+    digest.update(pd.util.hash_pandas_object(country_mapping_df, index=True).to_numpy().tobytes())
+    names = sorted({str(name).strip() for name in disease_names if isinstance(name, str) and name.strip()})
+    digest.update(json.dumps(names, ensure_ascii=False).encode('utf-8'))
+    for module in modules:
+        digest.update(f'{module}:{module_source_hash(module)}'.encode('utf-8'))
+    return digest.hexdigest()
+
+def _postings(terms, ids):
+    """
+    term -> sorted unique id array from aligned (term, id) arrays.
+    """
+    if len(terms) == 0:
+        return {}
+    pairs = pd.DataFrame({'term': terms, 'id': ids}).drop_duplicates()
+    return {term: np.sort(group.to_numpy(dtype='int64')) for term, group in pairs.groupby('term', sort=True)['id']}
+
+class PressIndex:
+    """
+    Posting lists of release Index values per field and term. Use as
+        index = build_press_index(df_press, country_mapping_df)
+        ids = index.query(country=['THA', 'VNM'], disease='登革熱', year=range(2019, 2024))
+        df_press[df_press['Index'].isin(ids)]
+    """
+    def __init__(self, postings, ids, fingerprint=None):
+        self.postings = postings
+        self.ids = np.sort(np.asarray(ids, dtype='int64'))
+        self.fingerprint = fingerprint
+
+    def terms(self, field):
+        return list(self.postings[field])
+
+    def lookup(self, field, term):
+        """
+        Sorted Index values of releases with term in field (empty if none).
+        """
+        return self.postings[field].get(term, np.empty(0, dtype='int64'))
+
+    def any_of(self, field, terms):
+        terms = [terms] if np.ndim(terms) == 0 and not isinstance(terms, range) else list(terms)
+        arrays = [self.lookup(field, term) for term in terms]
+        return np.unique(np.concatenate(arrays)) if arrays else np.empty(0, dtype='int64')
+
+    def query(self, exclude=None, **filters):
+        """
+        Index values matching every field filter (a term or a list of terms: any of them) and none of the
+        terms in exclude (a dict of the same form), e.g. query(country='CHN', exclude={'disease': 'COVID-19'}).
+        """
+        result = self.ids
+        for field, terms in filters.items():
+            if terms is not None:
+                result = np.intersect1d(result, self.any_of(field, terms), assume_unique=True)
+        for field, terms in (exclude or {}).items():
+            result = np.setdiff1d(result, self.any_of(field, terms), assume_unique=True)
+        return result
+
+    def counts(self, field):
+        """
+        Number of releases per term of field.
+        """
+        return pd.Series({term: len(ids) for term, ids in self.postings[field].items()}, dtype='int64').sort_values(ascending=False)
+
+    def save(self, path=DEFAULT_INDEX_PATH):
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        content = {
+            'fingerprint': self.fingerprint,
+            'ids': self.ids.tolist(),
+            'postings': {field: {str(term): ids.tolist() for term, ids in terms.items()}
+                         for field, terms in self.postings.items()}
+        }
+        with open(path + '.tmp', 'w', encoding='utf-8') as f:
+            json.dump(content, f, ensure_ascii=False)
+        os.replace(path + '.tmp', path)
+        return path
+
+    @classmethod
+    def load(cls, path=DEFAULT_INDEX_PATH):
+        with open(path, encoding='utf-8') as f:
+            content = json.load(f)
+        postings = {field: {(int(term) if field == 'year' else term): np.asarray(ids, dtype='int64')
+                            for term, ids in terms.items()}
+                    for field, terms in content['postings'].items()}
+        return cls(postings, content['ids'], content.get('fingerprint'))
+
+def build_press_index(df_press, country_mapping_df, text_column='subject_content', disease_names=()):
+    """
+    Builds the country / disease / year index of the cleaned press releases.
+    """
+    countries, _, _ = build_country_mappings(country_mapping_df)
+    diseases = build_disease_matcher(disease_names)
+
+    ids = df_press['Index'].to_numpy(dtype='int64')
+    codes, texts = pd.factorize(df_press[text_column].fillna(''))
+    country_terms, country_ids, disease_terms, disease_ids = [], [], [], []
+    text_countries = [list(countries.extract(text)) for text in texts]
+    # a canonical name can hold several diseases ('麻疹/德國麻疹')
+    text_diseases = [[d for name in diseases.extract(text) for d in str(name).split('/')] for text in texts]
+    for row, code in enumerate(codes):
+        country_terms += text_countries[code]
+        country_ids += [ids[row]] * len(text_countries[code])
+        disease_terms += text_diseases[code]
+        disease_ids += [ids[row]] * len(text_diseases[code])
+
+    years = pd.to_datetime(df_press['PublishTime'], errors='coerce').dt.year
+    has_year = years.notna().to_numpy()
+    postings = {
+        'country': _postings(country_terms, country_ids),
+        'disease': _postings(disease_terms, disease_ids),
+        'year': {int(year): ids_ for year, ids_ in _postings(years[has_year].astype(int).to_numpy(), ids[has_year]).items()},
+    }
+    return PressIndex(postings, ids, press_fingerprint(df_press, country_mapping_df, text_column, disease_names))
+
+def load_or_build_press_index(df_press, country_mapping_df, path=DEFAULT_INDEX_PATH, text_column='subject_content',
+                              disease_names=()):
+    """
+    Loads the index stored at path if it was built from the same inputs (press_fingerprint), otherwise builds
+    and stores it.
+    """
+    if os.path.exists(path):
+        try:
+            index = PressIndex.load(path)
+            if index.fingerprint == press_fingerprint(df_press, country_mapping_df, text_column, disease_names):
+                return index
+        except (OSError, ValueError, KeyError):
+            # A corrupt index file is rebuilt
+            pass
+    index = build_press_index(df_press, country_mapping_df, text_column, disease_names)
+    index.save(path)
+    return index
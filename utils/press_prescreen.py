@@ -0,0 +1,137 @@
+import pandas as pd
+import asyncio
+import json
+import re
+from utils.country_name_mapping import build_country_mappings
+from utils.press_classifier import classify_press_data_async, evaluate_classification
+
+# Rule-based pre-screen of press releases before the Gemini classifier.
+# Rules follow the classification criteria in SYSTEM_INSTRUCTION; only high-confidence rows get a label:
+# - 1: the release mentions a 國際旅遊疫情建議等級 / 旅遊疫情建議等級 level
+# - 1: a foreign country (country variations of build_country_mappings, Taiwan excluded) or 全球/WHO is
+#      followed within the same sentence by a case count or an epidemic trend, and the sentence is not about
+#      imported (移入) cases
+# - 0: no foreign country, region or international keyword at all once place-name diseases
+#      (日本腦炎, 德國麻疹, ...) are masked
+# - everything else is ambiguous and goes to the LLM
+
+DOMESTIC_ISO3 = {'TWN'}
+
+# Disease names containing a place name; masked before looking for foreign countries
+PLACE_NAME_DISEASES = [
+    '日本腦炎', '德國麻疹', '西尼羅熱', '西尼羅病毒', '西尼羅河病毒', '中東呼吸症候群', '克里米亞-剛果出血熱',
+    '剛果出血熱', '拉薩熱', '裂谷熱', '聖路易腦炎', '委內瑞拉馬腦炎', '香港腳', '伊波拉', '馬堡', '茲卡', '立百'
+]
+
+# Regions and international wording that make a release not clearly domestic
+INTERNATIONAL_KEYWORDS = [
+    '全球', '國際', '國外', '海外', '境外', '世界衛生組織', 'WHO', '各國', '鄰近國家', '鄰國',
+    '亞洲', '歐洲', '非洲', '美洲', '大洋洲', '東南亞', '東北亞', '南亞', '中東'
+]
+
+PATTERN_TRAVEL_ALERT = r'(?:國際)?旅遊疫情建議(?:等級)?[^。；]{0,10}第[一二三123]級|疫情等級第[一二三123]級'
+# A case count ("10例", "1,234人") or a trend statement after the place name, within the same sentence
+PATTERN_OUTBREAK_FACT = r'[^。；，]{0,25}?(?:\d[\d,，]*\s*(?:例|人|起)|疫情(?:上升|升溫|嚴峻|持續|擴大|下降|趨緩|延燒|蔓延|流行))'
+PATTERN_IMPORTED = r'移入'
+
+def build_prescreen_rules(country_mapping_df):
+    """
+    Compiles the pre-screen patterns from the country workbook (first sheet of the country xlsx).
+    """
+    sorted_mapping, _, _ = build_country_mappings(country_mapping_df)
+    foreign = [var for var, iso3 in sorted_mapping if var and iso3 not in DOMESTIC_ISO3]
+    # sorted_mapping is longest first, so the alternation prefers the longest variation
+    foreign_names = '|'.join(re.escape(var) for var in foreign)
+    place_names = '|'.join(re.escape(d) for d in sorted(PLACE_NAME_DISEASES, key=len, reverse=True))
+    international = '|'.join(re.escape(k) for k in INTERNATIONAL_KEYWORDS)
+    return {
+        'place_name_diseases': re.compile(place_names),
+        'travel_alert': re.compile(PATTERN_TRAVEL_ALERT),
+        'foreign_outbreak': re.compile(f'(?:{foreign_names}|全球|世界衛生組織|WHO){PATTERN_OUTBREAK_FACT}'),
+        'imported': re.compile(PATTERN_IMPORTED),
+        'foreign_mention': re.compile(f'{foreign_names}|{international}' if foreign_names else international),
+    }
+
+def prescreen_press_release(text, rules):
+    """
+    Returns (label, reason): label 1/0 for high-confidence rows, None when the LLM should decide.
+    """
+    if not isinstance(text, str) or text.strip() == "":
+        return 0, 'empty'
+    text = rules['place_name_diseases'].sub('', text)
+
+    if rules['travel_alert'].search(text):
+        return 1, 'travel_alert_level'
+    for sentence in re.split(r'[。；]', text):
+        if rules['foreign_outbreak'].search(sentence) and not rules['imported'].search(sentence):
+            return 1, 'foreign_outbreak'
+    if not rules['foreign_mention'].search(text):
+        return 0, 'no_foreign_mention'
+    return None, 'ambiguous'
+
+def prescreen_press_data(df_press, rules, text_column='subject_content'):
+    """
+    Adds prescreen_label (nullable Int64; <NA> = ambiguous) and prescreen_reason to df_press.
+    """
+    labels = [prescreen_press_release(text, rules) for text in df_press[text_column]]
+    df = df_press.copy()
+    df['prescreen_label'] = pd.array([label for label, _ in labels], dtype='Int64')
+    df['prescreen_reason'] = [reason for _, reason in labels]
+    return df
+
+def prescreen_summary(df):
+    """
+    Fraction of rows labelled by the rules versus routed to the LLM, per reason.
+    """
+    n = len(df)
+    routed = int(df['prescreen_label'].isna().sum())
+    return {
+        'rows': n,
+        'labelled_by_rules': n - routed,
+        'routed_to_llm': routed,
+        'fraction_routed': routed / n if n else float('nan'),
+        'by_reason': df['prescreen_reason'].value_counts().to_dict()
+    }
+
+def evaluate_prescreen(df, truth_column='flag_international_outbreak_human_final'):
+    """
+    Agreement of the rule labels with the human flags on the Sampled rows the rules labelled
+    (evaluate_classification metrics), plus the share of the sample they covered.
+    """
+    sampled = df[df['Sampled'] == 1]
+    labelled = sampled[sampled['prescreen_label'].notna()].copy()
+    labelled['prescreen_label'] = labelled['prescreen_label'].astype(int)
+    metrics = evaluate_classification(labelled, truth_column, 'prescreen_label', sampled_only=False)
+    metrics['coverage'] = len(labelled) / len(sampled) if len(sampled) else float('nan')
+    return metrics
+
+async def classify_press_data_prescreened_async(df_press, country_mapping_df, classifier=None, checkpoint_path=None,
+                                                text_column='subject_content', batch_size=1):
+    """
+    classify_press_data with the rule pre-screen in front: labelled rows skip the LLM.
+    Returns the classified frame (with prescreen columns) and prescreen_summary.
+    """
+    df = prescreen_press_data(df_press, build_prescreen_rules(country_mapping_df), text_column)
+    ambiguous = df['prescreen_label'].isna()
+
+    df['gemini_output'] = pd.Series(None, index=df.index, dtype=object)
+    df['flag_international_outbreak_gemini'] = df['prescreen_label'].fillna(0).astype(int)
+    labelled = ~ambiguous
+    df.loc[labelled, 'gemini_output'] = [
+        json.dumps({"analysis": f"prescreen: {reason}", "result": int(label)}, ensure_ascii=False)
+        for reason, label in zip(df.loc[labelled, 'prescreen_reason'], df.loc[labelled, 'prescreen_label'])
+    ]
+
+    if ambiguous.any():
+        df_llm = await classify_press_data_async(df_press[ambiguous.to_numpy()], classifier,
+                                                 checkpoint_path, text_column, batch_size)
+        df.loc[ambiguous, 'gemini_output'] = df_llm['gemini_output'].to_numpy()
+        df.loc[ambiguous, 'flag_international_outbreak_gemini'] = df_llm['flag_international_outbreak_gemini'].to_numpy()
+
+    return df, prescreen_summary(df)
+
+def classify_press_data_prescreened(df_press, country_mapping_df, classifier=None, checkpoint_path=None,
+                                    text_column='subject_content', batch_size=1):
+    return asyncio.run(classify_press_data_prescreened_async(
+        df_press, country_mapping_df, classifier, checkpoint_path, text_column, batch_size
+    ))
@@ -0,0 +1,423 @@
+"""
+Headless runner of the main.ipynb workflow as a DAG of cached stages.
+
+Usage (from the repository root):
+    python -m utils.runner                              # run every stage whose inputs or code changed
+    python -m utils.runner --dry-run                    # show what would run and why
+    python -m utils.runner --only tables                # re-run tables (upstream from cache, or run if stale)
+    python -m utils.runner --since news                 # re-run news and everything downstream of it
+    python -m utils.runner --config config.json --research-end-date 2026-03-31
+"""
+import argparse
+import hashlib
+import json
+import os
+import sys
+import time
+import pandas as pd
+from utils.cache import file_content_hash, module_source_hash
+from utils.instrumentation import resolve_recorder
+
+# - stages: load, visitors, alerts (inputs) -> news -> timeliness, pheic -> tables, figures; figures also
+#   keeps a manifest of its own per figure (figure_cache_dir, see utils.figures)
+# - the press releases are not a stage: their only consumer is the Gemini classification, a separate, API-bound
+#   step; tables reads its output file (press_international_path)
+# - a stage's fingerprint covers its parameters, the content of its input files, the source of the utils modules it
+#   runs (the code version) and the fingerprints of its upstream stages, so a changed input or module re-runs
+#   exactly the stages downstream of it
+# - fingerprints are computed before anything is read; outputs of cached upstream stages are loaded only when a
+#   stage that runs needs them
+# - outputs are pickled under cache_dir, one entry per stage; files a stage writes (tables, figures) are recorded,
+#   and a cached stage whose files are gone runs again
+# - --only and --since re-run their stages even when cached; input file hashes are reused while (size, mtime) match
+
+DEFAULT_STAGE_CACHE_DIR = 'cache/stages'
+MANIFEST_NAME = 'manifest.json'
+RUNNER_VERSION = '1'
+
+# Paths and parameters of the notebook's first cell
+DEFAULT_CONFIG = {
+    'epi_xlsx_path': 'data/WWWTable_Epidemics_20251229V1.2_fill_until_20251231.xlsx',
+    'tcdc_csv_path': 'data/TCDCIntlEpidAll.csv',
+    'country_xlsx_path': 'data/03輔助用表_監測國家清單.xlsx',
+    'transmission_xlsx_path': 'data/01總整_01國際疫情資料庫(2017-)_監測疾病清單.xlsx',
+    'visitor_xlsx_path': 'data/表1-2-歷年來臺旅客按居住地分.xlsx',
+    # input of the press classification step; no stage reads it
+    'press_xlsx_path': 'data/新聞稿_20251229_fill_until_20251231.xlsx',
+    'alert_history_path': 'data/TCDCTravelAlert_history.csv',
+    'alert_path': 'data/TCDCTravelAlert.csv',
+    'press_international_path': 'output/table_publication/table_press_gemini_international.csv',
+    'research_end_date': '2025-12-31',
+    'n_top_countries': 15,
+    'nb_alpha': 1.0,
+    'output_dir': 'output',
+    'n_workers': None,
+    'figure_cache_dir': 'cache/figures',
+}
+
+class Stage:
+    """
+    One node of the DAG: func(config, inputs, recorder) -> output, where inputs maps each upstream stage name to its
+    output (recorder lets a stage record sub-stages, as the news pipeline does).
+    inputs / params name the config keys the stage reads (files are hashed, parameters taken as they are).
+    """
+    def __init__(self, name, func, deps=(), inputs=(), params=(), modules=()):
+        self.name = name
+        self.func = func
+        self.deps = list(deps)
+        self.inputs = list(inputs)
+        self.params = list(params)
+        self.modules = list(modules)
+
+### stage functions
+def _stage_load(config, inputs, recorder):
+    from utils.data_loader import load_raw_data
+    df_raw, country_mapping_df, dat_transmission_route_raw, region_mapping_df = load_raw_data(
+        config['epi_xlsx_path'], config['tcdc_csv_path'], config['country_xlsx_path'],
+        config['transmission_xlsx_path'], config['research_end_date'])
+    return {'df_raw': df_raw, 'country_mapping_df': country_mapping_df,
+            'dat_transmission_route_raw': dat_transmission_route_raw, 'region_mapping_df': region_mapping_df}
+
+def _stage_visitors(config, inputs, recorder):
+    from utils.clean_visitor_data import get_processed_visitor_data
+    df_visit_by_year_flat, df_visit_flat_all_years = get_processed_visitor_data(
+        config['visitor_xlsx_path'], n_top_countries_selected=config['n_top_countries'])
+    return {'df_visit_by_year_flat': df_visit_by_year_flat, 'df_visit_flat_all_years': df_visit_flat_all_years}
+
+def _stage_alerts(config, inputs, recorder):
+    from utils.alert import get_combined_travel_alerts, standardize_alert_disease
+    df_alert_all = get_combined_travel_alerts(config['alert_history_path'], config['alert_path'])
+    df_alert_all['alert_disease_std'] = standardize_alert_disease(df_alert_all['alert_disease'])
+    return df_alert_all
+
+def _stage_news(config, inputs, recorder):
+    from utils.pipeline import process_news_data
+    load = inputs['load']
+    return process_news_data(load['df_raw'], load['country_mapping_df'], load['dat_transmission_route_raw'],
+                             load['region_mapping_df'], vectorized=True, n_workers=config['n_workers'], recorder=recorder)
+
+def _stage_timeliness(config, inputs, recorder):
+    from utils.timeliness import get_table_timeliness_by_year
+    return get_table_timeliness_by_year(inputs['news'], vectorized=True)
+
+def _stage_pheic(config, inputs, recorder):
+    from utils.pheic import (EventDateIndex, get_pheic_subset, build_pheic_timeline, build_pheic_summary,
+                             build_phase_intervals, count_phase_intervals)
+    from utils.pheic_model import fit_phase_model
+    df_PHEIC = get_pheic_subset(inputs['news'])
+    index = EventDateIndex(df_PHEIC)
+    table_PHEIC_timeline = build_pheic_timeline(df_PHEIC, config['research_end_date'])
+    intervals_df = count_phase_intervals(build_phase_intervals(table_PHEIC_timeline), index)
+    fit = fit_phase_model(intervals_df, alpha=config['nb_alpha'])
+    return {'table_PHEIC_timeline': table_PHEIC_timeline,
+            'table_PHEIC_summary': build_pheic_summary(table_PHEIC_timeline, index),
+            'intervals_df': intervals_df, 'rate_ratios': fit['rate_ratios']}
+
+def _stage_tables(config, inputs, recorder):
+    from utils.tables import (disease_count_percentage, load_press_international, build_summary_table_1,
+                              add_summary_mean_sd, write_table)
+    out = config['output_dir']
+    summary_table_1 = build_summary_table_1(inputs['news'], inputs['timeliness'], inputs['alerts'],
+                                            load_press_international(config['press_international_path']))
+    tables = {
+        'summary_table_1': summary_table_1,
+        'summary_table_1_mean_sd': add_summary_mean_sd(summary_table_1),
+        'table_all_disease_count_percentage': disease_count_percentage(inputs['news']),
+        'table_PHEIC_summary': inputs['pheic']['table_PHEIC_summary'],
+        'table_PHEIC_rate_ratios': inputs['pheic']['rate_ratios'],
+    }
+    files = [
+        write_table(summary_table_1, os.path.join(out, 'table_publication', 'Table_1_summary_statistics.xlsx')),
+        write_table(tables['table_all_disease_count_percentage'], os.path.join(out, 'table', 'table_all_disease_count_percentage.xlsx')),
+        write_table(tables['table_PHEIC_summary'], os.path.join(out, 'table', 'table_PHEIC_summary.xlsx'), index=False),
+        write_table(tables['table_PHEIC_rate_ratios'], os.path.join(out, 'table', 'table_PHEIC_rate_ratios.csv'), index=False),
+    ]
+    return {'tables': tables, 'files': files}
+
+def _stage_figures(config, inputs, recorder):
+    from utils.figures import build_figure_context, render_figures
+    context = build_figure_context(inputs['news'], inputs['pheic']['table_PHEIC_summary'], inputs['alerts'],
+                                   inputs['visitors']['df_visit_flat_all_years'])
+    report = render_figures(context, config['output_dir'], n_workers=config['n_workers'],
+                            cache_dir=config['figure_cache_dir'])
+    failed = report[report['status'] == 'failed']
+    if len(failed):
+        # not cached, so the next run retries them (figures that did render are skipped then); figures whose
+        # plotting library is missing are unavailable, not failed, and do not stop the stage
+        raise RuntimeError('figures failed: ' + '; '.join(f"{r.figure}: {r.error}" for r in failed.itertuples()))
+    return {'report': report, 'files': report.loc[report['status'].isin(['rendered', 'skipped']), 'path'].tolist()}
+
+STAGES = {stage.name: stage for stage in [
+    Stage('load', _stage_load,
+          inputs=['epi_xlsx_path', 'tcdc_csv_path', 'country_xlsx_path', 'transmission_xlsx_path'],
+          params=['research_end_date'], modules=['utils.data_loader', 'utils.country_name_mapping', 'utils.cache']),
+    Stage('visitors', _stage_visitors, inputs=['visitor_xlsx_path'], params=['n_top_countries'],
+          modules=['utils.clean_visitor_data']),
+    Stage('alerts', _stage_alerts, inputs=['alert_history_path', 'alert_path'], modules=['utils.alert']),
+    Stage('news', _stage_news, deps=['load'],
+          modules=['utils.pipeline', 'utils.data_loader', 'utils.country_name_mapping', 'utils.disease_name_mapping']),
+    Stage('timeliness', _stage_timeliness, deps=['news'], modules=['utils.timeliness']),
+    Stage('pheic', _stage_pheic, deps=['news'], params=['research_end_date', 'nb_alpha'],
+          modules=['utils.pheic', 'utils.pheic_model']),
+    Stage('tables', _stage_tables, deps=['news', 'timeliness', 'alerts', 'pheic'],
+          inputs=['press_international_path'], params=['output_dir'], modules=['utils.tables']),
+    Stage('figures', _stage_figures, deps=['news', 'pheic', 'alerts', 'visitors'], params=['output_dir'],
+          modules=['utils.figures', 'utils.aggregate_cube', 'utils.alert']),
+]}
+
+### DAG helpers
+def downstream_stages(names, stages=STAGES):
+    """
+    names and every stage depending on them, directly or not, in stage order.
+    """
+    selected = set(names)
+    for stage in stages.values():
+        if selected & set(stage.deps):
+            selected.add(stage.name)
+    return [name for name in stages if name in selected]
+
+def upstream_stages(names, stages=STAGES):
+    """
+    names and every stage they depend on, in stage order.
+    """
+    selected, todo = set(), list(names)
+    while todo:
+        name = todo.pop()
+        if name not in selected:
+            selected.add(name)
+            todo += stages[name].deps
+    return [name for name in stages if name in selected]
+
+def _check_stage_names(names, stages=STAGES):
+    unknown = [name for name in names if name not in stages]
+    if unknown:
+        raise ValueError(f"Unknown stage(s): {', '.join(unknown)}; stages are {', '.join(stages)}")
+
+### fingerprints
+def _input_hash(path, file_hashes):
+    """
+    Content hash of an input file ('missing' if absent), reusing the hash recorded for the same (size, mtime).
+    """
+    if path is None or not os.path.exists(path):
+        return 'missing'
+    stat = os.stat(path)
+    key = os.path.abspath(path)
+    entry = file_hashes.get(key)
+    if entry is None or entry['size'] != stat.st_size or entry['mtime_ns'] != stat.st_mtime_ns:
+        entry = {'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns, 'hash': file_content_hash(path)}
+        file_hashes[key] = entry
+    return entry['hash']
+
+def stage_fingerprints(config, stages=STAGES, file_hashes=None):
+    """
+    Fingerprint of every stage (stage order), from its parameters, input files, code and upstream fingerprints.
+    """
+    file_hashes = {} if file_hashes is None else file_hashes
+    module_hashes = {}
+    fingerprints = {}
+    for stage in stages.values():
+        for module in stage.modules + ['utils.runner']:
+            if module not in module_hashes:
+                module_hashes[module] = module_source_hash(module)
+        content = {
+            'runner_version': RUNNER_VERSION,
+            'stage': stage.name,
+            'params': {key: config[key] for key in stage.params},
+            'inputs': {key: _input_hash(config[key], file_hashes) for key in stage.inputs},
+            'code': {module: module_hashes[module] for module in stage.modules + ['utils.runner']},
+            'upstream': {dep: fingerprints[dep] for dep in stage.deps},
+        }
+        fingerprints[stage.name] = hashlib.sha256(
+            json.dumps(content, sort_keys=True, ensure_ascii=False, default=str).encode('utf-8')).hexdigest()
+    return fingerprints
+
+### stage cache
+def _load_manifest(cache_dir):
+    path = os.path.join(cache_dir, MANIFEST_NAME)
+    if not os.path.exists(path):
+        return {'stages': {}, 'file_hashes': {}}
+    try:
+        with open(path, encoding='utf-8') as f:
+            manifest = json.load(f)
+        manifest.setdefault('stages', {})
+        manifest.setdefault('file_hashes', {})
+        return manifest
+    except (OSError, ValueError):
+        # A corrupt manifest only means every stage runs again
+        return {'stages': {}, 'file_hashes': {}}
+
+def _save_manifest(cache_dir, manifest):
+    os.makedirs(cache_dir, exist_ok=True)
+    path = os.path.join(cache_dir, MANIFEST_NAME)
+    with open(path + '.tmp', 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, ensure_ascii=False, indent=1)
+    os.replace(path + '.tmp', path)
+
+def _entry_path(cache_dir, name):
+    return os.path.join(cache_dir, f'{name}.pkl')
+
+def _is_fresh(entry, fingerprint, cache_dir, name):
+    return (entry is not None and entry.get('fingerprint') == fingerprint
+            and os.path.exists(_entry_path(cache_dir, name))
+            and all(os.path.exists(path) for path in entry.get('files', [])))
+
+def load_stage_output(name, cache_dir=DEFAULT_STAGE_CACHE_DIR):
+    """
+    Cached output of a stage (e.g. load_stage_output('news') in a notebook), whether or not it is still fresh.
+    """
+    return pd.read_pickle(_entry_path(cache_dir, name))
+
+def plan_run(config=None, only=None, since=None, force=False, cache_dir=DEFAULT_STAGE_CACHE_DIR, stages=STAGES):
+    """
+    Decides what a run does, without reading any data: one row per stage with its fingerprint, action
+    ('run', 'cached' or 'skip') and the reason.
+    """
+    config = {**DEFAULT_CONFIG, **(config or {})}
+    if only is not None and since is not None:
+        raise ValueError("Use only or since, not both")
+    if only is not None:
+        targets = list(only)
+    elif since is not None:
+        _check_stage_names([since], stages)
+        targets = downstream_stages([since], stages)
+    else:
+        targets = list(stages)
+    _check_stage_names(targets, stages)
+    selected = only is not None or since is not None
+
+    manifest = _load_manifest(cache_dir)
+    fingerprints = stage_fingerprints(config, stages, manifest['file_hashes'])
+    required = upstream_stages(targets, stages)
+
+    rows = []
+    for name in stages:
+        entry = manifest['stages'].get(name)
+        fresh = _is_fresh(entry, fingerprints[name], cache_dir, name)
+        if name not in required:
+            action, reason = 'skip', 'not selected'
+        elif name in targets and (force or selected):
+            action, reason = 'run', 'forced' if force else 'selected'
+        elif not fresh:
+            action = 'run'
+            if entry is None:
+                reason = 'not cached'
+            elif entry.get('fingerprint') != fingerprints[name]:
+                reason = 'inputs or code changed'
+            else:
+                reason = 'cached output missing'
+        else:
+            action, reason = 'cached', 'unchanged'
+        rows.append({'stage': name, 'action': action, 'reason': reason, 'fingerprint': fingerprints[name]})
+    return pd.DataFrame(rows), manifest
+
+def run_workflow(config=None, only=None, since=None, force=False, cache_dir=DEFAULT_STAGE_CACHE_DIR,
+                 recorder=None, dry_run=False, stages=STAGES, verbose=True):
+    """
+    Runs the stages of plan_run in order and caches their outputs. Returns the plan with the wall time of
+    every stage that ran. recorder (utils.instrumentation) records each stage; the news stage records its own
+    sub-stages into it as well.
+    """
+    config = {**DEFAULT_CONFIG, **(config or {})}
+    plan, manifest = plan_run(config, only, since, force, cache_dir, stages)
+    plan['wall_s'] = float('nan')
+    if dry_run:
+        return plan
+
+    recorder, report_path = resolve_recorder(recorder, 'run_workflow')
+    actions = dict(zip(plan['stage'], plan['action']))
+    fingerprints = dict(zip(plan['stage'], plan['fingerprint']))
+    outputs = {}
+
+    def output_of(name):
+        if name not in outputs:
+            outputs[name] = load_stage_output(name, cache_dir)
+        return outputs[name]
+
+    os.makedirs(cache_dir, exist_ok=True)
+    for position, name in enumerate(plan['stage']):
+        if actions[name] != 'run':
+            continue
+        stage = stages[name]
+        if verbose:
+            print(f"[{name}] {plan.at[position, 'reason']}", flush=True)
+        start = time.perf_counter()
+        inputs = {dep: output_of(dep) for dep in stage.deps}
+        with recorder.stage(name) as record:
+            output = stage.func(config, inputs, recorder)
+            if isinstance(output, pd.DataFrame):
+                record['rows_out'] = len(output)
+        outputs[name] = output
+
+        entry_path = _entry_path(cache_dir, name)
+        pd.to_pickle(output, entry_path + '.tmp')
+        os.replace(entry_path + '.tmp', entry_path)
+        wall = time.perf_counter() - start
+        manifest['stages'][name] = {
+            'fingerprint': fingerprints[name],
+            'files': output.get('files', []) if isinstance(output, dict) else [],
+            'finished': pd.Timestamp.now().isoformat(timespec='seconds'),
+            'wall_s': round(wall, 3),
+        }
+        # saved after every stage, so an interrupted run keeps what it finished
+        _save_manifest(cache_dir, manifest)
+        plan.at[position, 'wall_s'] = round(wall, 3)
+        if verbose:
+            print(f"[{name}] done in {wall:.1f}s", flush=True)
+
+    _save_manifest(cache_dir, manifest)
+    if report_path is not None:
+        recorder.meta.update({'only': only, 'since': since, 'force': force})
+        recorder.to_json(report_path)
+    return plan
+
+def _parse_value(value):
+    try:
+        return json.loads(value)
+    except ValueError:
+        return value
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run the main.ipynb workflow headless, re-running only stale stages.")
+    parser.add_argument("--config", default=None, help="JSON file overriding DEFAULT_CONFIG keys (paths and parameters)")
+    parser.add_argument("--set", action="append", default=[], metavar="KEY=VALUE",
+                        help="override one config key (VALUE is parsed as JSON when possible); repeatable")
+    parser.add_argument("--research-end-date", default=None)
+    parser.add_argument("--only", default=None, help="comma-separated stages to re-run")
+    parser.add_argument("--since", default=None, help="re-run this stage and everything downstream of it")
+    parser.add_argument("--force", action="store_true", help="re-run the selected stages (default: all) even when cached")
+    parser.add_argument("--dry-run", action="store_true", help="print the plan without running anything")
+    parser.add_argument("--list", action="store_true", help="list the stages and their dependencies")
+    parser.add_argument("--cache-dir", default=DEFAULT_STAGE_CACHE_DIR)
+    parser.add_argument("--n-workers", type=int, default=None, help="process pool size of the news stage (-1: all cores)")
+    args = parser.parse_args(argv)
+
+    if args.list:
+        for stage in STAGES.values():
+            print(f"{stage.name:12s} <- {', '.join(stage.deps) or '-'}")
+        return 0
+
+    config = {}
+    if args.config:
+        with open(args.config, encoding='utf-8') as f:
+            config.update(json.load(f))
+    for item in args.set:
+        key, _, value = item.partition('=')
+        config[key] = _parse_value(value)
+    if args.research_end_date:
+        config['research_end_date'] = args.research_end_date
+    if args.n_workers is not None:
+        config['n_workers'] = args.n_workers
+    unknown = sorted(set(config) - set(DEFAULT_CONFIG))
+    if unknown:
+        parser.error(f"unknown config key(s): {', '.join(unknown)}")
+
+    only = args.only.split(',') if args.only else None
+    try:
+        plan = run_workflow(config, only, args.since, args.force, args.cache_dir, dry_run=args.dry_run)
+    except ValueError as e:
+        parser.error(str(e))
+    print(plan.drop(columns=['fingerprint']).to_string(index=False))
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
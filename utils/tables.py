@@ -0,0 +1,87 @@
+import pandas as pd
+import os
+
+# Publication tables of main.ipynb as functions of the stage outputs (used by utils.runner).
+# - build_summary_table_1 is Table 1 of the "Overall Metrics calculation" cell; inputs are not modified
+# - the press column of Table 1 comes from the Gemini classification output (table_press_gemini_international.csv);
+#   it is optional, as that file is produced by a separate, API-bound step
+# - add_summary_mean_sd adds the cross-year Mean / Standard Deviation rows of the following cell
+
+UNKNOWN_DISEASES = ["不明原因疾病", "不明原因致死疾病"]
+PRESS_INTERNATIONAL_PATH = 'output/table_publication/table_press_gemini_international.csv'
+
+def disease_count_percentage(df):
+    """
+    Reports per disease with their percentage of all reports, most reported first (table_all_disease_count_percentage).
+    """
+    counts = df['disease_name'].value_counts()
+    return pd.DataFrame({
+        'Count': counts,
+        'Percentage': (counts / df.shape[0] * 100).round(2)
+    })
+
+def load_press_international(path=PRESS_INTERNATIONAL_PATH):
+    """
+    Yearly count and share of press releases with international epidemic information, with Table 1 column names;
+    None when the classification output does not exist.
+    """
+    if path is None or not os.path.exists(path):
+        return None
+    df_press_international = pd.read_csv(path)
+    df_press_international = df_press_international.drop(columns=['count_total'])
+    return df_press_international.rename(columns={'count_international': '新聞稿-含國際疫情則數',
+                                                  'perc_international': '新聞稿-含國際疫情佔比(%)'})
+
+def build_summary_table_1(df, table_timeliness_byyear, df_alert_all, df_press_international=None):
+    """
+    Table 1: yearly reports, unknown disease reports, median publication lag, travel alert notices and
+    (when given) press release counts, outer-merged on year.
+    """
+    dates = pd.to_datetime(df['date'])
+    annual_country_disease_counts = (df.groupby(dates.dt.year.rename('year'))['country_disease'].size()
+                                     .reset_index(name='國際重要疫情-國家疾病則數'))
+
+    unknown = dates[df['disease_name'].isin(UNKNOWN_DISEASES)]
+    table_unknown_d_total = (unknown.groupby(unknown.dt.year).size()
+                             .reset_index(name='國際重要疫情-不明原因疾病則數')
+                             .rename(columns={'date': 'year'}))
+
+    table_timeliness_byyear_median = table_timeliness_byyear[["year", "median_interval"]].round().astype(int).rename(
+        columns={"median_interval": "國際重要疫情-公告時間差"})
+
+    alert_year = pd.to_datetime(df_alert_all['date']).dt.year.rename('year')
+    level123 = (df_alert_all['severity_level'] != '解除').to_numpy()
+    table_alert_count = alert_year[level123].groupby(alert_year[level123]).size().reset_index(name='國際旅遊疫情建議等級-公告數')
+
+    summary_table_1 = pd.merge(annual_country_disease_counts, table_unknown_d_total, on='year', how='outer')
+    summary_table_1 = pd.merge(summary_table_1, table_timeliness_byyear_median, on='year', how='outer')
+    summary_table_1 = pd.merge(summary_table_1, table_alert_count, on='year', how='outer')
+    if df_press_international is not None:
+        summary_table_1 = pd.merge(summary_table_1, df_press_international, on='year', how='outer')
+    return summary_table_1
+
+def add_summary_mean_sd(summary_table_1):
+    """
+    Table 1 with the rounded cross-year Mean and Standard Deviation rows; year becomes text (平均 / 標準差).
+    """
+    table = summary_table_1.copy()
+    means = {column: table[column].mean().round(0).astype(int) for column in table.columns}
+    std_devs = {column: table[column].std().round(0).astype(int) for column in table.columns}
+    table.loc['Mean'] = means
+    table.loc['Standard Deviation'] = std_devs
+
+    table['year'] = table['year'].astype(str)
+    table.loc['Mean', 'year'] = '平均'
+    table.loc['Standard Deviation', 'year'] = '標準差'
+    return table
+
+def write_table(table, path, index=True):
+    """
+    Writes a table as .xlsx or .csv (utf-8-sig, as the notebook does) and returns the path.
+    """
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    if path.endswith('.xlsx'):
+        table.to_excel(path, index=index)
+    else:
+        table.to_csv(path, index=index, encoding='utf-8-sig')
+    return path
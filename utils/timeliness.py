@@ -6,6 +6,12 @@
 import pandas as pd
 import re
 
+# Date patterns shared by the row-wise and vectorized extraction
+# "9/20" or "8/2" in Source
+PATTERN_SOURCE_DATE = r'(\d{1,2})/(\d{1,2})'
+# "截至今年12/8" or "截至12/8" or "今年截至12/8" or "截至6月25日" or "截至今年6月25日" in description
+PATTERN_DESCRIPTION_DATE = r'截至(?:今年)?(\d{1,2})[月/](\d{1,2})日?'
+
 def extract_source_time_source(row):
     """
     Extracts date from the 'Source' column using regex.
@@ -18,7 +24,7 @@ def extract_source_time_source(row):
         return pd.NaT
 
     # Regex to find dates like "9/20" or "8/2"
-    matches = re.findall(r'(\d{1,2})/(\d{1,2})', source)
+    matches = re.findall(PATTERN_SOURCE_DATE, source)
     
     most_recent_date = pd.NaT
 
@@ -61,7 +67,7 @@ def extract_source_time_description(row):
         return pd.NaT
 
     # Find all patterns like "截至今年12/8" or "截至12/8" or "今年截至12/8" or "截至6月25日" or "截至今年6月25日"
-    matches = re.findall(r'截至(?:今年)?(\d{1,2})[月/](\d{1,2})日?', description)
+    matches = re.findall(PATTERN_DESCRIPTION_DATE, description)
     
     if matches:
         dates = []
@@ -117,9 +123,76 @@ def calculate_interval_source_publish(row):
     else:
         return pd.NaT 
 
-def get_table_timeliness_by_year(df):
+def _to_int(digits):
+    """
+    Converts matched digit strings to int (falls back to int() for non-ASCII digits).
+    """
+    try:
+        return digits.astype(int)
+    except ValueError:
+        return digits.map(int)
+
+def extract_candidate_dates(text, year, pattern):
+    """
+    All month/day matches of pattern in text, turned into Timestamps of the row's year.
+    Returns a Series indexed by row label (one entry per match); invalid dates are NaT.
+    """
+    matches = text[text.notna()].astype(str).str.extractall(pattern)
+    if matches.empty:
+        return pd.Series(pd.NaT, index=pd.Index([], dtype=text.index.dtype), dtype='datetime64[ns]')
+
+    rows = matches.index.get_level_values(0)
+    dates = pd.to_datetime(
+        pd.DataFrame({
+            'year': year.reindex(rows).to_numpy(),
+            'month': _to_int(matches[0]).to_numpy(),
+            'day': _to_int(matches[1]).to_numpy()
+        }),
+        errors='coerce'
+    )
+    dates.index = rows
+    return dates
+
+def add_timeliness_columns_vectorized(df_raw_recovered):
+    """
+    Columnar version of steps (1)-(4): SourceTime_source, SourceTime_description, SourceTime_adj
+    and interval_source_publish, computed with str.extractall and vectorized masks.
+    """
+    date_row = pd.to_datetime(df_raw_recovered['date'], errors='coerce')
+    year = date_row.dt.year
+
+    # (1) most recent Source date that is not after the publish date
+    candidates = extract_candidate_dates(df_raw_recovered['Source'], year, PATTERN_SOURCE_DATE)
+    keep = candidates.notna() & (candidates <= date_row.reindex(candidates.index).to_numpy())
+    source_time_source = candidates[keep].groupby(level=0).max().reindex(df_raw_recovered.index)
+
+    # (2) latest "截至" date of the description, only when both SourceTime columns are missing;
+    #     missing when that latest date is after the publish date
+    need = df_raw_recovered['SourceTime'].isna() & df_raw_recovered['SourceTime2'].isna()
+    candidates = extract_candidate_dates(df_raw_recovered.loc[need, 'description'], year, PATTERN_DESCRIPTION_DATE)
+    latest = candidates.dropna().groupby(level=0).max()
+    latest = latest.where(latest <= date_row.reindex(latest.index).to_numpy())
+    source_time_description = latest.reindex(df_raw_recovered.index)
+
+    # (3) coalesce in priority order SourceTime2, SourceTime, description, Source
+    source_time_adj = (
+        pd.to_datetime(df_raw_recovered['SourceTime2'], errors='coerce')
+        .fillna(pd.to_datetime(df_raw_recovered['SourceTime'], errors='coerce'))
+        .fillna(source_time_description)
+        .fillna(source_time_source)
+    )
+
+    # (4) interval in days between publish date and adjusted source date
+    df_raw_recovered['SourceTime_source'] = source_time_source
+    df_raw_recovered['SourceTime_description'] = source_time_description
+    df_raw_recovered['SourceTime_adj'] = source_time_adj
+    df_raw_recovered['interval_source_publish'] = (date_row - source_time_adj).dt.days
+    return df_raw_recovered
+
+def get_table_timeliness_by_year(df, vectorized=False):
     """
     Main function to process the dataframe and return timeliness metrics by year.
+    vectorized=True computes the per-row dates column-wise (add_timeliness_columns_vectorized).
     """
     # (0) prepare the df_raw_recovered
     # Dropping duplicates to clean the raw data
@@ -135,18 +208,21 @@ def get_table_timeliness_by_year(df):
         .reset_index(drop=True)
     )
 
-    # (1) extract date from source
-    df_raw_recovered['SourceTime_source'] = df_raw_recovered.apply(extract_source_time_source, axis=1)
+    if vectorized:
+        df_raw_recovered = add_timeliness_columns_vectorized(df_raw_recovered)
+    else:
+        # (1) extract date from source
+        df_raw_recovered['SourceTime_source'] = df_raw_recovered.apply(extract_source_time_source, axis=1)
 
-    # (2) extract the source date from the description 
-    # (Internal function name changed slightly to avoid confusion)
-    df_raw_recovered['SourceTime_description'] = df_raw_recovered.apply(extract_source_time_description, axis=1)
+        # (2) extract the source date from the description 
+        # (Internal function name changed slightly to avoid confusion)
+        df_raw_recovered['SourceTime_description'] = df_raw_recovered.apply(extract_source_time_description, axis=1)
 
-    # (3) Get adjusted source date
-    df_raw_recovered['SourceTime_adj'] = df_raw_recovered.apply(calculate_adjusted_source_time, axis=1)
+        # (3) Get adjusted source date
+        df_raw_recovered['SourceTime_adj'] = df_raw_recovered.apply(calculate_adjusted_source_time, axis=1)
 
-    # (4) calculate interval between publish date and median source date
-    df_raw_recovered['interval_source_publish'] = df_raw_recovered.apply(calculate_interval_source_publish, axis=1)
+        # (4) calculate interval between publish date and median source date
+        df_raw_recovered['interval_source_publish'] = df_raw_recovered.apply(calculate_interval_source_publish, axis=1)
     df_raw_recovered['year'] = pd.to_datetime(df_raw_recovered['date'], errors='coerce').dt.year
 
     # (5) Group by year and aggregate